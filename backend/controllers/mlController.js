@@ -8,6 +8,7 @@
 const { spawn } = require('child_process');
 const path = require('path');
 const { supabase } = require('../lib/supabaseClient');
+const { calculateFallbackRiskScore } = require('../lib/fallbackRiskScore');
 
 /**
  * Run Python ML model and return results
@@ -240,74 +241,4 @@ function applyStressScenario(deal, scenario) {
   };
 }
 
-/**
- * Fallback rule-based risk scoring
- */
-function calculateFallbackRiskScore(dealData) {
-  let riskScore = 50;
-  const riskFactors = [];
-  
-  // LTV risk
-  const ltv = dealData.requested_ltv || 75;
-  if (ltv > 80) {
-    riskScore += 15;
-    riskFactors.push({
-      factor: 'High LTV',
-      value: `${ltv}%`,
-      impact: 'high'
-    });
-  } else if (ltv < 65) {
-    riskScore -= 10;
-  }
-  
-  // Interest rate risk
-  const rate = dealData.requested_rate || 7.5;
-  if (rate > 10) {
-    riskScore += 10;
-    riskFactors.push({
-      factor: 'High Interest Rate',
-      value: `${rate}%`,
-      impact: 'medium'
-    });
-  }
-  
-  // Loan amount risk
-  if (dealData.loan_amount > 10000000) {
-    riskScore += 5;
-    riskFactors.push({
-      factor: 'Large Loan Amount',
-      value: `$${(dealData.loan_amount / 1000000).toFixed(1)}M`,
-      impact: 'low'
-    });
-  }
-  
-  // Property type risk
-  const highRiskTypes = ['land', 'mixed_use'];
-  if (highRiskTypes.includes(dealData.asset_type?.toLowerCase())) {
-    riskScore += 12;
-    riskFactors.push({
-      factor: 'Higher Risk Property Type',
-      value: dealData.asset_type,
-      impact: 'high'
-    });
-  }
-  
-  riskScore = Math.max(0, Math.min(100, riskScore));
-  
-  return {
-    risk_score: riskScore,
-    confidence: 75.0,
-    risk_level: getRiskLevel(riskScore),
-    risk_factors: riskFactors,
-    model_version: '1.0.0-fallback'
-  };
-}
-
-function getRiskLevel(score) {
-  if (score < 30) return 'low';
-  if (score < 50) return 'moderate';
-  if (score < 70) return 'elevated';
-  return 'high';
-}
-
 module.exports = exports;
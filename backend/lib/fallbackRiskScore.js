@@ -0,0 +1,90 @@
+// ============================================================
+// FALLBACK RISK SCORING
+// Rule-based scoring used when the Python ML model is unavailable.
+// Rules live in ml/fallback_rules.json, shared with risk_model.py
+// so both fallbacks always agree.
+// ============================================================
+
+const rules = require('../ml/fallback_rules.json');
+
+const OPERATORS = {
+  '>': (value, threshold) => value > threshold,
+  '>=': (value, threshold) => value >= threshold,
+  '<': (value, threshold) => value < threshold,
+  '<=': (value, threshold) => value <= threshold,
+  in: (value, options) => options.map((o) => String(o).toLowerCase()).includes(value)
+};
+
+// toFixed rounds the exact binary value half away from zero; risk_model.py's
+// _round_half_up does the same so factor text matches (Math.round would not)
+const FORMATTERS = {
+  percent: (value) => `${Number(value.toFixed(2))}%`,
+  currency: (value) => `$${Number(value.toFixed(0)).toLocaleString('en-US')}`,
+  title: (value) => String(value)
+    .split('_')
+    .map((word) => word.charAt(0).toUpperCase() + word.slice(1).toLowerCase())
+    .join(' ')
+};
+
+/**
+ * Read a rule field from deal data, applying the table's default
+ */
+function fieldValue(dealData, rule) {
+  const raw = dealData[rule.field];
+  const missing = raw === undefined || raw === null || Number.isNaN(raw);
+
+  if (rule.op === 'in') {
+    return missing ? String(rules.defaults[rule.field] ?? '') : String(raw).toLowerCase();
+  }
+  return missing ? Number(rules.defaults[rule.field]) : Number(raw);
+}
+
+function getRiskLevel(score) {
+  if (score < 30) return 'low';
+  if (score < 50) return 'moderate';
+  if (score < 70) return 'elevated';
+  return 'high';
+}
+
+/**
+ * Score a deal with the shared fallback rule table
+ *
+ * @param {object} dealData - Deal fields (requested_ltv, requested_rate, loan_amount, asset_type)
+ * @param {string} modelVersion - Version tag for the result
+ * @returns {object} Risk assessment in the same shape as the ML model's
+ */
+function calculateFallbackRiskScore(dealData, modelVersion = '1.0.0-fallback') {
+  let riskScore = rules.base_score;
+  const riskFactors = [];
+  const matchedGroups = new Set();
+
+  for (const rule of rules.rules) {
+    if (rule.group && matchedGroups.has(rule.group)) continue;
+
+    const value = fieldValue(dealData, rule);
+    if (!OPERATORS[rule.op](value, rule.threshold)) continue;
+
+    if (rule.group) matchedGroups.add(rule.group);
+    riskScore += rule.delta;
+
+    if (rule.factor) {
+      riskFactors.push({
+        factor: rule.factor,
+        value: FORMATTERS[rule.format](value),
+        impact: rule.impact
+      });
+    }
+  }
+
+  riskScore = Math.max(rules.min_score, Math.min(rules.max_score, riskScore));
+
+  return {
+    risk_score: riskScore,
+    confidence: rules.confidence,
+    risk_level: getRiskLevel(riskScore),
+    risk_factors: riskFactors,
+    model_version: modelVersion
+  };
+}
+
+module.exports = { calculateFallbackRiskScore, getRiskLevel };
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Deadline-Aware Admission Control
+================================
+Keeps scoring latency bounded under overload by checking each request's
+deadline against measured service time, and degrading when the deadline
+cannot be met instead of letting the queue grow.
+
+- Service time is the recent p90 of measured model scoring times
+- A request is admitted when its expected completion fits its deadline.
+  Expected completion is the requests ahead of it spread over the
+  workers, plus one service time
+- Otherwise it degrades in steps, each marked in model_version:
+    cached    last model result for the same deal  (<version>-cached)
+    rules     vectorized rule-table score          (1.0.0-rules-shed)
+    rejected  error result                         (rejected)
+- Admitted requests are checked again when a worker picks them up, so a
+  request that waited longer than expected still degrades in time
+
+Used by worker_pool.py: requests carry "deadline_ms" (relative to arrival),
+or get the pool's --deadline-ms default.
+
+Usage:
+    python worker_pool.py --workers 4 --deadline-ms 250 < deals.jsonl
+    python load_test.py --target server --deadline-ms 250 --rate 400
+
+Author: Underwrite Pro ML Team
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from risk_model import FALLBACK_RULES
+
+# Recent service times kept, and the quantile used as the estimate
+DEFAULT_WINDOW = 256
+DEFAULT_QUANTILE = 0.9
+
+# Service time assumed before any request has been measured
+INITIAL_SERVICE_SECONDS = 0.01
+
+# Model results kept for degraded answers
+DEFAULT_CACHE_SIZE = 10000
+
+CACHED_SUFFIX = '-cached'
+SHED_RULES_VERSION = '1.0.0-rules-shed'
+REJECTED_VERSION = 'rejected'
+
+DEGRADATION_LEVELS = ['model', 'cached', 'rules', 'rejected']
+
+
+class ServiceTimeEstimator:
+    """
+    Quantile of recent service times over a ring buffer
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, quantile: float = DEFAULT_QUANTILE,
+                 initial: float = INITIAL_SERVICE_SECONDS):
+        """
+        Args:
+            window: Measurements kept
+            quantile: Quantile reported as the estimate
+            initial: Estimate until the first measurement
+        """
+        self.samples = np.zeros(window)
+        self.quantile = quantile
+        self.count = 0
+        self.estimate = initial
+        self.lock = threading.Lock()
+
+    def update(self, seconds: float):
+        """Add one measured service time"""
+        with self.lock:
+            self.samples[self.count % len(self.samples)] = seconds
+            self.count += 1
+            # Re-estimate every few samples; the quantile moves slowly
+            if self.count <= 16 or self.count % 8 == 0:
+                filled = self.samples[:min(self.count, len(self.samples))]
+                self.estimate = float(np.quantile(filled, self.quantile))
+
+
+class ResultCache:
+    """
+    LRU cache of model results keyed by the deal's JSON
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(deal: Dict) -> str:
+        return json.dumps(deal, sort_keys=True, default=str)
+
+    def get(self, deal: Dict) -> Optional[Dict]:
+        key = self.key(deal)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+            return result
+
+    def put(self, deal: Dict, result: Dict):
+        if self.capacity <= 0:
+            return
+        key = self.key(deal)
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+
+class AdmissionController:
+    """
+    Admits, degrades or rejects scoring requests against their deadlines
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        default_deadline_ms: float = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        window: int = DEFAULT_WINDOW,
+        quantile: float = DEFAULT_QUANTILE
+    ):
+        """
+        Args:
+            workers: Scoring workers serving the queue
+            default_deadline_ms: Deadline for requests without one (None = no deadline)
+            cache_size: Model results kept for degraded answers
+            window: Service times kept for the estimate
+            quantile: Service time quantile used as the estimate
+        """
+        self.workers = max(1, workers)
+        self.default_deadline_ms = default_deadline_ms
+        self.service_time = ServiceTimeEstimator(window, quantile)
+        self.rules_time = ServiceTimeEstimator(window, quantile, initial=0.0001)
+        self.cache = ResultCache(cache_size)
+        self.stats = {level: 0 for level in DEGRADATION_LEVELS}
+        self.lock = threading.Lock()
+
+    def deadline(self, deadline_ms: float = None, arrived: float = None) -> Optional[float]:
+        """
+        Absolute deadline (time.monotonic) of a request
+
+        Args:
+            deadline_ms: Request's own budget in ms from arrival (default: the pool default)
+            arrived: Arrival time (default: now)
+        """
+        deadline_ms = self.default_deadline_ms if deadline_ms is None else deadline_ms
+        if deadline_ms is None:
+            return None
+        return (time.monotonic() if arrived is None else arrived) + float(deadline_ms) / 1000
+
+    def can_meet(self, deadline: Optional[float], ahead: int = 0) -> bool:
+        """
+        Whether the model can answer before the deadline
+
+        Args:
+            deadline: Absolute deadline, or None for none
+            ahead: Requests queued or in flight ahead of this one
+        """
+        if deadline is None:
+            return True
+        rounds = ahead // self.workers + 1
+        return time.monotonic() + rounds * self.service_time.estimate <= deadline
+
+    def _count(self, level: str):
+        with self.lock:
+            self.stats[level] += 1
+
+    def admit(self):
+        """Count a request sent to the model"""
+        self._count('model')
+
+    def degrade(self, deal: Dict, deadline: float) -> Dict:
+        """
+        Best answer available before the deadline without the model
+
+        Returns:
+            Cached result, rule-table result or rejection, with the level
+            marked in model_version
+        """
+        now = time.monotonic()
+        cached = self.cache.get(deal) if now < deadline else None
+        if cached is not None:
+            self._count('cached')
+            return {**cached, 'model_version': f"{cached.get('model_version', '1.0.0')}{CACHED_SUFFIX}"}
+
+        if now + self.rules_time.estimate <= deadline:
+            started = time.perf_counter()
+            try:
+                result = FALLBACK_RULES.score([deal], model_version=SHED_RULES_VERSION)[0]
+            except Exception as e:
+                result = None
+                print(f"[WARNING] Rule-table scoring failed while shedding: {e}", file=sys.stderr)
+            self.rules_time.update(time.perf_counter() - started)
+            if result is not None:
+                self._count('rules')
+                return result
+
+        self._count('rejected')
+        return {
+            'error': 'Deadline exceeded',
+            'message': 'Scoring capacity cannot answer before the request deadline',
+            'model_version': REJECTED_VERSION
+        }
+
+    def record(self, deal: Dict, result: Dict, seconds: float):
+        """Record a model answer: its service time, and the result for the cache"""
+        self.service_time.update(seconds)
+        if isinstance(result, dict) and 'error' not in result:
+            self.cache.put(deal, result)
+
+    def report(self) -> Dict:
+        """Requests per degradation level and the current service time estimate"""
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            'degraded_rate': round(1 - self.stats['model'] / total, 4) if total else None,
+            'service_time_ms': round(self.service_time.estimate * 1000, 3),
+            'default_deadline_ms': self.default_deadline_ms
+        }
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward Vintage Backtest
+=============================
+Out-of-time evaluation of the risk model by origination vintage.
+
+- Deals are bucketed by origination month (origination_date, or
+  created_at for historical_deals.csv)
+- Each vintage is scored by a model trained only on earlier vintages:
+  an expanding window (all history) or a rolling window of N months
+- Windows run in parallel processes over one shared, read-only copy of
+  the feature matrix (memory-mapped .npy files)
+- Feature matrices are cached by the data file's content hash, so
+  repeated backtests on the same data skip feature preparation
+- Reports AUC and calibration (mean PD vs observed default rate, Brier
+  score, expected calibration error) per vintage and pooled
+
+Usage:
+    python backtest.py --data sample_data.csv --window expanding --min-train-months 12
+    python backtest.py --data ../data/historical_deals.csv --window rolling --window-months 6 --vintage quarter
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from risk_model import FEATURE_VERSION, HAS_ML_LIBS
+from segmented_model import training_matrix
+
+if HAS_ML_LIBS:
+    import xgboost as xgb
+    from sklearn.metrics import roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.backtest_cache')
+
+DATE_COLUMNS = ['origination_date', 'created_at']
+
+# Bins for expected calibration error
+CALIBRATION_BINS = 10
+
+BACKTEST_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 4,
+    'learning_rate': 0.1,
+    'tree_method': 'hist',
+    'objective': 'binary:logistic',
+    'eval_metric': 'auc',
+    'random_state': 42,
+    # Windows already run in parallel processes
+    'n_jobs': 1
+}
+
+
+def load_history(data_path: str, cache_dir: str = DEFAULT_CACHE_DIR, vintage: str = 'month') -> Dict:
+    """
+    Features, labels and vintages sorted by vintage, from cache when possible
+
+    Args:
+        data_path: Training CSV with a date and a default label column
+        cache_dir: Directory for cached matrices (keyed by content hash)
+        vintage: 'month' or 'quarter'
+
+    Returns:
+        Dictionary with paths and memory-mapped arrays
+    """
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    key = f"{digest.hexdigest()[:16]}-v{FEATURE_VERSION}-{vintage}"
+    entry = os.path.join(cache_dir, key)
+    paths = {name: os.path.join(entry, f'{name}.npy') for name in ('features', 'labels', 'periods')}
+
+    if all(os.path.exists(p) for p in paths.values()):
+        print(f"[INFO] Using cached features ({key})")
+    else:
+        df = pd.read_csv(data_path)
+        date_column = next((c for c in DATE_COLUMNS if c in df.columns), None)
+        if date_column is None:
+            raise ValueError(f"No date column found. Expected one of {DATE_COLUMNS}")
+
+        features, labels, _ = training_matrix(df)
+        freq = 'Q' if vintage == 'quarter' else 'M'
+        periods = pd.to_datetime(df[date_column]).dt.to_period(freq).map(lambda p: p.ordinal).to_numpy(dtype=np.int64)
+
+        # Sorting by vintage makes every window a contiguous slice
+        order = np.argsort(periods, kind='stable')
+        os.makedirs(entry, exist_ok=True)
+        for name, values in (('features', features[order]), ('labels', labels[order]), ('periods', periods[order])):
+            tmp = paths[name] + '.tmp.npy'
+            np.save(tmp, values)
+            os.replace(tmp, paths[name])
+        print(f"[INFO] Prepared features for {len(labels)} deals (cached as {key})")
+
+    history = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+    history['paths'] = paths
+    history['freq'] = 'Q' if vintage == 'quarter' else 'M'
+    return history
+
+
+def calibration(y: np.ndarray, probs: np.ndarray, bins: int = CALIBRATION_BINS) -> Dict:
+    """
+    Calibration summary of predicted probabilities
+
+    Returns:
+        Dictionary with mean predicted PD, observed rate, Brier score and ECE
+    """
+    codes = np.minimum((probs * bins).astype(int), bins - 1)
+    counts = np.bincount(codes, minlength=bins)
+    predicted = np.bincount(codes, weights=probs, minlength=bins)
+    observed = np.bincount(codes, weights=y, minlength=bins)
+    ece = float(np.abs(predicted - observed).sum() / max(len(y), 1))
+
+    return {
+        'mean_pd': round(float(probs.mean()), 4),
+        'observed_default_rate': round(float(y.mean()), 4),
+        'brier': round(float(np.mean((probs - y) ** 2)), 4),
+        'ece': round(ece, 4),
+        'populated_bins': int((counts > 0).sum())
+    }
+
+
+# ============================================================
+# Parallel window workers
+# ============================================================
+
+_worker_data = None
+
+
+def _init_worker(paths: Dict[str, str]):
+    """Map the shared matrices once per worker process"""
+    global _worker_data
+    _worker_data = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+def _run_window(window: Dict) -> Dict:
+    """Train on one window's slice and score the following vintage"""
+    X, y = _worker_data['features'], _worker_data['labels']
+    train = slice(window['train_start'], window['train_end'])
+    test = slice(window['test_start'], window['test_end'])
+
+    scaler = StandardScaler().fit(X[train])
+    model = xgb.XGBClassifier(**BACKTEST_PARAMS)
+    model.fit(scaler.transform(X[train]), y[train], verbose=False)
+    probs = model.predict_proba(scaler.transform(X[test]))[:, 1]
+
+    y_test = np.asarray(y[test])
+    auc = float(roc_auc_score(y_test, probs)) if len(np.unique(y_test)) == 2 else None
+    return {**window, 'auc': auc, 'probs': probs}
+
+
+class WalkForwardBacktest:
+    """
+    Walk-forward backtest over origination vintages
+    """
+
+    def __init__(
+        self,
+        window: str = 'expanding',
+        window_months: int = 12,
+        min_train_months: int = 6,
+        min_train_samples: int = 50,
+        workers: int = None
+    ):
+        """
+        Initialize backtest
+
+        Args:
+            window: 'expanding' (all earlier vintages) or 'rolling'
+            window_months: Periods in a rolling window
+            min_train_months: Periods of history before the first scored vintage
+            min_train_samples: Skip vintages whose training window is smaller
+            workers: Window processes (default: one per CPU)
+        """
+        if window not in ('expanding', 'rolling'):
+            raise ValueError(f"Unknown window type: {window}")
+
+        self.window = window
+        self.window_months = window_months
+        self.min_train_months = min_train_months
+        self.min_train_samples = min_train_samples
+        self.workers = workers
+
+    def windows(self, periods: np.ndarray, labels: np.ndarray) -> List[Dict]:
+        """
+        Train/test slices for every scorable vintage
+
+        Args:
+            periods: Sorted vintage ordinal per deal
+            labels: Default labels in the same order
+
+        Returns:
+            List of window dictionaries with row ranges
+        """
+        vintages, starts = np.unique(periods, return_index=True)
+        ends = np.append(starts[1:], len(periods))
+        first = vintages[0] + self.min_train_months
+
+        windows = []
+        for vintage, test_start, test_end in zip(vintages, starts, ends):
+            if vintage < first:
+                continue
+            lower = vintages[0] if self.window == 'expanding' else vintage - self.window_months
+            train_start = int(np.searchsorted(periods, lower, side='left'))
+            train_end = int(test_start)
+
+            train_labels = labels[train_start:train_end]
+            if len(train_labels) < self.min_train_samples or len(np.unique(train_labels)) < 2:
+                continue
+
+            windows.append({
+                'vintage_ordinal': int(vintage),
+                'train_start': train_start,
+                'train_end': train_end,
+                'test_start': int(test_start),
+                'test_end': int(test_end)
+            })
+        return windows
+
+    def run(self, history: Dict) -> Dict:
+        """
+        Run every window in parallel and summarize per vintage
+
+        Args:
+            history: Output of load_history
+
+        Returns:
+            Dictionary with per-vintage and pooled results
+        """
+        if not HAS_ML_LIBS:
+            raise ImportError("Backtesting requires xgboost and scikit-learn. Install with: pip install xgboost scikit-learn")
+
+        labels, periods = history['labels'], history['periods']
+        windows = self.windows(np.asarray(periods), np.asarray(labels))
+        if not windows:
+            raise ValueError("No vintage has enough earlier history; lower --min-train-months")
+
+        print(f"[INFO] Backtesting {len(windows)} vintages ({self.window} window)...")
+        started = time.time()
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(history['paths'],)
+        ) as pool:
+            results = list(pool.map(_run_window, windows))
+        elapsed = time.time() - started
+
+        vintages = []
+        pooled_y, pooled_probs = [], []
+        for result in results:
+            y_test = np.asarray(labels[result['test_start']:result['test_end']])
+            pooled_y.append(y_test)
+            pooled_probs.append(result['probs'])
+            vintages.append({
+                'vintage': str(pd.Period(ordinal=result['vintage_ordinal'], freq=history['freq'])),
+                'train_samples': result['train_end'] - result['train_start'],
+                'test_samples': result['test_end'] - result['test_start'],
+                'defaults': int(y_test.sum()),
+                'auc': round(result['auc'], 4) if result['auc'] is not None else None,
+                **calibration(y_test, result['probs'])
+            })
+
+        pooled_y = np.concatenate(pooled_y)
+        pooled_probs = np.concatenate(pooled_probs)
+        aucs = [v['auc'] for v in vintages if v['auc'] is not None]
+
+        return {
+            'window': self.window,
+            'window_months': self.window_months if self.window == 'rolling' else None,
+            'vintages': vintages,
+            'pooled': {
+                'samples': int(len(pooled_y)),
+                'auc': round(float(roc_auc_score(pooled_y, pooled_probs)), 4) if len(np.unique(pooled_y)) == 2 else None,
+                'mean_vintage_auc': round(float(np.mean(aucs)), 4) if aucs else None,
+                **calibration(pooled_y, pooled_probs)
+            },
+            'elapsed_seconds': round(elapsed, 2)
+        }
+
+
+def main():
+    """Run a walk-forward backtest"""
+    parser = argparse.ArgumentParser(
+        description='Walk-forward backtest by origination vintage'
+    )
+    parser.add_argument(
+        '--data',
+        type=str,
+        required=True,
+        help='Training CSV with a date and a default label column'
+    )
+    parser.add_argument(
+        '--window',
+        type=str,
+        default='expanding',
+        choices=['expanding', 'rolling'],
+        help='Training window type (default: expanding)'
+    )
+    parser.add_argument(
+        '--window-months',
+        type=int,
+        default=12,
+        help='Periods in a rolling window (default: 12)'
+    )
+    parser.add_argument(
+        '--min-train-months',
+        type=int,
+        default=6,
+        help='Periods of history before the first scored vintage (default: 6)'
+    )
+    parser.add_argument(
+        '--vintage',
+        type=str,
+        default='month',
+        choices=['month', 'quarter'],
+        help='Vintage granularity (default: month)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Window processes (default: one per CPU)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help='Feature matrix cache directory (default: ml/.backtest_cache)'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Path to save the JSON report (optional)'
+    )
+
+    args = parser.parse_args()
+
+    history = load_history(args.data, cache_dir=args.cache_dir, vintage=args.vintage)
+    backtest = WalkForwardBacktest(
+        window=args.window,
+        window_months=args.window_months,
+        min_train_months=args.min_train_months,
+        workers=args.workers
+    )
+    report = backtest.run(history)
+
+    print("\n" + "="*72)
+    print("WALK-FORWARD BACKTEST")
+    print("="*72)
+    print(f"{'vintage':>9s} {'train':>6s} {'test':>5s} {'dflt':>5s} {'AUC':>7s} {'PD':>7s} {'actual':>7s} {'ECE':>7s}")
+    for v in report['vintages']:
+        auc = f"{v['auc']:.4f}" if v['auc'] is not None else 'n/a'
+        print(f"{v['vintage']:>9s} {v['train_samples']:6d} {v['test_samples']:5d} {v['defaults']:5d} "
+              f"{auc:>7s} {v['mean_pd']:7.4f} {v['observed_default_rate']:7.4f} {v['ece']:7.4f}")
+    pooled = report['pooled']
+    print("="*72)
+    print(f"Pooled AUC:       {pooled['auc']}")
+    print(f"Mean vintage AUC: {pooled['mean_vintage_auc']}")
+    print(f"Brier / ECE:      {pooled['brier']:.4f} / {pooled['ece']:.4f}")
+    print(f"[INFO] {len(report['vintages'])} windows in {report['elapsed_seconds']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Cascade Scoring
+===============
+Scores clearly low- and clearly high-risk deals with a few-tree screening
+model and sends only the ambiguous middle band to the full model.
+
+- The screening model is a small XGBoost regressor distilled from the
+  full model: it is fit to the full model's margin on representative
+  deals, so its PDs are on the full model's scale
+- Deals with a screening PD below `low` or at or above `high` return
+  early; the rest are scored by the full model
+- Tuning fits each candidate screening size on half of the deals and
+  picks the band on the other half that short-circuits the most deals
+  while at most `max_disagreement` of all deals get a different risk
+  level, or a risk score more than `score_tolerance` points off, than
+  the full model would give them, with that rate bounded at 95%
+  confidence. Candidates are compared by measured scoring time per deal
+  (median over repeated runs of at least TIMING_ROWS deals, each
+  timed back to back with the full model)
+- When no candidate beats full scoring by at least `min_saving`, tuning
+  returns None and no cascade is stored; enable_cascade() refuses
+  settings that do not save time
+
+Settings are stored in the model artifact under 'cascade'.
+RiskAssessmentModel.enable_cascade() turns the mode on for batch scoring.
+The cascade is not applied to single-deal scoring because per-call overhead
+outweighs tree evaluation there.
+
+Usage:
+    python cascade.py --model risk_model_trained.pkl --data ../data/historical_deals.csv --save
+    python risk_model_api.py '[{"loan_amount": 5000000, ...}, ...]' --cascade
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sampling import correct_probabilities
+
+# Screening model sizes (trees, depth) tried when tuning
+DEFAULT_STAGES = [(10, 4), (20, 4), (20, 6)]
+
+# Share of all deals allowed to disagree with the full model
+DEFAULT_MAX_DISAGREEMENT = 0.01
+
+# Risk score points a short-circuited deal may differ by and still agree
+DEFAULT_SCORE_TOLERANCE = 5
+
+# Candidate thresholds per side (quantiles of the screening PD)
+DEFAULT_GRID_POINTS = 200
+
+# Upper bounds of the risk levels (same cut-offs as _get_risk_level)
+LEVEL_BOUNDS = [30, 50, 70]
+
+# Confidence that the disagreement rate on new deals stays within bounds
+DEFAULT_CONFIDENCE = 0.95
+
+# High threshold meaning "no high-side cut" (PDs never reach it)
+NO_CUT = 2.0
+
+# Share of full-model scoring time a cascade must save to be used
+DEFAULT_MIN_SAVING = 0.1
+
+# Timed runs per candidate (median taken) and deals per run (tuning rows are repeated up to it)
+DEFAULT_TIMING_RUNS = 9
+TIMING_ROWS = 20000
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-margin))
+
+
+def _scores(probs: np.ndarray) -> np.ndarray:
+    return (np.asarray(probs, dtype=float) * 100).astype(int)
+
+
+def _disagrees(stage_probs: np.ndarray, full_probs: np.ndarray, score_tolerance: int) -> np.ndarray:
+    """Deals whose screening result differs in risk level or by more than the tolerance"""
+    stage, full = _scores(stage_probs), _scores(full_probs)
+    levels_differ = np.searchsorted(LEVEL_BOUNDS, stage, side='right') != np.searchsorted(LEVEL_BOUNDS, full, side='right')
+    return levels_differ | (np.abs(stage - full) > score_tolerance)
+
+
+def _seconds(run) -> float:
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def _median_seconds(run, runs: int = DEFAULT_TIMING_RUNS) -> float:
+    """Median wall time of run() over several calls, after one warm-up call"""
+    run()
+    return float(np.median([_seconds(run) for _ in range(runs)]))
+
+
+def _relative_cost(cascade_run, full_run, runs: int = DEFAULT_TIMING_RUNS) -> float:
+    """
+    Median ratio of cascade to full scoring time
+
+    The two are timed back to back in each run, so drift in machine load
+    between runs affects both sides of a ratio alike.
+    """
+    cascade_run()
+    full_run()
+    return float(np.median([_seconds(cascade_run) / _seconds(full_run) for _ in range(runs)]))
+
+
+def saves_time(settings: Dict) -> bool:
+    """Whether tuned settings beat full scoring by their required margin"""
+    if not settings:
+        return False
+    return settings['relative_cost'] <= 1 - settings.get('min_saving', DEFAULT_MIN_SAVING)
+
+
+def fit_screening_model(X_scaled: np.ndarray, full_margin: np.ndarray, trees: int, depth: int, seed: int = 42):
+    """
+    Distill the full model into a few-tree regressor on its margin
+
+    Args:
+        X_scaled: Scaled features of representative deals
+        full_margin: Full model's raw margin on those deals
+        trees: Screening model trees
+        depth: Screening model tree depth
+        seed: Random seed
+
+    Returns:
+        Fitted XGBRegressor predicting the full model's margin
+    """
+    import xgboost as xgb
+
+    screening = xgb.XGBRegressor(
+        n_estimators=trees,
+        max_depth=depth,
+        learning_rate=0.3,
+        random_state=seed
+    )
+    screening.fit(X_scaled, full_margin)
+    return screening
+
+
+def disagreement_budget(n: int, max_disagreement: float, confidence: float = DEFAULT_CONFIDENCE) -> int:
+    """
+    Most disagreements allowed among n tuning deals
+
+    The largest count whose Clopper-Pearson upper confidence bound on the
+    disagreement rate is still within max_disagreement, so a band tuned on
+    a small sample is not tighter than it can support.
+
+    Returns:
+        Allowed disagreements, or -1 when even none is not enough evidence
+    """
+    from scipy.stats import beta
+
+    counts = np.arange(int(np.ceil(max_disagreement * n)) + 1)
+    upper = beta.ppf(confidence, counts + 1, np.maximum(n - counts, 1))
+    allowed = counts[upper <= max_disagreement]
+    return int(allowed.max()) if len(allowed) else -1
+
+
+def _best_band(stage_probs: np.ndarray, disagree: np.ndarray, budget: int, grid_points: int):
+    """
+    Thresholds (low, high) short-circuiting the most deals within the budget
+
+    Deals below low are short-circuited low and deals at or above high
+    are short-circuited high; disagreements on both sides count against
+    one budget.
+    """
+    if budget < 0:
+        return 0.0, NO_CUT, 0, 0
+
+    candidates = np.unique(np.quantile(stage_probs, np.linspace(0, 1, grid_points + 1)))
+    candidates = np.concatenate([candidates, [NO_CUT]])
+    order = np.argsort(stage_probs, kind='stable')
+    ranked = stage_probs[order]
+    errors = np.concatenate([[0], np.cumsum(disagree[order])])
+
+    # Deals and disagreements below each candidate (low side) and at or above it (high side)
+    below = np.searchsorted(ranked, candidates, side='left')
+    low_errors = errors[below]
+    above = len(ranked) - below
+    high_errors = errors[-1] - errors[below]
+
+    # Every (low, high) pair with low <= high, at once
+    total = below[:, None] + above[None, :]
+    cost = low_errors[:, None] + high_errors[None, :]
+    feasible = (cost <= budget) & (candidates[:, None] <= candidates[None, :])
+    total = np.where(feasible, total, -1)
+    i, j = np.unravel_index(np.argmax(total), total.shape)
+    return float(candidates[i]), float(candidates[j]), int(total[i, j]), int(cost[i, j])
+
+
+def tune_cascade(
+    model,
+    X_scaled: np.ndarray,
+    stages: List[Tuple[int, int]] = None,
+    max_disagreement: float = DEFAULT_MAX_DISAGREEMENT,
+    score_tolerance: int = DEFAULT_SCORE_TOLERANCE,
+    prior_correction: float = None,
+    grid_points: int = DEFAULT_GRID_POINTS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    min_saving: float = DEFAULT_MIN_SAVING,
+    timing_runs: int = DEFAULT_TIMING_RUNS,
+    seed: int = 42
+) -> Optional[Dict]:
+    """
+    Fit a screening model and tune its band against the full model's scores
+
+    Labels are not needed: agreement is measured against the full model.
+
+    Args:
+        model: Fitted XGBClassifier
+        X_scaled: Scaled features of representative deals
+        stages: Screening sizes (trees, depth) to try (default: DEFAULT_STAGES)
+        max_disagreement: Share of deals allowed to disagree with the full model
+        score_tolerance: Risk score points a short-circuited deal may be off by
+        prior_correction: Artifact's prior-mode sampling rate, applied to both stages
+        grid_points: Candidate thresholds per side
+        confidence: Confidence of the disagreement bound (see disagreement_budget)
+        min_saving: Share of full-model scoring time the best candidate must save
+        timing_runs: Timed runs per candidate (the median is used)
+        seed: Random seed for the fit/tune split and the screening models
+
+    Returns:
+        Settings dictionary stored in model artifacts under 'cascade'
+        (the fitted screening model under 'screening_model'), or None when
+        no candidate saves at least min_saving
+    """
+    def to_probs(margin):
+        probs = _sigmoid(margin)
+        return correct_probabilities(probs, prior_correction) if prior_correction else probs
+
+    X_scaled = np.asarray(X_scaled, dtype=np.float32)
+    full_margin = model.predict(X_scaled, output_margin=True).astype(float)
+
+    # Screening models are fit on one half and the band is tuned on the other
+    rows = np.random.default_rng(seed).permutation(len(X_scaled))
+    fit_rows, tune_rows = rows[:len(rows) // 2], rows[len(rows) // 2:]
+    X_tune = X_scaled[tune_rows]
+    full_probs = to_probs(full_margin[tune_rows])
+    budget = disagreement_budget(len(tune_rows), max_disagreement, confidence)
+
+    # Time on the tuning rows repeated up to TIMING_ROWS so per-call overhead does not dominate
+    repeats = int(np.ceil(TIMING_ROWS / max(len(tune_rows), 1)))
+    X_timing = np.tile(X_tune, (repeats, 1))
+
+    candidates, screening_models = [], []
+    for trees, depth in stages or DEFAULT_STAGES:
+        screening = fit_screening_model(X_scaled[fit_rows], full_margin[fit_rows], trees, depth, seed)
+        stage_probs = to_probs(screening.predict(X_tune).astype(float))
+        disagree = _disagrees(stage_probs, full_probs, score_tolerance)
+        low, high, short_circuited, disagreements = _best_band(stage_probs, disagree, budget, grid_points)
+
+        # Time the cascade itself: screening on every deal, the full model on the band
+        ambiguous = np.tile((stage_probs >= low) & (stage_probs < high), repeats)
+
+        def cascade_pass():
+            screening.predict(X_timing)
+            if ambiguous.any():
+                model.predict_proba(X_timing[ambiguous])
+
+        relative_cost = _relative_cost(cascade_pass, lambda: model.predict_proba(X_timing), timing_runs)
+
+        rate = short_circuited / len(tune_rows)
+        candidates.append({
+            'trees': trees,
+            'depth': depth,
+            'low': low,
+            'high': high,
+            'short_circuit_rate': round(rate, 4),
+            'disagreement': round(disagreements / len(tune_rows), 4),
+            # Measured cost relative to scoring every deal with the full model
+            'relative_cost': round(relative_cost, 3)
+        })
+        screening_models.append(screening)
+
+    best = int(np.argmin([c['relative_cost'] for c in candidates]))
+    if candidates[best]['relative_cost'] > 1 - min_saving:
+        print(f"[INFO] No cascade: best candidate ({candidates[best]['trees']} trees, depth "
+              f"{candidates[best]['depth']}) costs {candidates[best]['relative_cost']:.2f}x full scoring, "
+              f"needs at most {1 - min_saving:.2f}x")
+        return None
+    return {
+        **candidates[best],
+        'screening_model': screening_models[best],
+        'max_disagreement': max_disagreement,
+        'confidence': confidence,
+        'score_tolerance': score_tolerance,
+        'prior_correction': prior_correction,
+        'min_saving': min_saving,
+        'rows': int(len(X_scaled)),
+        'candidates': candidates,
+        'tuned_at': datetime.now().isoformat()
+    }
+
+
+class CascadeScorer:
+    """
+    Applies tuned cascade settings and counts short-circuited deals
+    """
+
+    def __init__(self, settings: Dict):
+        """
+        Args:
+            settings: Output of tune_cascade
+        """
+        self.settings = settings
+        self.stats = {'scored': 0, 'short_circuited_low': 0, 'short_circuited_high': 0, 'full_model': 0}
+
+    def predict_proba(self, model, X_scaled: np.ndarray) -> np.ndarray:
+        """
+        Default probabilities, with only the ambiguous band scored by every tree
+
+        Returns:
+            Raw (uncorrected) probabilities, like model.predict_proba[:, 1]
+        """
+        settings = self.settings
+        X_scaled = np.asarray(X_scaled, dtype=np.float32)
+        probs = _sigmoid(settings['screening_model'].predict(X_scaled).astype(float))
+
+        # The band is defined on corrected PDs; compare on the same scale
+        observed = correct_probabilities(probs, settings['prior_correction']) if settings['prior_correction'] else probs
+        low, high = observed < settings['low'], observed >= settings['high']
+        ambiguous = np.flatnonzero(~(low | high))
+        if len(ambiguous):
+            probs[ambiguous] = model.predict_proba(X_scaled[ambiguous])[:, 1]
+
+        self.stats['scored'] += len(probs)
+        self.stats['short_circuited_low'] += int(low.sum())
+        self.stats['short_circuited_high'] += int(high.sum())
+        self.stats['full_model'] += len(ambiguous)
+        return probs
+
+    def report(self) -> Dict:
+        """Counts so far and the share of deals short-circuited"""
+        scored = self.stats['scored']
+        short_circuited = self.stats['short_circuited_low'] + self.stats['short_circuited_high']
+        return {
+            **self.stats,
+            'short_circuit_rate': round(short_circuited / scored, 4) if scored else None,
+            'screening_model': f"{self.settings['trees']} trees, depth {self.settings['depth']}",
+            'band': [self.settings['low'], self.settings['high']],
+            'tuned_short_circuit_rate': self.settings['short_circuit_rate'],
+            'tuned_disagreement': self.settings['disagreement']
+        }
+
+
+def print_tuning(settings: Optional[Dict]):
+    """Print the candidate screening models and the chosen band"""
+    if settings is None:
+        print("\nCascade Tuning: no screening model saves time; batches are scored by the full model")
+        return
+    print(f"\nCascade Tuning ({settings['rows']} deals, max disagreement {settings['max_disagreement']:.1%}, "
+          f"tolerance {settings['score_tolerance']} points):")
+    print(f"  {'trees':>5s} {'depth':>5s} {'low':>7s} {'high':>7s} {'short-circuit':>13s} {'disagree':>8s} {'cost':>6s}")
+    for c in settings['candidates']:
+        marker = ' *' if (c['trees'], c['depth']) == (settings['trees'], settings['depth']) else ''
+        print(f"  {c['trees']:5d} {c['depth']:5d} {c['low']:7.4f} {c['high']:7.4f} {c['short_circuit_rate']:13.2%} "
+              f"{c['disagreement']:8.2%} {c['relative_cost']:6.2f}{marker}")
+
+
+def save_to_artifact(path: str, settings: Dict):
+    """Store cascade settings in a model artifact under 'cascade'"""
+    with open(path, 'rb') as f:
+        model_data = pickle.load(f)
+    model_data['cascade'] = settings
+
+    # Write then rename so a reader never sees a partial artifact
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    """Tune cascade settings for a model artifact on a deal file"""
+    import pandas as pd
+    from risk_model import RiskAssessmentModel
+
+    parser = argparse.ArgumentParser(description='Tune cascade scoring for a risk model')
+    parser.add_argument('--model', type=str, required=True, help='Model artifact (six-feature scoring layout)')
+    parser.add_argument('--data', type=str, required=True, help='CSV of representative deals (labels not needed)')
+    parser.add_argument(
+        '--max-disagreement',
+        type=float,
+        default=DEFAULT_MAX_DISAGREEMENT,
+        help=f'Share of deals allowed to disagree with the full model (default: {DEFAULT_MAX_DISAGREEMENT})'
+    )
+    parser.add_argument(
+        '--score-tolerance',
+        type=int,
+        default=DEFAULT_SCORE_TOLERANCE,
+        help=f'Risk score points a short-circuited deal may be off by (default: {DEFAULT_SCORE_TOLERANCE})'
+    )
+    parser.add_argument(
+        '--stages',
+        type=str,
+        default=','.join(f'{t}x{d}' for t, d in DEFAULT_STAGES),
+        help=f'Comma-separated screening sizes TREESxDEPTH to try (default: '
+             f'{",".join(f"{t}x{d}" for t, d in DEFAULT_STAGES)})'
+    )
+    parser.add_argument(
+        '--min-saving',
+        type=float,
+        default=DEFAULT_MIN_SAVING,
+        help=f'Share of full scoring time a cascade must save to be used (default: {DEFAULT_MIN_SAVING})'
+    )
+    parser.add_argument('--save', action='store_true', help='Store the settings in the model artifact')
+
+    args = parser.parse_args()
+
+    model = RiskAssessmentModel(args.model)
+    features = model.prepare_features_batch(pd.read_csv(args.data))
+    X_scaled = model.scaler.transform(features)
+
+    settings = tune_cascade(
+        model.model, X_scaled,
+        stages=[tuple(int(v) for v in stage.split('x')) for stage in args.stages.split(',')],
+        max_disagreement=args.max_disagreement,
+        score_tolerance=args.score_tolerance,
+        prior_correction=model.prior_correction,
+        min_saving=args.min_saving
+    )
+    print_tuning(settings)
+
+    if settings is None:
+        # Clear stale settings so enable_cascade() does not pick them up
+        if args.save and model.cascade_settings is not None:
+            save_to_artifact(args.model, None)
+            print(f"[INFO] Cascade settings removed from {args.model}")
+        return
+
+    # Time both modes on the same deals
+    full = model._corrected(model.model.predict_proba(X_scaled)[:, 1])
+    full_seconds = _median_seconds(lambda: model.model.predict_proba(X_scaled))
+    scorer = CascadeScorer(settings)
+    cascaded = model._corrected(scorer.predict_proba(model.model, X_scaled))
+    cascade_seconds = _median_seconds(lambda: CascadeScorer(settings).predict_proba(model.model, X_scaled))
+
+    disagreement = _disagrees(cascaded, full, settings['score_tolerance']).mean()
+    print(f"\n[INFO] Full model {full_seconds * 1000:.1f} ms, cascade {cascade_seconds * 1000:.1f} ms "
+          f"on {len(full)} deals (median of {DEFAULT_TIMING_RUNS} runs); disagreement {disagreement:.2%}")
+    print(json.dumps(scorer.report(), indent=2))
+
+    if args.save:
+        save_to_artifact(args.model, settings)
+        print(f"[INFO] Cascade settings stored in {args.model}")
+
+
+if __name__ == '__main__':
+    main()
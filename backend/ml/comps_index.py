@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Comparable Deals Index
+======================
+Nearest historical deals, with their outcomes, for deals being scored.
+
+Historical deals are placed in the model's scaled feature space (the
+MODEL_FEATURES matrix through the artifact's fitted StandardScaler) and
+indexed with a KD-tree. A batch of deals is answered with one tree query,
+and comps come back with their distance, outcome and features.
+
+The index is saved next to the model artifact as <model>_comps.pkl.
+RiskAssessmentModel.find_comps loads it on first use.
+
+Usage:
+    python comps_index.py --model risk_model_trained.pkl --data ../data/historical_deals.csv
+    python comps_index.py --model risk_model_trained.pkl --query deals.json --k 20
+    python risk_model_api.py '{"loan_amount": 5000000, ...}' --comps 20
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from risk_model import MODEL_FEATURES, deals_to_frame, derive_features, model_feature_matrix
+from segmented_model import LABEL_COLUMNS
+
+DEFAULT_K = 20
+
+# Points per KD-tree leaf; larger leaves build faster, smaller query faster
+DEFAULT_LEAF_SIZE = 40
+
+ID_COLUMNS = ['deal_id', 'id']
+
+# Returned with each comp when present in the history
+CONTEXT_COLUMNS = ['asset_type', 'property_type', 'created_at', 'origination_date']
+
+
+def comps_path(model_path: str) -> str:
+    """Comps index file kept alongside a model artifact"""
+    return os.path.splitext(model_path)[0] + '_comps.pkl'
+
+
+class CompsIndex:
+    """
+    KD-tree over historical deals in the model's scaled feature space
+    """
+
+    def __init__(
+        self,
+        features: np.ndarray,
+        outcomes: np.ndarray,
+        scaler,
+        deal_ids: np.ndarray = None,
+        context: Dict[str, np.ndarray] = None,
+        leaf_size: int = DEFAULT_LEAF_SIZE
+    ):
+        """
+        Build the index
+
+        Args:
+            features: Unscaled MODEL_FEATURES matrix of historical deals
+            outcomes: Default outcome per deal (0/1)
+            scaler: Fitted StandardScaler from the model artifact
+            deal_ids: Id per deal (default: row number)
+            context: Extra per-deal columns returned with comps
+            leaf_size: KD-tree leaf size
+        """
+        started = time.perf_counter()
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+        self.tree = KDTree((np.asarray(features, dtype=float) - self.mean) / self.scale, leaf_size=leaf_size)
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.deal_ids = None if deal_ids is None else np.asarray(deal_ids).astype(str).astype(np.bytes_)
+        self.context = {name: np.asarray(values).astype(str).astype(np.bytes_) for name, values in (context or {}).items()}
+        self.built_at = datetime.now().isoformat()
+        self.build_seconds = round(time.perf_counter() - started, 3)
+
+    def __len__(self) -> int:
+        return len(self.outcomes)
+
+    @classmethod
+    def from_history(cls, history: pd.DataFrame, scaler, leaf_size: int = DEFAULT_LEAF_SIZE) -> 'CompsIndex':
+        """
+        Build from raw historical deals (any layout prepare_features_batch accepts)
+
+        Args:
+            history: Deals with a default label column
+            scaler: Fitted StandardScaler from the model artifact
+            leaf_size: KD-tree leaf size
+        """
+        label = next((c for c in LABEL_COLUMNS if c in history.columns), None)
+        if label is None:
+            raise ValueError(f"No label column found. Expected one of {LABEL_COLUMNS}")
+
+        frame = deals_to_frame(history)
+        id_column = next((c for c in ID_COLUMNS if c in history.columns), None)
+        return cls(
+            model_feature_matrix(frame, derive_features(frame)),
+            history[label].to_numpy(dtype=int),
+            scaler,
+            deal_ids=history[id_column].to_numpy() if id_column else None,
+            context={c: history[c].to_numpy() for c in CONTEXT_COLUMNS if c in history.columns},
+            leaf_size=leaf_size
+        )
+
+    def query(self, features: np.ndarray, k: int = DEFAULT_K):
+        """
+        Nearest historical deals for a batch
+
+        Args:
+            features: Unscaled MODEL_FEATURES matrix (n_deals x 6)
+            k: Comps per deal
+
+        Returns:
+            Tuple of (distances, row indices), each n_deals x k, nearest first
+        """
+        k = min(k, len(self))
+        scaled = (np.asarray(features, dtype=float) - self.mean) / self.scale
+        return self.tree.query(scaled, k=k)
+
+    def comps(self, features: np.ndarray, k: int = DEFAULT_K) -> List[Dict]:
+        """
+        Comps with outcomes for a batch of prepared deals
+
+        Args:
+            features: Unscaled MODEL_FEATURES matrix (n_deals x 6)
+            k: Comps per deal
+
+        Returns:
+            Per deal: {'k', 'default_rate', 'comps': [...]}; each comp has
+            deal_id, distance, defaulted, its features and context columns
+        """
+        distances, rows = self.query(features, k)
+
+        # Features are recovered from the tree's scaled copy; nothing else is stored
+        data = np.asarray(self.tree.get_arrays()[0])
+        values = data[rows] * self.scale + self.mean
+        ids = (rows.astype(str) if self.deal_ids is None else self.deal_ids[rows].astype(str)).tolist()
+        outcomes = self.outcomes[rows]
+        context = {name: column[rows].astype(str).tolist() for name, column in self.context.items()}
+
+        results = []
+        for i in range(len(rows)):
+            comps = []
+            for j in range(rows.shape[1]):
+                comp = {
+                    'deal_id': ids[i][j],
+                    'distance': round(float(distances[i, j]), 4),
+                    'defaulted': bool(outcomes[i, j])
+                }
+                comp.update(zip(MODEL_FEATURES, values[i, j].round(4).tolist()))
+                comp.update((name, column[i][j]) for name, column in context.items())
+                comps.append(comp)
+            results.append({
+                'k': len(comps),
+                'default_rate': round(float(outcomes[i].mean()), 4),
+                'comps': comps
+            })
+        return results
+
+    def save(self, path: str):
+        """Write the index (atomically) next to its model"""
+        # Attributes only, so the file loads whether this ran as a script or a module
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompsIndex':
+        index = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+
+def build_for_model(model_path: str, history: pd.DataFrame, leaf_size: int = DEFAULT_LEAF_SIZE) -> str:
+    """
+    Build and save the comps index for a model artifact
+
+    Returns:
+        Path of the saved index
+    """
+    with open(model_path, 'rb') as f:
+        scaler = pickle.load(f)['scaler']
+    index = CompsIndex.from_history(history, scaler, leaf_size=leaf_size)
+    path = comps_path(model_path)
+    index.save(path)
+    print(f"[INFO] Comps index over {len(index)} deals built in {index.build_seconds:.2f}s: {path}")
+    return path
+
+
+def main():
+    """Build a model's comps index or query it"""
+    parser = argparse.ArgumentParser(description='Comparable historical deals index')
+    parser.add_argument('--model', type=str, required=True, help='Model artifact whose scaler defines the space')
+    parser.add_argument('--data', type=str, default=None, help='Labeled history CSV to build the index from')
+    parser.add_argument('--query', type=str, default=None, help='JSON file of deals (object or list) to find comps for')
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help=f'Comps per deal (default: {DEFAULT_K})')
+    parser.add_argument(
+        '--leaf-size',
+        type=int,
+        default=DEFAULT_LEAF_SIZE,
+        help=f'KD-tree leaf size (default: {DEFAULT_LEAF_SIZE})'
+    )
+
+    args = parser.parse_args()
+
+    if not args.data and not args.query:
+        parser.error('Provide --data to build, --query to search, or both')
+
+    if args.data:
+        build_for_model(args.model, pd.read_csv(args.data), leaf_size=args.leaf_size)
+
+    if args.query:
+        with open(args.query) as f:
+            deals = json.load(f)
+        deals = deals if isinstance(deals, list) else [deals]
+        index = CompsIndex.load(comps_path(args.model))
+        frame = deals_to_frame(deals)
+        print(json.dumps(index.comps(model_feature_matrix(frame, derive_features(frame)), args.k), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Counterfactual Search
+=====================
+Answers "what is the smallest change that would bring this deal down to
+a target risk level?" over the six model features.
+
+- Mutable features move only in their improving direction and stay within
+  FEATURE_BOUNDS; immutable features (property age) never change
+- Each round scores thousands of perturbed candidates in one batched
+  predict_proba call: first single-feature sweeps, then random sparse
+  combinations biased towards small changes
+- Returns the Pareto set of successful changes (no other candidate changes
+  every feature by less), ordered by normalized cost
+- Search stops at a per-deal time budget so it can run interactively
+
+Usage:
+    python counterfactuals.py '{"loan_amount": 9000000, "requested_ltv": 85}' --target moderate
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from risk_model import (
+    MODEL_FEATURES,
+    RISK_LEVELS,
+    RISK_LEVEL_THRESHOLDS,
+    RiskAssessmentModel,
+    get_model,
+    risk_level_codes
+)
+
+# Plausible range of each model feature
+FEATURE_BOUNDS = {
+    'loan_amount': (100_000.0, 100_000_000.0),
+    'ltv': (0.20, 0.95),
+    'dscr': (0.50, 3.00),
+    'borrower_credit_score': (300.0, 850.0),
+    'occupancy_rate': (0.0, 1.0),
+    'property_age': (0.0, 150.0)
+}
+
+# Direction in which each feature may move to improve a deal (+1 up, -1 down)
+IMPROVING_DIRECTIONS = {
+    'loan_amount': -1,
+    'ltv': -1,
+    'dscr': 1,
+    'borrower_credit_score': 1,
+    'occupancy_rate': 1
+}
+
+IMMUTABLE_FEATURES = {'property_age'}
+
+# Smallest change worth suggesting; candidate moves are rounded to these
+FEATURE_STEPS = {
+    'loan_amount': 1000.0,
+    'ltv': 0.005,
+    'dscr': 0.01,
+    'borrower_credit_score': 1.0,
+    'occupancy_rate': 0.01,
+    'property_age': 1.0
+}
+
+# Candidates per random round and steps per single-feature sweep
+ROUND_SIZE = 2048
+SWEEP_STEPS = 64
+
+
+class CounterfactualSearch:
+    """
+    Time-budgeted counterfactual search over the risk model
+    """
+
+    def __init__(
+        self,
+        model: RiskAssessmentModel = None,
+        target_level: str = 'moderate',
+        time_budget_ms: float = 200.0,
+        immutable: set = None,
+        max_results: int = 10,
+        seed: int = 42
+    ):
+        """
+        Initialize search
+
+        Args:
+            model: Risk model (default: global model)
+            target_level: Highest acceptable risk level after the change
+            time_budget_ms: Search time per deal
+            immutable: Features that may not change (default: IMMUTABLE_FEATURES)
+            max_results: Counterfactuals returned per deal
+            seed: Random seed for reproducible candidates
+        """
+        if target_level not in RISK_LEVELS:
+            raise ValueError(f"Unknown risk level: {target_level}")
+
+        self.model = model or get_model()
+        if self.model.model is None:
+            raise ValueError("Counterfactual search requires a trained model")
+
+        self.target_level = target_level
+        self.time_budget = time_budget_ms / 1000.0
+        self.immutable = IMMUTABLE_FEATURES if immutable is None else set(immutable)
+        self.max_results = max_results
+        self.seed = seed
+
+        # Highest score still within the target level
+        level = RISK_LEVELS.index(target_level)
+        self.max_score = RISK_LEVEL_THRESHOLDS[level] - 1 if level < len(RISK_LEVEL_THRESHOLDS) else 100
+
+        self.mutable = [
+            j for j, name in enumerate(MODEL_FEATURES)
+            if name not in self.immutable and name in IMPROVING_DIRECTIONS
+        ]
+        self.lower = np.array([FEATURE_BOUNDS[f][0] for f in MODEL_FEATURES])
+        self.upper = np.array([FEATURE_BOUNDS[f][1] for f in MODEL_FEATURES])
+        self.direction = np.array([IMPROVING_DIRECTIONS.get(f, 0) for f in MODEL_FEATURES])
+        self.step = np.array([FEATURE_STEPS[f] for f in MODEL_FEATURES])
+
+        # Cost of a change is measured in training standard deviations when
+        # the artifact carries them, otherwise in quarters of the bound range
+        reference = getattr(self.model.drift_monitor, 'reference', None)
+        if reference is not None:
+            self.scale = np.array([reference['features'][f]['std'] or 1.0 for f in MODEL_FEATURES])
+        else:
+            self.scale = (self.upper - self.lower) / 4
+
+    def _snap(self, candidates: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Round moves to FEATURE_STEPS so negligible changes become no change"""
+        moved = x + np.round((candidates - x) / self.step) * self.step
+        return np.clip(moved, np.minimum(self.lower, x), np.maximum(self.upper, x))
+
+    def _scores(self, candidates: np.ndarray) -> np.ndarray:
+        probs = self.model.predict_proba_batch(candidates)
+        return np.floor(probs * 100).astype(int)
+
+    def _headroom(self, x: np.ndarray) -> np.ndarray:
+        """Largest allowed move of each feature in its improving direction"""
+        room = np.where(self.direction > 0, self.upper - x, x - self.lower)
+        mutable_mask = np.zeros(len(x), dtype=bool)
+        mutable_mask[self.mutable] = True
+        return np.where(mutable_mask, np.maximum(room, 0.0), 0.0)
+
+    def _sweep(self, x: np.ndarray, headroom: np.ndarray) -> np.ndarray:
+        """Single-feature candidates at evenly spaced steps"""
+        steps = np.linspace(0, 1, SWEEP_STEPS + 1)[1:]
+        candidates = []
+        for j in self.mutable:
+            block = np.repeat(x[None, :], SWEEP_STEPS, axis=0)
+            block[:, j] = x[j] + self.direction[j] * headroom[j] * steps
+            candidates.append(block)
+        return self._snap(np.vstack(candidates), x) if candidates else np.empty((0, len(x)))
+
+    def _random_round(self, x: np.ndarray, headroom: np.ndarray, rng) -> np.ndarray:
+        """Random sparse candidates (2-3 features each), most of them small moves"""
+        mutable = np.array(self.mutable)
+        n_changed = rng.integers(2, min(3, len(mutable)) + 1, size=ROUND_SIZE)
+
+        # A random permutation rank per feature picks n_changed features per row
+        ranks = rng.random((ROUND_SIZE, len(mutable))).argsort(axis=1).argsort(axis=1)
+        active = np.zeros((ROUND_SIZE, len(x)), dtype=bool)
+        active[:, mutable] = ranks < n_changed[:, None]
+
+        magnitude = rng.random((ROUND_SIZE, len(x))) ** 2 * headroom
+        return self._snap(x + np.where(active, self.direction * magnitude, 0.0), x)
+
+    @staticmethod
+    def _pareto(changes: np.ndarray) -> np.ndarray:
+        """
+        Indices of rows not dominated by any other row (smaller is better)
+
+        A dominating row always has a smaller total, so the cheapest remaining
+        row is on the front; each pick removes every row it dominates.
+        """
+        remaining = np.argsort(changes.sum(axis=1), kind='stable')
+        front = []
+        while len(remaining):
+            best = remaining[0]
+            front.append(best)
+            rest = changes[remaining[1:]]
+            dominated = np.all(changes[best] <= rest, axis=1)
+            remaining = remaining[1:][~dominated]
+        return np.array(front, dtype=int)
+
+    def search_features(self, x: np.ndarray) -> Dict:
+        """
+        Counterfactuals for one prepared feature vector
+
+        Args:
+            x: One row in MODEL_FEATURES layout
+
+        Returns:
+            Dictionary with the original score and the Pareto set of changes
+        """
+        started = time.time()
+        rng = np.random.default_rng(self.seed)
+        x = np.asarray(x, dtype=float).ravel()
+
+        original_score = int(self._scores(x[None, :])[0])
+        result = {
+            'original': dict(zip(MODEL_FEATURES, x.tolist())),
+            'risk_score': original_score,
+            'risk_level': RISK_LEVELS[int(risk_level_codes(original_score))],
+            'target_level': self.target_level,
+            'meets_target': original_score <= self.max_score,
+            'counterfactuals': [],
+            'candidates_evaluated': 0
+        }
+        if result['meets_target']:
+            result['elapsed_ms'] = round((time.time() - started) * 1000, 2)
+            return result
+
+        headroom = self._headroom(x)
+        successes = np.empty((0, len(x)))
+        success_scores = np.empty(0, dtype=int)
+
+        # Sweep first, then random rounds while another round fits the budget
+        candidates = self._sweep(x, headroom)
+        while len(candidates):
+            round_started = time.time()
+            scores = self._scores(candidates)
+            result['candidates_evaluated'] += len(candidates)
+
+            # Only the running Pareto front is kept between rounds
+            ok = scores <= self.max_score
+            successes = np.vstack([successes, candidates[ok]])
+            success_scores = np.concatenate([success_scores, scores[ok]])
+            if len(successes):
+                front = self._pareto(np.abs(successes - x) / self.scale)
+                successes, success_scores = successes[front], success_scores[front]
+
+            now = time.time()
+            if len(self.mutable) < 2 or now - started + (now - round_started) > self.time_budget:
+                break
+            candidates = self._random_round(x, headroom, rng)
+
+        # The front comes back ordered by total cost
+        changes = np.abs(successes - x) / self.scale
+        for i in range(min(len(successes), self.max_results)):
+            changed = np.flatnonzero(changes[i] > 0)
+            result['counterfactuals'].append({
+                'changes': {
+                    MODEL_FEATURES[j]: {
+                        'from': float(x[j]),
+                        'to': float(successes[i, j]),
+                        'delta': float(successes[i, j] - x[j])
+                    }
+                    for j in changed
+                },
+                'features_changed': int(len(changed)),
+                'cost': round(float(changes[i].sum()), 4),
+                'risk_score': int(success_scores[i]),
+                'risk_level': RISK_LEVELS[int(risk_level_codes(success_scores[i]))]
+            })
+
+        result['elapsed_ms'] = round((time.time() - started) * 1000, 2)
+        return result
+
+    def search(self, deal: Dict) -> Dict:
+        """Counterfactuals for one deal dictionary"""
+        return self.search_features(self.model.prepare_features_batch([deal])[0])
+
+    def search_batch(self, deals) -> List[Dict]:
+        """Counterfactuals for each deal, each within its own time budget"""
+        features = self.model.prepare_features_batch(deals)
+        return [self.search_features(row) for row in features]
+
+
+def main():
+    """Find the smallest changes that bring a deal to the target risk level"""
+    parser = argparse.ArgumentParser(
+        description='Counterfactual search: minimal changes to reach a target risk level'
+    )
+    parser.add_argument(
+        'deal',
+        help='Deal JSON'
+    )
+    parser.add_argument(
+        '--target',
+        type=str,
+        default='moderate',
+        choices=RISK_LEVELS,
+        help='Target risk level (default: moderate)'
+    )
+    parser.add_argument(
+        '--budget-ms',
+        type=float,
+        default=200.0,
+        help='Search time budget in milliseconds (default: 200)'
+    )
+    parser.add_argument(
+        '--immutable',
+        type=str,
+        default=','.join(sorted(IMMUTABLE_FEATURES)),
+        help='Comma-separated features that may not change (default: property_age)'
+    )
+
+    args = parser.parse_args()
+
+    search = CounterfactualSearch(
+        target_level=args.target,
+        time_budget_ms=args.budget_ms,
+        immutable=[f for f in args.immutable.split(',') if f]
+    )
+    print(json.dumps(search.search(json.loads(args.deal)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Deal Data Validation
+====================
+Checks raw deal rows before training (RiskModelTrainer.prepare_features)
+and batch scoring (rescore_portfolio.py), and routes bad rows to a
+quarantine file rather than letting them be median-filled or scored.
+
+Checks run as one vectorized mask per rule:
+- Non-numeric values, and nulls in required columns
+- Declared value ranges (COLUMN_RULES)
+- Units: LTV, rate and occupancy are decided once per column, from the
+  first batch with values. A column whose values are all at most
+  `decimal_max` holds decimals and is converted to percent (counted, not
+  quarantined). In a percent column, values in (0, decimal_max] could be
+  either unit and are quarantined rather than rescaled
+- Labels outside {0, 1} when validating training data
+- Duplicate deal ids (or fully duplicate rows without an id) within a
+  batch; the first occurrence is kept
+
+Quarantined rows keep their original values plus a quarantine_reason
+column listing every failed rule.
+
+Usage:
+    python data_validation.py --data sample_data.csv --quarantine quarantine.csv
+    python train_model.py --data deals.csv --quarantine deals_quarantine.csv
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from risk_model import DEAL_ALIASES
+
+# Declared ranges per canonical column, in the unit given. 'decimal_max'
+# marks percent columns whose values up to it are decimals (0.75 = 75%)
+COLUMN_RULES = {
+    'loan_amount': {'min': 10_000, 'max': 500_000_000, 'required': True},
+    'requested_ltv': {'min': 1, 'max': 150, 'unit': 'percent', 'decimal_max': 1.5, 'required': True},
+    'requested_rate': {'min': 0.5, 'max': 30, 'unit': 'percent', 'decimal_max': 0.3},
+    'requested_term_months': {'min': 1, 'max': 600},
+    'borrower_credit_score': {'min': 300, 'max': 850},
+    'occupancy_rate': {'min': 0, 'max': 100, 'unit': 'percent', 'decimal_max': 1.0},
+    'noi': {'min': 0, 'max': None},
+    'dscr': {'min': 0, 'max': 20},
+    'cap_rate': {'min': 0, 'max': 30},
+    'location_score': {'min': 0, 'max': 100},
+    'property_age': {'min': 0, 'max': 200}
+}
+
+# Training label columns (same names the trainers accept); 'outcome'
+# holds 'default' / 'no_default' strings
+LABEL_COLUMNS = ['default', 'defaulted', 'default_outcome', 'outcome']
+OUTCOME_VALUES = ['default', 'no_default']
+
+ID_COLUMNS = ['deal_id', 'id']
+
+REASON_COLUMN = 'quarantine_reason'
+
+# Raw column names each canonical column may appear under
+COLUMN_NAMES = {
+    column: [column] + [alias for alias, target in DEAL_ALIASES.items() if target == column]
+    for column in COLUMN_RULES
+}
+
+
+def _present(frame: pd.DataFrame, names: List[str]) -> str:
+    return next((name for name in names if name in frame.columns), None)
+
+
+class DataValidator:
+    """
+    Vectorized row validation with quarantine output
+
+    One validator can be fed a file in chunks; counts accumulate and the
+    quarantine file is written incrementally.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Dict] = None,
+        labels: bool = False,
+        quarantine_path: str = None,
+        normalize_units: bool = True
+    ):
+        """
+        Initialize validator
+
+        Args:
+            rules: Per-column rules (default: COLUMN_RULES)
+            labels: Require a valid 0/1 label (training data)
+            quarantine_path: CSV that quarantined rows are written to (optional)
+            normalize_units: Convert decimal percent columns to percent
+        """
+        self.rules = rules or COLUMN_RULES
+        self.labels = labels
+        self.quarantine_path = quarantine_path
+        self.normalize_units = normalize_units
+        self._quarantine_started = False
+        self.counts = {'rows': 0, 'passed': 0, 'quarantined': 0, 'seconds': 0.0}
+        self.reasons = {}
+        self.conversions = {}
+        # Column name -> 'decimal' or 'percent', fixed by the first batch with values
+        self.units = {}
+
+    def _checks(self, frame: pd.DataFrame) -> Tuple[List[Tuple[str, np.ndarray]], Dict[str, np.ndarray]]:
+        """Failure masks per rule, and the normalized numeric columns"""
+        checks, normalized = [], {}
+
+        for column, rule in self.rules.items():
+            name = _present(frame, COLUMN_NAMES.get(column, [column]))
+            if name is None:
+                continue
+
+            raw = frame[name]
+            values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+            missing = np.isnan(values)
+            if raw.dtype == object:
+                checks.append((f'invalid:{name}', missing & raw.notna().to_numpy()))
+                missing = missing & raw.isna().to_numpy()
+            if rule.get('required'):
+                checks.append((f'null:{name}', missing))
+
+            if self.normalize_units and rule.get('unit') == 'percent':
+                unit = self._unit(name, values, rule['decimal_max'])
+                if unit == 'decimal':
+                    converted = int((~np.isnan(values)).sum())
+                    if converted:
+                        values = values * 100
+                        self.conversions[name] = self.conversions.get(name, 0) + converted
+                elif unit == 'percent':
+                    with np.errstate(invalid='ignore'):
+                        checks.append((f'unit:{name}', (values > 0) & (values <= rule['decimal_max'])))
+
+            with np.errstate(invalid='ignore'):
+                out_of_range = np.zeros(len(values), dtype=bool)
+                if rule.get('min') is not None:
+                    out_of_range |= values < rule['min']
+                if rule.get('max') is not None:
+                    out_of_range |= values > rule['max']
+            checks.append((f'range:{name}', out_of_range))
+            normalized[name] = values
+
+        if self.labels:
+            name = _present(frame, LABEL_COLUMNS)
+            if name is None:
+                raise ValueError(f"No label column found. Expected one of {LABEL_COLUMNS}")
+            if name == 'outcome':
+                invalid = ~frame[name].isin(OUTCOME_VALUES).to_numpy()
+            else:
+                label = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+                invalid = ~np.isin(label, (0.0, 1.0))
+            checks.append((f'label:{name}', invalid))
+
+        id_column = _present(frame, ID_COLUMNS)
+        if id_column is not None:
+            duplicate = frame[id_column].duplicated().to_numpy()
+        else:
+            duplicate = pd.util.hash_pandas_object(frame, index=False).duplicated().to_numpy()
+        checks.append(('duplicate', duplicate))
+
+        return checks, normalized
+
+    def _unit(self, name: str, values: np.ndarray, decimal_max: float) -> str:
+        """Unit of a percent column: 'decimal' when every value is at most decimal_max"""
+        if name not in self.units:
+            present = values[~np.isnan(values)]
+            if not len(present):
+                return None
+            self.units[name] = 'decimal' if present.max() <= decimal_max else 'percent'
+        return self.units[name]
+
+    def validate(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate a batch of raw deal rows
+
+        Args:
+            frame: Raw deals (training or scoring layout)
+
+        Returns:
+            Rows that passed, with units normalized and the original index
+        """
+        started = time.perf_counter()
+        checks, normalized = self._checks(frame)
+
+        bad = np.zeros(len(frame), dtype=bool)
+        for _, mask in checks:
+            bad |= mask
+
+        if bad.any():
+            bad_rows = np.flatnonzero(bad)
+            reasons = np.full(len(bad_rows), '', dtype=object)
+            for reason, mask in checks:
+                failed = mask[bad_rows]
+                count = int(failed.sum())
+                if count:
+                    self.reasons[reason] = self.reasons.get(reason, 0) + count
+                    reasons[failed] += reason + ';'
+            quarantined = frame.iloc[bad_rows].copy()
+            quarantined[REASON_COLUMN] = [r.rstrip(';') for r in reasons]
+            self._write_quarantine(quarantined)
+
+        clean = frame[~bad].copy()
+        for name, values in normalized.items():
+            clean[name] = values[~bad]
+
+        self.counts['rows'] += len(frame)
+        self.counts['passed'] += len(clean)
+        self.counts['quarantined'] += int(bad.sum())
+        self.counts['seconds'] += time.perf_counter() - started
+        return clean
+
+    def _write_quarantine(self, quarantined: pd.DataFrame):
+        if not self.quarantine_path:
+            return
+        # First batch of this validator replaces any earlier file
+        quarantined.to_csv(
+            self.quarantine_path,
+            mode='a' if self._quarantine_started else 'w',
+            header=not self._quarantine_started,
+            index=False
+        )
+        self._quarantine_started = True
+
+    def summary(self) -> Dict:
+        """Row counts, failures per rule and unit conversions so far"""
+        rows, seconds = self.counts['rows'], self.counts['seconds']
+        return {
+            'rows': rows,
+            'passed': self.counts['passed'],
+            'quarantined': self.counts['quarantined'],
+            'quarantine_rate': round(self.counts['quarantined'] / rows, 4) if rows else 0.0,
+            'failures': dict(sorted(self.reasons.items(), key=lambda item: -item[1])),
+            'unit_conversions': self.conversions,
+            'quarantine_path': self.quarantine_path if self._quarantine_started else None,
+            'seconds': round(seconds, 4),
+            'rows_per_second': int(rows / seconds) if seconds else None
+        }
+
+    def print_summary(self):
+        """Log the summary in the trainers' [INFO]/[WARNING] style"""
+        summary = self.summary()
+        print(f"[INFO] Validated {summary['rows']} rows in {summary['seconds'] * 1000:.1f}ms: "
+              f"{summary['passed']} passed, {summary['quarantined']} quarantined")
+        for name, count in summary['unit_conversions'].items():
+            print(f"[INFO] Converted {count} decimal values to percent in '{name}'")
+        if summary['quarantined']:
+            for reason, count in summary['failures'].items():
+                print(f"[WARNING]   {reason}: {count} rows")
+            if summary['quarantine_path']:
+                print(f"[WARNING] Quarantined rows written to {summary['quarantine_path']}")
+
+
+def validate_file(path: str, labels: bool = True, quarantine_path: str = None, chunk_size: int = None) -> Dict:
+    """
+    Validate a CSV file, optionally in chunks
+
+    Returns:
+        Validation summary
+    """
+    validator = DataValidator(labels=labels, quarantine_path=quarantine_path)
+    chunks = pd.read_csv(path, chunksize=chunk_size) if chunk_size else [pd.read_csv(path)]
+    for chunk in chunks:
+        validator.validate(chunk)
+    return validator.summary()
+
+
+def main():
+    """Validate a deal file and write its quarantine"""
+    parser = argparse.ArgumentParser(description='Validate deal data and quarantine bad rows')
+    parser.add_argument('--data', type=str, required=True, help='CSV of deals')
+    parser.add_argument(
+        '--quarantine',
+        type=str,
+        default=None,
+        help='CSV for quarantined rows (default: <data>_quarantine.csv)'
+    )
+    parser.add_argument(
+        '--scoring',
+        action='store_true',
+        help='Scoring data: no label column required'
+    )
+    parser.add_argument('--chunk-size', type=int, default=None, help='Rows per chunk (default: whole file)')
+
+    args = parser.parse_args()
+
+    quarantine = args.quarantine or os.path.splitext(args.data)[0] + '_quarantine.csv'
+    summary = validate_file(args.data, labels=not args.scoring, quarantine_path=quarantine, chunk_size=args.chunk_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
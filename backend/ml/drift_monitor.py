@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Feature Drift Monitoring
+========================
+Compares the features the scorer sees in production against the training
+distribution the model was fit on.
+
+- Training stores a per-feature reference (quantile bin edges, histogram
+  and quantile sketch) in the model artifact under 'drift_reference'
+- The scorer keeps fixed-size streaming histograms on the same bins, so
+  monitoring costs one searchsorted per feature and never stores requests
+- PSI and KS statistics are computed on demand
+
+Usage:
+    python drift_monitor.py --model risk_model_trained.pkl --check deals.csv
+    python drift_monitor.py --model risk_model_trained.pkl --reference ../data/historical_deals.csv
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import pickle
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Quantile bins per feature in the reference histogram
+DEFAULT_BINS = 20
+
+# Quantile levels kept in the reference sketch
+SKETCH_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+# PSI bands: below 0.1 stable, below 0.25 moderate shift, above significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def build_reference(X, feature_names: List[str] = None, bins: int = DEFAULT_BINS) -> Dict:
+    """
+    Build the training reference stored in the model artifact
+
+    Args:
+        X: Training feature matrix or DataFrame
+        feature_names: Column names (default: DataFrame columns)
+        bins: Target number of quantile bins per feature
+
+    Returns:
+        Dictionary with per-feature bin edges, counts and quantile sketch
+    """
+    if isinstance(X, pd.DataFrame):
+        feature_names = feature_names or list(X.columns)
+        X = X.to_numpy(dtype=float)
+    X = np.asarray(X, dtype=float)
+
+    features = {}
+    for j, name in enumerate(feature_names):
+        column = X[:, j]
+        column = column[~np.isnan(column)]
+
+        # Interior edges at training quantiles; ties collapse into fewer bins
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, column, side='right'), minlength=len(edges) + 1)
+
+        features[name] = {
+            'edges': edges.tolist(),
+            'counts': counts.tolist(),
+            'quantiles': dict(zip(
+                [str(q) for q in SKETCH_QUANTILES],
+                np.quantile(column, SKETCH_QUANTILES).tolist()
+            )),
+            'min': float(column.min()),
+            'max': float(column.max()),
+            'mean': float(column.mean()),
+            'std': float(column.std())
+        }
+
+    return {
+        'feature_names': list(feature_names),
+        'samples': int(len(X)),
+        'features': features
+    }
+
+
+def population_stability_index(reference: np.ndarray, current: np.ndarray) -> float:
+    """PSI between two histograms over the same bins"""
+    p = np.maximum(reference / max(reference.sum(), 1), PSI_EPSILON)
+    q = np.maximum(current / max(current.sum(), 1), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """Kolmogorov-Smirnov distance between two histograms over the same bins"""
+    p = np.cumsum(reference) / max(reference.sum(), 1)
+    q = np.cumsum(current) / max(current.sum(), 1)
+    return float(np.max(np.abs(p - q)))
+
+
+class DriftMonitor:
+    """
+    Fixed-memory streaming feature histograms checked against a reference
+    """
+
+    def __init__(self, reference: Dict):
+        """
+        Initialize monitor
+
+        Args:
+            reference: Output of build_reference (from the model artifact)
+        """
+        self.reference = reference
+        self.feature_names = reference['feature_names']
+        self.edges = [np.asarray(reference['features'][f]['edges']) for f in self.feature_names]
+        self.reference_counts = [np.asarray(reference['features'][f]['counts']) for f in self.feature_names]
+
+        # Flattened histogram of all features, one slice per feature
+        sizes = [len(e) + 1 for e in self.edges]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.reset()
+
+    def reset(self):
+        """Clear the streaming state"""
+        n = len(self.feature_names)
+        self.counts = np.zeros(self.offsets[-1], dtype=np.int64)
+        self.missing = np.zeros(n, dtype=np.int64)
+        self.minimum = np.full(n, np.inf)
+        self.maximum = np.full(n, -np.inf)
+        self.observed = 0
+
+    def update(self, features: np.ndarray):
+        """
+        Add scored feature rows to the streaming histograms
+
+        Args:
+            features: Matrix with one column per reference feature
+        """
+        features = np.asarray(features, dtype=float)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+
+        missing = np.isnan(features)
+        codes = np.empty(features.shape, dtype=np.int64)
+        for j, edges in enumerate(self.edges):
+            codes[:, j] = np.searchsorted(edges, features[:, j], side='right') + self.offsets[j]
+
+        self.counts += np.bincount(codes[~missing], minlength=len(self.counts))
+        self.missing += missing.sum(axis=0)
+        # fmin/fmax skip NaN, so missing values never become the extremes
+        self.minimum = np.fmin(self.minimum, np.fmin.reduce(features, axis=0))
+        self.maximum = np.fmax(self.maximum, np.fmax.reduce(features, axis=0))
+        self.observed += len(features)
+
+    def merge(self, other: 'DriftMonitor'):
+        """Fold another monitor's state (e.g. from a pool worker) into this one"""
+        self.counts += other.counts
+        self.missing += other.missing
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.observed += other.observed
+
+    def _approximate_quantile(self, j: int, counts: np.ndarray, q: float) -> float:
+        """Interpolate a quantile from a histogram over the reference bins"""
+        total = counts.sum()
+        if total == 0:
+            return float('nan')
+        edges = np.concatenate([[self.minimum[j]], self.edges[j], [self.maximum[j]]])
+        cdf = np.concatenate([[0], np.cumsum(counts)]) / total
+        return float(np.interp(q, cdf, edges))
+
+    def report(self) -> Dict:
+        """
+        Drift statistics for every feature
+
+        Returns:
+            Dictionary with PSI, KS and a status per feature
+        """
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            current = self.counts[self.offsets[j]:self.offsets[j + 1]]
+            reference = self.reference_counts[j]
+            psi = population_stability_index(reference, current)
+
+            if current.sum() == 0:
+                status = 'no_data'
+            elif psi >= PSI_SIGNIFICANT:
+                status = 'significant'
+            elif psi >= PSI_MODERATE:
+                status = 'moderate'
+            else:
+                status = 'stable'
+
+            features[name] = {
+                'psi': round(psi, 4),
+                'ks': round(ks_statistic(reference, current), 4),
+                'status': status,
+                'observed': int(current.sum()),
+                'missing': int(self.missing[j]),
+                'reference_median': self.reference['features'][name]['quantiles']['0.5'],
+                'current_median': self._approximate_quantile(j, current, 0.5),
+                'current_min': float(self.minimum[j]) if current.sum() else None,
+                'current_max': float(self.maximum[j]) if current.sum() else None
+            }
+
+        return {
+            'observed': int(self.observed),
+            'reference_samples': self.reference['samples'],
+            'drifted_features': [f for f, r in features.items() if r['status'] == 'significant'],
+            'features': features
+        }
+
+    def save_state(self, path: str):
+        """Persist the streaming state (not the reference) to an .npz file"""
+        np.savez(
+            path,
+            counts=self.counts,
+            missing=self.missing,
+            minimum=self.minimum,
+            maximum=self.maximum,
+            observed=self.observed
+        )
+
+    def load_state(self, path: str):
+        """Restore streaming state saved by save_state"""
+        state = np.load(path)
+        self.counts = state['counts']
+        self.missing = state['missing']
+        self.minimum = state['minimum']
+        self.maximum = state['maximum']
+        self.observed = int(state['observed'])
+
+
+def check_matrix(df: pd.DataFrame, feature_names: List[str]) -> np.ndarray:
+    """
+    Feature matrix of deals in a reference's feature layout
+
+    Raw deals are converted for the scorer's MODEL_FEATURES layout. Other
+    layouts (e.g. train_model.py's engineered features) must be present
+    as columns of df already.
+
+    Args:
+        df: Deals or prepared features
+        feature_names: reference['feature_names']
+
+    Returns:
+        Matrix with one column per feature name, in order
+    """
+    from risk_model import MODEL_FEATURES, deals_to_frame, derive_features, model_feature_matrix
+
+    if list(feature_names) == MODEL_FEATURES:
+        frame = deals_to_frame(df)
+        return model_feature_matrix(frame, derive_features(frame))
+
+    missing = [name for name in feature_names if name not in df.columns]
+    if missing:
+        raise ValueError(
+            f"Reference uses features {list(feature_names)}, which differ from the scorer's "
+            f"{MODEL_FEATURES}; the check file must contain them as columns (missing: {missing})"
+        )
+    return df[list(feature_names)].to_numpy(dtype=float)
+
+
+def main():
+    """Attach a reference to a model artifact or check a batch for drift"""
+    parser = argparse.ArgumentParser(
+        description='Feature drift monitoring against the training distribution'
+    )
+    parser.add_argument(
+        '--model',
+        type=str,
+        required=True,
+        help='Path to model artifact (.pkl)'
+    )
+    parser.add_argument(
+        '--reference',
+        type=str,
+        default=None,
+        help='Training CSV to build and store the reference from (for artifacts trained without one)'
+    )
+    parser.add_argument(
+        '--check',
+        type=str,
+        default=None,
+        help='CSV of deals (or of features in the reference layout) to compare against the stored reference'
+    )
+
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model_data = pickle.load(f)
+
+    if args.reference:
+        df = pd.read_csv(args.reference)
+        model_data['drift_reference'] = build_reference(df[model_data['feature_names']])
+        with open(args.model, 'wb') as f:
+            pickle.dump(model_data, f)
+        print(f"[INFO] Drift reference from {len(df)} rows stored in {args.model}")
+
+    if args.check:
+        if 'drift_reference' not in model_data:
+            raise ValueError("Model artifact has no drift reference; rebuild it with --reference")
+
+        reference = model_data['drift_reference']
+        monitor = DriftMonitor(reference)
+        monitor.update(check_matrix(pd.read_csv(args.check), reference['feature_names']))
+        print(json.dumps(monitor.report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Training Execution Budget
+=========================
+Splits a core budget between fold-level processes and per-model threads
+for RiskModelTrainer, without oversubscribing shared machines.
+
+- Fold processes start with OMP/BLAS thread variables pinned to their
+  share of the budget, so nested OpenMP/BLAS pools cannot multiply
+- Every fold gets a fixed split and seed and results are collected in fold
+  order, so CV scores and models do not depend on the process/thread split
+- Models are fingerprinted (hash of the serialized booster) so the scaling
+  benchmark can check they are bit-identical across splits
+
+Usage:
+    python train_model.py --data sample_data.csv --cores 8
+    python train_model.py --data sample_data.csv --benchmark-scaling
+
+Author: Underwrite Pro ML Team
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from typing import Dict, List
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+# Thread pool sizes read by OpenMP, BLAS backends and numexpr at startup
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS'
+]
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects affinity and cgroup pinning)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_budget(cores: int = None, tasks: int = 1, processes: int = None) -> Dict:
+    """
+    Split a core budget between processes and threads per process
+
+    Args:
+        cores: Total cores to use (default: available_cores)
+        tasks: Independent tasks (e.g. CV folds) that can run as processes
+        processes: Force the process count (default: one per task, up to cores)
+
+    Returns:
+        Dictionary with cores, processes and threads (per process)
+    """
+    cores = max(1, min(cores or available_cores(), available_cores()))
+    processes = max(1, min(processes or tasks, tasks, cores))
+    return {
+        'cores': cores,
+        'processes': processes,
+        'threads': max(1, cores // processes)
+    }
+
+
+@contextmanager
+def thread_env(threads: int):
+    """Pin THREAD_ENV_VARS for processes started inside the block"""
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def model_fingerprint(model: xgb.XGBClassifier) -> str:
+    """SHA-256 of the serialized booster (independent of n_jobs)"""
+    return hashlib.sha256(bytes(model.get_booster().save_raw('ubj'))).hexdigest()
+
+
+# ============================================================
+# Fold workers
+# ============================================================
+
+_fold_data = None
+
+
+def _init_fold_worker(X: np.ndarray, y: np.ndarray, sample_weight: np.ndarray = None):
+    global _fold_data
+    _fold_data = (X, y, sample_weight)
+
+
+def _fit_fold(params: Dict, train_index: np.ndarray, test_index: np.ndarray, threads: int) -> Dict:
+    X, y, sample_weight = _fold_data
+    fit_weight = None if sample_weight is None else sample_weight[train_index]
+    test_weight = None if sample_weight is None else sample_weight[test_index]
+    model = xgb.XGBClassifier(**{**params, 'n_jobs': threads})
+    with threadpool_limits(limits=threads):
+        model.fit(X[train_index], y[train_index], sample_weight=fit_weight, verbose=False)
+        probs = model.predict_proba(X[test_index])[:, 1]
+    return {
+        'auc': float(roc_auc_score(y[test_index], probs, sample_weight=test_weight)),
+        'fingerprint': model_fingerprint(model)
+    }
+
+
+def parallel_cross_val(
+    params: Dict,
+    X: np.ndarray,
+    y: np.ndarray,
+    folds: int,
+    budget: Dict,
+    sample_weight: np.ndarray = None
+) -> Dict:
+    """
+    Cross-validated AUC with folds spread over the budget's processes
+
+    Folds are the same StratifiedKFold splits cross_val_score uses, and
+    results come back in fold order whatever the split. With sample
+    weights, each fold is fit and scored with its slice of them, like the
+    final model.
+
+    Args:
+        params: XGBClassifier parameters (n_jobs is overridden)
+        X: Feature matrix
+        y: Labels
+        folds: Number of folds
+        budget: Output of plan_budget
+        sample_weight: Per-row weights of the final fit (optional)
+
+    Returns:
+        Dictionary with per-fold AUC scores and model fingerprints
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    if sample_weight is not None:
+        sample_weight = np.asarray(sample_weight, dtype=float)
+    splits = list(StratifiedKFold(n_splits=folds).split(X, y))
+    threads = budget['threads']
+
+    if budget['processes'] == 1:
+        _init_fold_worker(X, y, sample_weight)
+        results = [_fit_fold(params, train, test, threads) for train, test in splits]
+    else:
+        # Spawned (not forked) workers start with pinned thread variables;
+        # forking after OpenMP has run in the parent is unsafe
+        with thread_env(threads), ProcessPoolExecutor(
+            max_workers=budget['processes'],
+            mp_context=get_context('spawn'),
+            initializer=_init_fold_worker,
+            initargs=(X, y, sample_weight)
+        ) as pool:
+            futures = [pool.submit(_fit_fold, params, train, test, threads) for train, test in splits]
+            results = [f.result() for f in futures]
+
+    return {
+        'scores': np.array([r['auc'] for r in results]),
+        'fingerprints': [r['fingerprint'] for r in results]
+    }
+
+
+def fit_final(params: Dict, X: np.ndarray, y: np.ndarray, budget: Dict, **fit_kwargs) -> xgb.XGBClassifier:
+    """Fit one model with every core of the budget as threads"""
+    model = xgb.XGBClassifier(**{**params, 'n_jobs': budget['cores']})
+    with threadpool_limits(limits=budget['cores']):
+        model.fit(X, y, **fit_kwargs)
+    return model
+
+
+def scaling_benchmark(params: Dict, X: np.ndarray, y: np.ndarray, folds: int, max_cores: int = None) -> List[Dict]:
+    """
+    Time CV plus a final fit from 1 to max_cores cores
+
+    Each core count is run with every process/thread split; all models
+    must share one set of fingerprints.
+
+    Returns:
+        One row per (cores, processes) with seconds, speedup and whether
+        the models matched the single-core run
+    """
+    max_cores = max_cores or available_cores()
+    rows, reference, baseline = [], None, None
+
+    for cores in range(1, max_cores + 1):
+        splits = sorted({plan_budget(cores, folds, p)['processes'] for p in range(1, min(cores, folds) + 1)})
+        for processes in splits:
+            budget = plan_budget(cores, folds, processes)
+            started = time.perf_counter()
+            cv = parallel_cross_val(params, X, y, folds, budget)
+            final = fit_final(params, X, y, budget)
+            elapsed = time.perf_counter() - started
+
+            fingerprints = cv['fingerprints'] + [model_fingerprint(final)]
+            reference = reference or fingerprints
+            baseline = baseline or elapsed
+            rows.append({
+                **budget,
+                'seconds': round(elapsed, 3),
+                'speedup': round(baseline / elapsed, 2),
+                'cv_mean': round(float(cv['scores'].mean()), 6),
+                'identical': fingerprints == reference
+            })
+
+    return rows
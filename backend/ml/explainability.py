@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Model Explainability Analysis
+=============================
+Global explanations for a fitted scaler + XGBoost model, replacing the
+gain-based feature_importances_ the trainers print.
+
+- Permutation importance: drop in AUC (and mean absolute change in
+  predicted PD) when one feature is shuffled, over repeated shuffles
+- Partial dependence: average predicted PD with a feature set to each
+  point of a quantile grid, with the ICE curves of a row subset
+
+Every perturbed copy is scored as one large predict_proba call. Tasks
+(one per feature and shuffle, one per PD feature) are spread across
+processes that memory-map the evaluation matrix. Shuffles are seeded per
+(feature, repeat), so results do not depend on the worker count.
+
+Usage:
+    python explainability.py --model risk_model_trained.pkl --data ../data/historical_deals.csv
+    python explainability.py --model risk_model_trained.pkl --data deals.csv --workers 8 --save
+    python train_model.py --data sample_data.csv --explain
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import copy
+import json
+import os
+import pickle
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List
+
+import numpy as np
+
+# Shuffles per feature for permutation importance
+DEFAULT_REPEATS = 5
+
+# Quantile grid points per partial dependence curve
+DEFAULT_GRID_POINTS = 20
+
+# Rows averaged for partial dependence, and ICE curves kept of those
+DEFAULT_PD_ROWS = 10000
+DEFAULT_ICE_ROWS = 50
+
+# Grid spans these quantiles so outliers do not stretch the curve
+GRID_QUANTILES = (0.01, 0.99)
+
+
+def fast_auc(y: np.ndarray, scores: np.ndarray) -> float:
+    """
+    ROC AUC via one sort (Mann-Whitney U with average ranks for ties)
+
+    Same value as sklearn's roc_auc_score, in about half the time on
+    large arrays.
+    """
+    y = np.asarray(y).astype(bool)
+    n_pos = int(y.sum())
+    n_neg = len(y) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float('nan')
+
+    order = np.argsort(scores, kind='stable')
+    ranked = np.asarray(scores)[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ranked)) + 1])
+    ends = np.append(starts[1:], len(ranked))
+    positives = np.add.reduceat(y[order].astype(np.int64), starts)
+    rank_sum = float(np.dot(positives, (starts + ends + 1) / 2))
+    return (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+# ============================================================
+# Workers
+# ============================================================
+
+_state = {}
+
+
+def _init_worker(model, scaler, data_path: str):
+    # Single-threaded prediction per process; the pool provides parallelism
+    model.set_params(n_jobs=1)
+    # Scalers fitted on DataFrames warn on every ndarray batch
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    _state.update(model=model, scaler=scaler, X=np.load(data_path, mmap_mode='r'))
+
+
+def _predict(X: np.ndarray) -> np.ndarray:
+    scaler = _state['scaler']
+    if scaler is not None:
+        X = scaler.transform(X)
+    return _state['model'].predict_proba(np.asarray(X, dtype=np.float32))[:, 1]
+
+
+def _permutation_task(feature: int, repeat: int, seed: int) -> np.ndarray:
+    X = np.array(_state['X'])
+    rng = np.random.default_rng([seed, feature, repeat])
+    X[:, feature] = rng.permutation(X[:, feature])
+    return _predict(X)
+
+
+def _partial_dependence_task(feature: int, rows: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    sample = np.asarray(_state['X'][rows])
+    # Every grid value for every row, scored in one call
+    stacked = np.tile(sample, (len(grid), 1))
+    stacked[:, feature] = np.repeat(grid, len(sample))
+    return _predict(stacked).reshape(len(grid), len(sample)).T
+
+
+# ============================================================
+# Analysis
+# ============================================================
+
+def explain(
+    model,
+    scaler,
+    X: np.ndarray,
+    y: np.ndarray,
+    feature_names: List[str],
+    repeats: int = DEFAULT_REPEATS,
+    grid_points: int = DEFAULT_GRID_POINTS,
+    pd_rows: int = DEFAULT_PD_ROWS,
+    ice_rows: int = DEFAULT_ICE_ROWS,
+    workers: int = 1,
+    seed: int = 42
+) -> Dict:
+    """
+    Permutation importance and partial dependence for every feature
+
+    Args:
+        model: Fitted classifier with predict_proba
+        scaler: Fitted scaler applied before the model (or None)
+        X: Unscaled evaluation features (rows x features)
+        y: Evaluation labels (0/1)
+        feature_names: Column names of X
+        repeats: Shuffles per feature
+        grid_points: Partial dependence grid size
+        pd_rows: Rows sampled for partial dependence
+        ice_rows: ICE curves kept (first rows of the PD sample)
+        workers: Processes to spread tasks over
+        seed: Random seed for shuffles and row sampling
+
+    Returns:
+        Dictionary stored in model artifacts under 'explanations'
+    """
+    started = time.time()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y).astype(int)
+    n_rows, n_features = X.shape
+
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(n_rows, size=min(pd_rows, n_rows), replace=False))
+    grids = [
+        np.unique(np.quantile(X[:, j], np.linspace(*GRID_QUANTILES, grid_points)))
+        for j in range(n_features)
+    ]
+
+    permutation_jobs = [(j, r) for j in range(n_features) for r in range(repeats)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'X.npy')
+        np.save(data_path, X)
+
+        if workers <= 1:
+            # The initializer pins n_jobs and filters warnings; keep both off the caller's model and process
+            with warnings.catch_warnings():
+                _init_worker(copy.deepcopy(model), scaler, data_path)
+                try:
+                    baseline = _predict(X)
+                    permuted = [_permutation_task(j, r, seed) for j, r in permutation_jobs]
+                    curves = [_partial_dependence_task(j, rows, grids[j]) for j in range(n_features)]
+                finally:
+                    _state.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model, scaler, data_path)
+            ) as pool:
+                permuted_futures = [pool.submit(_permutation_task, j, r, seed) for j, r in permutation_jobs]
+                curve_futures = [
+                    pool.submit(_partial_dependence_task, j, rows, grids[j]) for j in range(n_features)
+                ]
+                with warnings.catch_warnings():
+                    _init_worker(copy.deepcopy(model), scaler, data_path)
+                    baseline = _predict(X)
+                    _state.clear()
+                permuted = [f.result() for f in permuted_futures]
+                curves = [f.result() for f in curve_futures]
+
+    baseline_auc = fast_auc(y, baseline)
+    importance = {}
+    for j, name in enumerate(feature_names):
+        predictions = permuted[j * repeats:(j + 1) * repeats]
+        drops = [baseline_auc - fast_auc(y, p) for p in predictions]
+        importance[name] = {
+            'mean': round(float(np.mean(drops)), 6),
+            'std': round(float(np.std(drops)), 6),
+            'auc_drops': [round(float(d), 6) for d in drops],
+            'mean_abs_prediction_change': round(float(np.mean([np.abs(p - baseline).mean() for p in predictions])), 6)
+        }
+
+    partial_dependence = {}
+    for j, name in enumerate(feature_names):
+        curve = curves[j]
+        partial_dependence[name] = {
+            'grid': grids[j].round(6).tolist(),
+            'average': curve.mean(axis=0).round(6).tolist(),
+            'ice': curve[:ice_rows].round(6).tolist()
+        }
+
+    return {
+        'feature_names': list(feature_names),
+        'rows': n_rows,
+        'repeats': repeats,
+        'pd_rows': len(rows),
+        'ice_rows': min(ice_rows, len(rows)),
+        'baseline_auc': round(float(baseline_auc), 6),
+        'permutation_importance': dict(sorted(importance.items(), key=lambda item: -item[1]['mean'])),
+        'partial_dependence': partial_dependence,
+        'workers': workers,
+        'seconds': round(time.time() - started, 3),
+        'computed_at': datetime.now().isoformat()
+    }
+
+
+def print_importance(explanations: Dict, top: int = None):
+    """Print the permutation importance table"""
+    print(f"\nPermutation Importance (AUC drop, {explanations['repeats']} shuffles, "
+          f"{explanations['rows']} rows, baseline AUC {explanations['baseline_auc']:.4f}):")
+    for name, entry in list(explanations['permutation_importance'].items())[:top]:
+        print(f"  {name:25s}: {entry['mean']:.4f} (+/- {entry['std']:.4f})  "
+              f"mean |dPD| {entry['mean_abs_prediction_change']:.4f}")
+
+
+def save_to_artifact(path: str, explanations: Dict):
+    """Store explanations in a model artifact under 'explanations'"""
+    with open(path, 'rb') as f:
+        model_data = pickle.load(f)
+    model_data['explanations'] = explanations
+
+    # Write then rename so a reader never sees a partial artifact
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    """Explain a model artifact on a labeled deal file"""
+    import pandas as pd
+    from risk_model import MODEL_FEATURES, RiskAssessmentModel
+    from segmented_model import LABEL_COLUMNS
+
+    parser = argparse.ArgumentParser(description='Permutation importance and partial dependence for a risk model')
+    parser.add_argument('--model', type=str, required=True, help='Model artifact (six-feature scoring layout)')
+    parser.add_argument('--data', type=str, required=True, help='Labeled CSV of deals to evaluate on')
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=DEFAULT_REPEATS,
+        help=f'Shuffles per feature (default: {DEFAULT_REPEATS})'
+    )
+    parser.add_argument(
+        '--pd-rows',
+        type=int,
+        default=DEFAULT_PD_ROWS,
+        help=f'Rows sampled for partial dependence (default: {DEFAULT_PD_ROWS})'
+    )
+    parser.add_argument('--workers', type=int, default=1, help='Processes (default: 1)')
+    parser.add_argument('--save', action='store_true', help='Store the results in the model artifact')
+    parser.add_argument('--output', type=str, default=None, help='Also write the results to this JSON file')
+
+    args = parser.parse_args()
+
+    model = RiskAssessmentModel(args.model)
+    df = pd.read_csv(args.data)
+    label = next((c for c in LABEL_COLUMNS if c in df.columns), None)
+    if label is None:
+        raise ValueError(f"No label column found. Expected one of {LABEL_COLUMNS}")
+
+    X = model.prepare_features_batch(df)
+    explanations = explain(
+        model.model, model.scaler, X, df[label].to_numpy(), MODEL_FEATURES,
+        repeats=args.repeats, pd_rows=args.pd_rows, workers=args.workers
+    )
+
+    print_importance(explanations)
+    print(f"\n[INFO] Explained {explanations['rows']} rows in {explanations['seconds']:.2f}s")
+
+    if args.save:
+        save_to_artifact(args.model, explanations)
+        print(f"[INFO] Explanations stored in {args.model}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(explanations, f, indent=2)
+        print(f"[INFO] Explanations saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Deal Feature Store
+==================
+Columnar table of precomputed deal features keyed by deal_id and
+FEATURE_VERSION, so training and batch scoring read derived metrics
+(property value, NOI, debt service, DSCR, cap rate) instead of
+recomputing them from raw fields on every run.
+
+Layout:
+    <root>/v<FEATURE_VERSION>/CURRENT          name of the live generation
+    <root>/v<FEATURE_VERSION>/gen-000001/      one .npy file per column
+
+Rows are kept sorted by deal_id. Columns are memory-mapped on read, so
+column slices are zero-copy. Updates only recompute rows whose raw inputs
+changed and publish a new generation atomically. A generation writes only
+the columns whose values changed and hard-links the rest from the previous
+one; inserting new deals re-sorts the rows, so every column is rewritten.
+
+Usage:
+    python feature_store.py --store feature_store --update ../data/historical_deals.csv
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from risk_model import (
+    DEAL_DEFAULTS,
+    DERIVED_FEATURES,
+    FEATURE_VERSION,
+    MODEL_FEATURES,
+    deals_to_frame,
+    derive_features,
+    model_feature_matrix
+)
+
+# Columns stored per deal: the model's inputs plus every derived metric
+STORE_COLUMNS = MODEL_FEATURES + [c for c in DERIVED_FEATURES if c not in MODEL_FEATURES]
+
+# Raw fields that feed derive_features/model_feature_matrix
+INPUT_COLUMNS = list(DEAL_DEFAULTS) + ['noi', 'dscr', 'cap_rate']
+
+# Generations kept on disk besides the live one (for readers still mapping them)
+KEEP_GENERATIONS = 1
+
+
+# Column files of a generation, in write order
+FILE_COLUMNS = ['deal_id', 'input_hash'] + STORE_COLUMNS
+
+
+def input_hashes(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the raw inputs of each normalized deal
+
+    Numbers are compared as floats rounded to 6 decimals, so a value read
+    as an integer in one export chunk and a float in another hashes equal.
+    """
+    columns = [c for c in INPUT_COLUMNS if c in frame.columns]
+    normalized = frame[columns].copy()
+    for column in columns:
+        if column != 'asset_type':
+            normalized[column] = pd.to_numeric(normalized[column], errors='coerce').astype(float).round(6)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _link_or_copy(source: str, target: str):
+    """Share an unchanged column file with the previous generation"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class FeatureStore:
+    """
+    Versioned, memory-mapped columnar store of deal features
+    """
+
+    def __init__(self, root: str, feature_version: int = FEATURE_VERSION):
+        """
+        Open (or create) a feature store
+
+        Args:
+            root: Store directory
+            feature_version: Feature logic version to read/write
+        """
+        self.root = root
+        self.feature_version = feature_version
+        self.version_dir = os.path.join(root, f'v{feature_version}')
+        os.makedirs(self.version_dir, exist_ok=True)
+        self._columns = {}
+        self._generation = None
+        self._open()
+
+    def _open(self):
+        """Map the columns of the live generation"""
+        current = os.path.join(self.version_dir, 'CURRENT')
+        self._columns = {}
+        self._generation = None
+
+        if not os.path.exists(current):
+            return
+
+        with open(current) as f:
+            self._generation = f.read().strip()
+
+        gen_dir = os.path.join(self.version_dir, self._generation)
+        for name in FILE_COLUMNS:
+            self._columns[name] = np.load(os.path.join(gen_dir, f'{name}.npy'), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self._columns['deal_id']) if self._columns else 0
+
+    @property
+    def deal_ids(self) -> np.ndarray:
+        return self._columns.get('deal_id', np.array([], dtype=str))
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Zero-copy view of one feature column (rows sorted by deal_id)
+
+        Args:
+            name: One of STORE_COLUMNS
+
+        Returns:
+            Read-only memory-mapped array
+        """
+        if name not in STORE_COLUMNS:
+            raise KeyError(f"Unknown feature column: {name}")
+        if not self._columns:
+            return np.array([], dtype=float)
+        return self._columns[name]
+
+    def rows_for(self, deal_ids) -> np.ndarray:
+        """
+        Row positions of deal_ids in the store (-1 where missing)
+        """
+        deal_ids = np.asarray(deal_ids, dtype=str)
+        stored = self.deal_ids
+        if len(stored) == 0:
+            return np.full(len(deal_ids), -1, dtype=np.int64)
+
+        pos = np.searchsorted(stored, deal_ids)
+        pos_clipped = np.minimum(pos, len(stored) - 1)
+        found = stored[pos_clipped] == deal_ids
+        return np.where(found, pos_clipped, -1)
+
+    def feature_matrix(self, deal_ids=None, columns: List[str] = None) -> np.ndarray:
+        """
+        Gather a feature matrix for the given deals
+
+        Args:
+            deal_ids: Deals to fetch (default: every stored deal, in store order)
+            columns: Columns to stack (default: MODEL_FEATURES)
+
+        Returns:
+            Array of shape (len(deal_ids), len(columns))
+        """
+        columns = columns or MODEL_FEATURES
+        if deal_ids is None:
+            return np.column_stack([self.column(c) for c in columns])
+
+        rows = self.rows_for(deal_ids)
+        if (rows < 0).any():
+            missing = np.asarray(deal_ids, dtype=str)[rows < 0][:5].tolist()
+            raise KeyError(f"Deals not in feature store: {missing}")
+        return np.column_stack([self.column(c)[rows] for c in columns])
+
+    def upsert(self, deals) -> Dict:
+        """
+        Add or refresh deals, recomputing features only for changed rows
+
+        Updates of existing deals write only the columns they change; new
+        deals rewrite every column, since rows stay sorted by deal_id.
+
+        Args:
+            deals: DataFrame or list of deal dictionaries with a deal_id
+
+        Returns:
+            Counts of inserted, updated and unchanged deals
+        """
+        frame = deals_to_frame(deals)
+        if 'deal_id' not in frame.columns:
+            if 'id' not in frame.columns:
+                raise ValueError("Deals must include an 'id' or 'deal_id' column")
+            frame = frame.rename(columns={'id': 'deal_id'})
+
+        # Last occurrence wins for repeated deal ids
+        frame = frame.drop_duplicates('deal_id', keep='last').reset_index(drop=True)
+        ids = frame['deal_id'].astype(str).to_numpy(dtype=str)
+        hashes = input_hashes(frame)
+
+        rows = self.rows_for(ids)
+        existing = rows >= 0
+        if existing.any():
+            unchanged = np.zeros(len(ids), dtype=bool)
+            unchanged[existing] = self._columns['input_hash'][rows[existing]] == hashes[existing]
+        else:
+            unchanged = np.zeros(len(ids), dtype=bool)
+
+        changed = ~unchanged
+        stats = {
+            'inserted': int((~existing).sum()),
+            'updated': int((existing & changed).sum()),
+            'unchanged': int(unchanged.sum())
+        }
+        if not changed.any():
+            return stats
+
+        subset = frame[changed].reset_index(drop=True)
+        derived = derive_features(subset)
+        computed = dict(zip(MODEL_FEATURES, model_feature_matrix(subset, derived).T))
+        for name in DERIVED_FEATURES:
+            computed.setdefault(name, derived[name].to_numpy(dtype=float))
+
+        values = {name: computed[name] for name in STORE_COLUMNS}
+        values['input_hash'] = hashes[changed]
+        values['deal_id'] = ids[changed]
+
+        update_rows = rows[existing & changed]
+        update_mask = existing[changed]
+        new_mask = ~update_mask
+
+        if new_mask.any():
+            # Overwrite updated rows, append new ones and re-sort: every column changes
+            empty = {'deal_id': np.array([], dtype=str), 'input_hash': np.array([], dtype=np.uint64)}
+            columns = {}
+            for name in FILE_COLUMNS:
+                column = np.array(self._columns.get(name, empty.get(name, np.array([], dtype=float))))
+                if name != 'deal_id':
+                    column[update_rows] = values[name][update_mask]
+                columns[name] = np.concatenate([column.astype(str) if name == 'deal_id' else column,
+                                                values[name][new_mask]])
+            order = np.argsort(columns['deal_id'], kind='stable')
+            columns = {name: column[order] for name, column in columns.items()}
+        else:
+            # Updates only: rewrite just the columns whose values differ
+            columns = {}
+            for name in FILE_COLUMNS[1:]:
+                stored = self._columns[name]
+                if np.array_equal(stored[update_rows], values[name], equal_nan=True):
+                    continue
+                column = np.array(stored)
+                column[update_rows] = values[name]
+                columns[name] = column
+
+        self._publish(columns)
+        return stats
+
+    def _publish(self, columns: Dict[str, np.ndarray]):
+        """
+        Write a new generation and atomically make it the live one
+
+        Args:
+            columns: Column arrays to write; columns left out are taken
+                unchanged from the live generation
+        """
+        generations = sorted(d for d in os.listdir(self.version_dir) if d.startswith('gen-'))
+        number = int(generations[-1].split('-')[1]) + 1 if generations else 1
+        name = f'gen-{number:06d}'
+        gen_dir = os.path.join(self.version_dir, name)
+        os.makedirs(gen_dir)
+
+        previous = os.path.join(self.version_dir, self._generation) if self._generation else None
+        for column in FILE_COLUMNS:
+            target = os.path.join(gen_dir, f'{column}.npy')
+            if column in columns:
+                np.save(target, columns[column])
+            else:
+                _link_or_copy(os.path.join(previous, f'{column}.npy'), target)
+        with open(os.path.join(gen_dir, 'meta.json'), 'w') as f:
+            json.dump({
+                'feature_version': self.feature_version,
+                'rows': int(len(columns['deal_id'])) if 'deal_id' in columns else len(self),
+                'columns': STORE_COLUMNS,
+                'written': sorted(columns)
+            }, f, indent=2)
+
+        tmp = os.path.join(self.version_dir, 'CURRENT.tmp')
+        with open(tmp, 'w') as f:
+            f.write(name)
+        os.replace(tmp, os.path.join(self.version_dir, 'CURRENT'))
+
+        # Drop our own mappings before pruning old generations
+        self._columns = {}
+        self._open()
+
+        for old in generations[:-KEEP_GENERATIONS or None]:
+            shutil.rmtree(os.path.join(self.version_dir, old), ignore_errors=True)
+
+
+def main():
+    """Update a feature store from a deals file"""
+    parser = argparse.ArgumentParser(
+        description='Build or incrementally update the deal feature store'
+    )
+    parser.add_argument(
+        '--store',
+        type=str,
+        default='feature_store',
+        help='Feature store directory (default: feature_store)'
+    )
+    parser.add_argument(
+        '--update',
+        type=str,
+        required=True,
+        help='CSV of deals (with deal_id or id) to add or refresh'
+    )
+
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    stats = store.upsert(pd.read_csv(args.update))
+
+    print(f"[INFO] Feature store v{store.feature_version}: {len(store)} deals")
+    print(f"[INFO] Inserted: {stats['inserted']}, updated: {stats['updated']}, unchanged: {stats['unchanged']}")
+
+
+if __name__ == '__main__':
+    main()
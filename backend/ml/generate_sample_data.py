@@ -41,7 +41,7 @@ def generate_sample_data(n_samples: int = 1000, default_rate: float = 0.15) -> p
     data = {
         'deal_id': [f'DEAL-{i:05d}' for i in range(n_samples)],
         'asset_type': np.random.choice(property_types, n_samples, p=property_weights),
-        'loan_amount': np.random.lognormal(15, 0.8, n_samples) * 100000,  # $1M-$50M range
+        'loan_amount': np.random.lognormal(15, 0.8, n_samples),  # ~$3M median, $0.5M-$20M typical
         'requested_ltv': np.random.normal(70, 10, n_samples),  # Mean 70%, std 10%
         'requested_rate': np.random.normal(7.5, 1.5, n_samples),  # Mean 7.5%, std 1.5%
         'requested_term_months': np.random.choice([24, 36, 48, 60, 84, 120], n_samples),
@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+"""
+Scoring Load Test
+=================
+Open-loop traffic replay against a Python scoring entry point, standing
+in for the Node caller (controllers/mlController.js).
+
+- Payloads: deals from a JSON / JSON-lines / CSV file, or synthetic deals
+  from generate_sample_data.py, shaped like mlController's dealData.
+  --stress adds each deal's stress-test scenarios (applyStressScenario)
+- Targets:
+    cli     one process per request with the deal as its argument, like
+            runPythonModel (default: risk_model_api.py)
+    server  one long-running JSON-lines process, {"id", "deal"} in and
+            {"id", "result"} out (default: worker_pool.py)
+- Arrivals follow a fixed schedule (Poisson or uniform) at the target
+  rate whether or not earlier requests have finished, and latency runs
+  from the scheduled send time, so queueing in the target is measured
+  rather than hidden
+- Report: throughput, p50/p95/p99 latency, error and fallback rates, and
+  RSS of the target's process tree, overall and per time window
+
+Responses are parsed the way the Node caller parses them: the whole of
+stdout must be one JSON document. A request counts as a fallback when
+the caller would serve rule-based scores: it failed, or Python answered
+from the rule table. With --deadline-ms, server requests carry a deadline
+and answers served from the pool's cache under overload are counted too.
+With --bulk-deals, bulk jobs ({"deals": [...]} at batch priority, see
+scheduler.py) run alongside the interactive traffic and are reported
+separately, to check that interactive latency holds while they run.
+
+RSS is read from /proc, so memory is only reported on Linux.
+
+Usage:
+    python load_test.py --target cli --rate 5 --duration 30
+    python load_test.py --target server --command "python3 worker_pool.py --workers 4" --rate 200 --duration 60
+    python load_test.py --target server --payloads deals.jsonl --stress --rate 200 --output load.json
+    python load_test.py --target server --deadline-ms 250 --rate 400
+    python load_test.py --target server --rate 50 --bulk-deals 100000 --bulk-interval 10
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_COMMANDS = {
+    'cli': [sys.executable, os.path.join(ML_DIR, 'risk_model_api.py')],
+    'server': [sys.executable, os.path.join(ML_DIR, 'worker_pool.py')]
+}
+
+# Fields mlController sends for a risk score
+DEAL_FIELDS = ['loan_amount', 'requested_ltv', 'requested_rate', 'requested_term_months', 'asset_type', 'loan_purpose']
+
+LOAN_PURPOSES = ['purchase', 'refinance', 'cash_out']
+
+# mlController's default stress-test scenarios
+STRESS_SCENARIOS = [
+    {'name': 'Interest Rate +2%', 'rate_increase': 2.0},
+    {'name': 'Occupancy -10%', 'occupancy_decrease': 10},
+    {'name': 'Property Value -15%', 'value_decrease': 15},
+    {'name': 'Combined Stress', 'rate_increase': 1.5, 'occupancy_decrease': 5, 'value_decrease': 10}
+]
+
+# Markers in model_version of results from the rule table and the cache
+RULES_VERSION_MARKER = '-rules'
+CACHED_VERSION_SUFFIX = '-cached'
+
+ARRIVALS = ['poisson', 'uniform']
+
+# Width of the timeline windows and the RSS sampling period
+DEFAULT_WINDOW_SECONDS = 1.0
+DEFAULT_SAMPLE_SECONDS = 0.25
+
+
+# ============================================================
+# Payloads
+# ============================================================
+
+def synthetic_payloads(n: int, seed: int = 42) -> List[Dict]:
+    """
+    Synthetic deals shaped like mlController's dealData
+
+    Args:
+        n: Number of deals
+        seed: Random seed for loan purposes
+
+    Returns:
+        List of deal dictionaries
+    """
+    from generate_sample_data import generate_sample_data
+
+    # Generator progress logs go to stderr with the rest of the diagnostics
+    with redirect_stdout(sys.stderr):
+        df = generate_sample_data(n)
+    df['loan_purpose'] = np.random.default_rng(seed).choice(LOAN_PURPOSES, n)
+    return df[DEAL_FIELDS].round(2).to_dict('records')
+
+
+def load_payloads(path: str) -> List[Dict]:
+    """Deals from a JSON (object or list), JSON-lines or CSV file"""
+    if path.endswith('.csv'):
+        return pd.read_csv(path).to_dict('records')
+
+    with open(path) as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        deals = json.load(f)
+    return deals if isinstance(deals, list) else [deals]
+
+
+def apply_stress_scenario(deal: Dict, scenario: Dict) -> Dict:
+    """Stressed copy of a deal (same fields and defaults as mlController's applyStressScenario)"""
+    stressed = dict(deal)
+
+    if scenario.get('rate_increase'):
+        stressed['requested_rate'] = (deal.get('requested_rate') or 7.5) + scenario['rate_increase']
+
+    if scenario.get('value_decrease'):
+        stressed['loan_amount'] = deal.get('loan_amount') * (1 - scenario['value_decrease'] / 100)
+
+    if scenario.get('occupancy_decrease'):
+        stressed['occupancy_rate'] = (deal.get('occupancy_rate') or 90) - scenario['occupancy_decrease']
+
+    # JSON.stringify drops undefined fields, so missing ones are left out
+    fields = ['loan_amount', 'requested_ltv', 'requested_rate', 'requested_term_months', 'asset_type', 'occupancy_rate']
+    return {field: stressed[field] for field in fields if stressed.get(field) is not None}
+
+
+def with_stress_scenarios(deals: List[Dict], scenarios: List[Dict] = None) -> List[Dict]:
+    """Each deal followed by its stress-test variants, as one stress-test call sends them"""
+    scenarios = STRESS_SCENARIOS if scenarios is None else scenarios
+    payloads = []
+    for deal in deals:
+        payloads.append(deal)
+        payloads.extend(apply_stress_scenario(deal, scenario) for scenario in scenarios)
+    return payloads
+
+
+def arrival_times(rate: float, duration: float, arrival: str = 'poisson', seed: int = 42) -> np.ndarray:
+    """
+    Send times (seconds from start) of an open-loop schedule
+
+    Args:
+        rate: Target requests per second
+        duration: Length of the run in seconds
+        arrival: 'poisson' (exponential gaps) or 'uniform' (fixed gaps)
+        seed: Random seed for Poisson gaps
+
+    Returns:
+        Sorted send offsets below duration
+    """
+    if rate <= 0 or duration <= 0:
+        raise ValueError("Rate and duration must be positive")
+    if arrival not in ARRIVALS:
+        raise ValueError(f"Unknown arrival process '{arrival}'. Expected one of {ARRIVALS}")
+
+    expected = int(np.ceil(rate * duration))
+    if arrival == 'uniform':
+        return np.arange(expected) / rate
+
+    # Draw generously so the schedule is not cut short, then trim to the duration
+    gaps = np.random.default_rng(seed).exponential(1 / rate, expected + 10 * int(np.sqrt(expected)) + 10)
+    times = np.cumsum(gaps) - gaps[0]
+    return times[times < duration]
+
+
+# ============================================================
+# Memory
+# ============================================================
+
+def _children(pid: int) -> List[int]:
+    pids = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return pids
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return 0
+
+
+def tree_rss_mb(pids: List[int]) -> Optional[float]:
+    """
+    Resident memory of processes and all their descendants
+
+    Shared pages (e.g. a model shared by forked workers) are counted once
+    per process, so this overstates the physical footprint of a pool.
+
+    Returns:
+        RSS in MB, or None where /proc is unavailable
+    """
+    if not os.path.isdir('/proc/self/task'):
+        return None
+    seen, stack, total = set(), list(pids), 0
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total += _rss_kb(pid)
+        stack.extend(_children(pid))
+    return round(total / 1024, 1)
+
+
+# ============================================================
+# Targets
+# ============================================================
+
+def _classify(result) -> str:
+    """'ok', 'cached', 'fallback' (rule table answered) or 'error' for a parsed response"""
+    if not isinstance(result, dict) or 'error' in result:
+        return 'error'
+    version = str(result.get('model_version', ''))
+    if RULES_VERSION_MARKER in version:
+        return 'fallback'
+    if version.endswith(CACHED_VERSION_SUFFIX):
+        return 'cached'
+    return 'ok'
+
+
+class CliTarget:
+    """
+    One scoring process per request, the way runPythonModel calls Python
+    """
+
+    def __init__(self, command: List[str], max_in_flight: int = 64, timeout: float = 30.0):
+        """
+        Args:
+            command: Command line; the deal JSON is appended as the last argument
+            max_in_flight: Processes running at once; later sends queue (and wait)
+            timeout: Seconds before a request is killed and counted as an error
+        """
+        self.command = command
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def pids(self) -> List[int]:
+        with self.lock:
+            return [process.pid for process in self.processes]
+
+    def _run(self, deal: Dict) -> Dict:
+        try:
+            process = subprocess.Popen(
+                self.command + [json.dumps(deal)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+        except OSError as e:
+            return {'status': 'error', 'error': f'failed to start: {e}'}
+        with self.lock:
+            self.processes.add(process)
+        try:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            return {'status': 'error', 'error': 'timeout'}
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+
+        if process.returncode != 0:
+            return {'status': 'error', 'error': f'exit {process.returncode}', 'detail': stderr[-200:]}
+        try:
+            result = json.loads(stdout)
+        except json.JSONDecodeError:
+            return {'status': 'error', 'error': 'unparseable stdout', 'detail': stdout[:200]}
+        status = _classify(result)
+        return {'status': status, 'error': result.get('message') if status == 'error' else None}
+
+    def send(self, deal: Dict, done: Callable[[Dict], None]):
+        self.pool.submit(self._run, deal).add_done_callback(lambda future: done(future.result()))
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        for pid in self.pids():
+            try:
+                os.kill(pid, 9)
+            except ProcessLookupError:
+                pass
+
+
+class ServerTarget:
+    """
+    A long-running JSON-lines scoring process (worker_pool.py protocol)
+    """
+
+    def __init__(self, command: List[str], deadline_ms: float = None, startup_timeout: float = 120.0):
+        """
+        Args:
+            command: Command line of the server
+            deadline_ms: Deadline sent with each request (optional)
+            startup_timeout: Seconds to wait for the warm-up request
+        """
+        self.command = command
+        self.deadline_ms = deadline_ms
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.callbacks: Dict[int, Callable[[Dict], None]] = {}
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.reader = None
+
+    def pids(self) -> List[int]:
+        return [self.process.pid] if self.process and self.process.poll() is None else []
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+                request_id = message['id']
+                result = message['results'] if 'results' in message else message['result']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+            with self.lock:
+                callback = self.callbacks.pop(request_id, None)
+            if callback is None:
+                continue
+            if isinstance(result, list):
+                failed = sum(1 for r in result if not isinstance(r, dict) or 'error' in r)
+                callback({'status': 'error' if failed else 'ok', 'deals': len(result), 'failed': failed})
+            else:
+                status = _classify(result)
+                callback({'status': status, 'error': result.get('message') if status == 'error' else None})
+
+        # Server exited: everything still in flight failed
+        with self.lock:
+            callbacks, self.callbacks = list(self.callbacks.values()), {}
+        for callback in callbacks:
+            callback({'status': 'error', 'error': 'server exited'})
+
+    def _write(self, message: Dict, done: Callable[[Dict], None]):
+        with self.lock:
+            request_id = self.next_id
+            self.next_id += 1
+            self.callbacks[request_id] = done
+            try:
+                message = {'id': request_id, **message}
+                # The warm-up request (id 0) always reaches the model
+                if self.deadline_ms is not None and request_id > 0 and 'deal' in message:
+                    message['deadline_ms'] = self.deadline_ms
+                self.process.stdin.write(json.dumps(message) + '\n')
+                self.process.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                self.callbacks.pop(request_id, None)
+                done({'status': 'error', 'error': 'server not accepting requests'})
+
+    def send(self, deal: Dict, done: Callable[[Dict], None]):
+        self._write({'deal': deal}, done)
+
+    def send_bulk(self, deals: List[Dict], done: Callable[[Dict], None]):
+        """Send one bulk job at batch priority"""
+        self._write({'deals': deals, 'priority': 'batch'}, done)
+
+    def start(self):
+        """Start the server and wait until it has answered one request"""
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+        ready = threading.Event()
+        self.send({'loan_amount': 1000000}, lambda response: ready.set())
+        if not ready.wait(self.startup_timeout):
+            raise TimeoutError(f"Server did not answer within {self.startup_timeout}s")
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=30)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+# ============================================================
+# Run
+# ============================================================
+
+def _percentiles(latencies) -> Dict:
+    if len(latencies) == 0:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None, 'mean': None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 2),
+        'p95': round(float(p95), 2),
+        'p99': round(float(p99), 2),
+        'max': round(float(np.max(latencies)), 2),
+        'mean': round(float(np.mean(latencies)), 2)
+    }
+
+
+def run_load(
+    target,
+    payloads: List[Dict],
+    rate: float,
+    duration: float,
+    arrival: str = 'poisson',
+    drain_timeout: float = 30.0,
+    window: float = DEFAULT_WINDOW_SECONDS,
+    sample_interval: float = DEFAULT_SAMPLE_SECONDS,
+    seed: int = 42,
+    bulk_deals: int = 0,
+    bulk_interval: float = None
+) -> Dict:
+    """
+    Replay payloads against a started target on an open-loop schedule
+
+    Args:
+        target: CliTarget or ServerTarget (already started)
+        payloads: Deals, sent in order and cycled as needed
+        rate: Target requests per second
+        duration: Seconds of traffic
+        arrival: One of ARRIVALS
+        drain_timeout: Seconds to wait for in-flight requests after the last send
+        window: Timeline window in seconds
+        sample_interval: RSS sampling period in seconds
+        seed: Random seed for the schedule
+        bulk_deals: Deals per bulk job sent alongside (ServerTarget only, 0 = none)
+        bulk_interval: Seconds between bulk job starts (default: one job)
+
+    Returns:
+        Report dictionary: summary, per-window timeline and RSS samples
+    """
+    if not payloads:
+        raise ValueError("No payloads to send")
+    if bulk_deals and not hasattr(target, 'send_bulk'):
+        raise ValueError("Bulk jobs need a server target")
+
+    schedule = arrival_times(rate, duration, arrival, seed)
+    n = len(schedule)
+    completed_at = np.full(n, np.nan)
+    status = np.full(n, '', dtype=object)
+    errors: Dict[str, int] = {}
+    lags = np.zeros(n)
+    finished = threading.Semaphore(0)
+    lock = threading.Lock()
+
+    rss_samples = []
+    sampling = threading.Event()
+
+    def sample_rss(origin: float):
+        while not sampling.is_set():
+            rss = tree_rss_mb(target.pids())
+            if rss is not None:
+                rss_samples.append((round(time.perf_counter() - origin, 3), rss))
+            sampling.wait(sample_interval)
+
+    def on_done(i: int, response: Dict):
+        completed_at[i] = time.perf_counter()
+        status[i] = response['status']
+        if response['status'] == 'error':
+            with lock:
+                key = str(response.get('error'))[:80]
+                errors[key] = errors.get(key, 0) + 1
+        finished.release()
+
+    bulk_jobs = []
+    bulk_done = threading.Semaphore(0)
+
+    def send_bulk_jobs(origin: float):
+        job = [payloads[i % len(payloads)] for i in range(bulk_deals)]
+        starts = np.arange(0, duration, bulk_interval) if bulk_interval else [0.0]
+        for offset in starts:
+            delay = origin + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            record = {'sent': time.perf_counter(), 'completed': None, 'status': None}
+            bulk_jobs.append(record)
+
+            def finish(response, record=record):
+                record['completed'] = time.perf_counter()
+                record['status'] = response['status']
+                bulk_done.release()
+
+            target.send_bulk(job, finish)
+
+    origin = time.perf_counter()
+    sampler = threading.Thread(target=sample_rss, args=(origin,), daemon=True)
+    sampler.start()
+    bulk_sender = None
+    if bulk_deals:
+        bulk_sender = threading.Thread(target=send_bulk_jobs, args=(origin,), daemon=True)
+        bulk_sender.start()
+
+    for i, offset in enumerate(schedule):
+        delay = origin + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lags[i] = max(0.0, -delay)
+        target.send(payloads[i % len(payloads)], lambda response, i=i: on_done(i, response))
+
+    # Drain: wait for stragglers up to the timeout, then count them as errors
+    deadline = time.perf_counter() + drain_timeout
+    for _ in range(n):
+        if not finished.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+            break
+    elapsed = time.perf_counter() - origin
+    if bulk_sender is not None:
+        bulk_sender.join()
+        for _ in range(len(bulk_jobs)):
+            if not bulk_done.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                break
+    sampling.set()
+    sampler.join()
+
+    sent_at = origin + schedule
+    done = ~np.isnan(completed_at)
+    unfinished = int(n - done.sum())
+    if unfinished:
+        errors['no response before drain timeout'] = unfinished
+    latency_ms = (completed_at - sent_at) * 1000
+    ok = done & (status == 'ok')
+    cached = done & (status == 'cached')
+    fallback = done & (status == 'fallback')
+    failed = n - int(ok.sum()) - int(cached.sum()) - int(fallback.sum())
+
+    timeline = []
+    finish_offsets = completed_at - origin
+    for start in np.arange(0, np.nanmax(finish_offsets, initial=0), window):
+        in_window = done & (finish_offsets >= start) & (finish_offsets < start + window)
+        rss = [value for t, value in rss_samples if start <= t < start + window]
+        timeline.append({
+            't': round(float(start), 2),
+            'sent': int(((schedule >= start) & (schedule < start + window)).sum()),
+            'completed': int(in_window.sum()),
+            'errors': int((in_window & (status == 'error')).sum()),
+            'fallbacks': int((in_window & ((status == 'error') | (status == 'fallback'))).sum()),
+            'latency_ms': _percentiles(latency_ms[in_window]),
+            'rss_mb': max(rss) if rss else None
+        })
+
+    rss_values = [value for _, value in rss_samples]
+    summary = {
+        'target': ' '.join(getattr(target, 'command', [])),
+        'arrival': arrival,
+        'offered_rate': rate,
+        'duration': duration,
+        'sent': n,
+        'completed': int(done.sum()),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': round(float(done.sum()) / elapsed, 2) if elapsed else None,
+        'latency_ms': _percentiles(latency_ms[done]),
+        'error_rate': round(failed / n, 4),
+        'fallback_rate': round((failed + int(fallback.sum())) / n, 4),
+        'rule_table_results': int(fallback.sum()),
+        'cached_results': int(cached.sum()),
+        'errors': dict(sorted(errors.items(), key=lambda item: -item[1])),
+        'max_send_lag_ms': round(float(lags.max()) * 1000, 2),
+        'rss_mb': {
+            'start': rss_values[0] if rss_values else None,
+            'peak': max(rss_values) if rss_values else None,
+            'end': rss_values[-1] if rss_values else None
+        },
+        'run_at': datetime.now().isoformat()
+    }
+    if bulk_jobs:
+        finished_jobs = [job for job in bulk_jobs if job['completed'] is not None]
+        job_seconds = [job['completed'] - job['sent'] for job in finished_jobs]
+        summary['bulk'] = {
+            'jobs': len(bulk_jobs),
+            'deals_per_job': bulk_deals,
+            'completed': len(finished_jobs),
+            'failed': sum(job['status'] != 'ok' for job in finished_jobs) + len(bulk_jobs) - len(finished_jobs),
+            'job_seconds': {
+                'mean': round(float(np.mean(job_seconds)), 3) if job_seconds else None,
+                'max': round(float(np.max(job_seconds)), 3) if job_seconds else None
+            },
+            'deals_per_second': (
+                round(len(finished_jobs) * bulk_deals / float(np.sum(job_seconds)), 1) if job_seconds else None
+            )
+        }
+    return {'summary': summary, 'timeline': timeline, 'rss_samples': rss_samples}
+
+
+def print_report(report: Dict):
+    """Print a load test summary and timeline"""
+    summary = report['summary']
+    latency = summary['latency_ms']
+
+    print(f"\nLoad Test: {summary['target']}")
+    print(f"  Offered:     {summary['offered_rate']} req/s ({summary['arrival']}) for {summary['duration']}s, "
+          f"{summary['sent']} requests")
+    print(f"  Throughput:  {summary['throughput']} req/s ({summary['completed']} completed "
+          f"in {summary['elapsed_seconds']:.1f}s)")
+    if latency['p50'] is not None:
+        print(f"  Latency:     p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+              f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms")
+    print(f"  Errors:      {summary['error_rate']:.2%}")
+    print(f"  Fallbacks:   {summary['fallback_rate']:.2%} (errors + {summary['rule_table_results']} rule-table results)")
+    if summary['cached_results']:
+        print(f"  Cached:      {summary['cached_results']} results served from the cache")
+    for message, count in list(summary['errors'].items())[:5]:
+        print(f"    {count:6d}  {message}")
+    bulk = summary.get('bulk')
+    if bulk:
+        print(f"  Bulk:        {bulk['completed']}/{bulk['jobs']} jobs of {bulk['deals_per_job']} deals "
+              f"({bulk['failed']} failed), mean {bulk['job_seconds']['mean']}s, "
+              f"{bulk['deals_per_second']} deals/s while running")
+    if summary['rss_mb']['peak'] is not None:
+        print(f"  RSS:         {summary['rss_mb']['start']} MB at start, {summary['rss_mb']['peak']} MB peak, "
+              f"{summary['rss_mb']['end']} MB at end")
+    if summary['max_send_lag_ms'] > 50:
+        print(f"[WARNING] Sends fell up to {summary['max_send_lag_ms']:.0f} ms behind schedule; "
+              f"the generator itself is saturated")
+
+    print(f"\n  {'t':>6s} {'sent':>6s} {'done':>6s} {'err':>5s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'RSS MB':>8s}")
+    for row in report['timeline']:
+        latency = row['latency_ms']
+        cells = [f"{latency[p]:8.1f}" if latency[p] is not None else f"{'-':>8s}" for p in ('p50', 'p95', 'p99')]
+        rss = f"{row['rss_mb']:8.1f}" if row['rss_mb'] is not None else f"{'-':>8s}"
+        print(f"  {row['t']:6.1f} {row['sent']:6d} {row['completed']:6d} {row['errors']:5d} {' '.join(cells)} {rss}")
+
+
+def main():
+    """Run an open-loop load test against a scoring entry point"""
+    parser = argparse.ArgumentParser(description='Open-loop load test of a risk scoring entry point')
+    parser.add_argument(
+        '--target',
+        type=str,
+        choices=['cli', 'server'],
+        default='server',
+        help='Process per request (cli) or one JSON-lines server (default: server)'
+    )
+    parser.add_argument(
+        '--command',
+        type=str,
+        default=None,
+        help='Command to run (default: risk_model_api.py for cli, worker_pool.py for server)'
+    )
+    parser.add_argument('--rate', type=float, default=50, help='Requests per second (default: 50)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of traffic (default: 30)')
+    parser.add_argument(
+        '--arrival',
+        type=str,
+        choices=ARRIVALS,
+        default='poisson',
+        help='Arrival process (default: poisson)'
+    )
+    parser.add_argument('--payloads', type=str, default=None, help='JSON, JSON-lines or CSV file of deals')
+    parser.add_argument(
+        '--synthetic',
+        type=int,
+        default=1000,
+        help='Synthetic deals to generate when no --payloads file is given (default: 1000)'
+    )
+    parser.add_argument('--stress', action='store_true', help='Add each deal\'s stress-test scenarios')
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=64,
+        help='Concurrent processes for the cli target (default: 64)'
+    )
+    parser.add_argument(
+        '--deadline-ms',
+        type=float,
+        default=None,
+        help='Deadline sent with each server request, see admission.py (optional)'
+    )
+    parser.add_argument(
+        '--bulk-deals',
+        type=int,
+        default=0,
+        help='Deals per bulk job sent alongside the server traffic, see scheduler.py (default: 0, none)'
+    )
+    parser.add_argument(
+        '--bulk-interval',
+        type=float,
+        default=None,
+        help='Seconds between bulk job starts (default: a single job)'
+    )
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request and drain timeout (default: 30)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', type=str, default=None, help='Write the full report to this JSON file')
+
+    args = parser.parse_args()
+
+    if args.bulk_deals and args.target != 'server':
+        parser.error('--bulk-deals needs --target server')
+
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(args.synthetic, args.seed)
+    if args.stress:
+        payloads = with_stress_scenarios(payloads)
+
+    command = shlex.split(args.command) if args.command else DEFAULT_COMMANDS[args.target]
+    if args.target == 'cli':
+        target = CliTarget(command, max_in_flight=args.max_in_flight, timeout=args.timeout)
+    else:
+        target = ServerTarget(command, deadline_ms=args.deadline_ms)
+
+    print(f"[INFO] {len(payloads)} payloads, {args.rate} req/s for {args.duration}s against: {' '.join(command)}")
+    target.start()
+    try:
+        report = run_load(
+            target, payloads, args.rate, args.duration,
+            arrival=args.arrival, drain_timeout=args.timeout, seed=args.seed,
+            bulk_deals=args.bulk_deals, bulk_interval=args.bulk_interval
+        )
+    finally:
+        target.stop()
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[INFO] Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Optimal Loan Sizing Solver
+==========================
+Finds the largest loan a deal supports subject to underwriting limits:
+
+- DSCR >= 1.2 (NOI over annual debt service)
+- LTV <= 80%
+- Model risk score <= a target (RiskAssessmentModel)
+
+Loan amount, rate and term are searched jointly. DSCR and LTV caps are
+solved in closed form per (rate, term) cell; the risk constraint is found
+by scoring a grid of candidate loan sizes for every cell in one batched
+predict_proba call and refining the crossing by vectorized bisection.
+The result is the constraint frontier: the max loan per (rate, term).
+
+Usage:
+    python loan_sizing.py '{"loan_amount": 5000000, "requested_ltv": 70}' --max-risk-score 40
+    python loan_sizing.py --batch pipeline.csv --rates 6.5,7.0,7.5 --terms 60,120
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from risk_model import (
+    RiskAssessmentModel,
+    annual_debt_service,
+    deals_to_frame,
+    derive_features,
+    get_model,
+    model_feature_matrix
+)
+
+# Underwriting limits (same as generateRecommendation's approval rules)
+MIN_DSCR = 1.2
+MAX_LTV = 0.80
+MAX_RISK_SCORE = 50
+
+
+class LoanSizer:
+    """
+    Batched loan sizing against DSCR, LTV and model risk constraints
+    """
+
+    def __init__(
+        self,
+        model: RiskAssessmentModel = None,
+        min_dscr: float = MIN_DSCR,
+        max_ltv: float = MAX_LTV,
+        max_risk_score: int = MAX_RISK_SCORE,
+        rates: List[float] = None,
+        terms: List[int] = None,
+        grid_points: int = 32,
+        tolerance: float = 1000.0,
+        max_iterations: int = 25
+    ):
+        """
+        Initialize sizer
+
+        Args:
+            model: Risk model (default: global model)
+            min_dscr: Minimum debt service coverage
+            max_ltv: Maximum loan-to-value (decimal)
+            max_risk_score: Highest acceptable model risk score (0-100)
+            rates: Candidate interest rates in % (default: each deal's own rate)
+            terms: Candidate terms in months (default: each deal's own term)
+            grid_points: Loan sizes scored per (rate, term) before bisection
+            tolerance: Bisection stops once the bracket is narrower (dollars)
+            max_iterations: Upper bound on bisection steps
+        """
+        self.model = model or get_model()
+        self.min_dscr = min_dscr
+        self.max_ltv = max_ltv
+        self.max_risk_score = max_risk_score
+        self.rates = rates
+        self.terms = terms
+        self.grid_points = grid_points
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    @property
+    def uses_model(self) -> bool:
+        return self.model is not None and self.model.model is not None
+
+    def _risk_scores(self, loans, value, noi, constant, base) -> np.ndarray:
+        """
+        Score candidate loans (any shape) for their deals in one model call
+
+        value, noi, constant and base rows broadcast against loans; base holds
+        the deal features that do not depend on loan size.
+        """
+        shape = loans.shape
+        loans = loans.ravel()
+        value, noi, constant = (np.broadcast_to(a, shape).ravel() for a in (value, noi, constant))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dscr = np.where(loans > 0, noi / (loans * constant), np.inf)
+        dscr = np.where(np.isfinite(dscr), dscr, 1e6)
+
+        features = np.empty((len(loans), base.shape[-1]))
+        features[:] = np.broadcast_to(base, shape + base.shape[-1:]).reshape(-1, base.shape[-1])
+        features[:, 0] = loans
+        features[:, 1] = loans / value
+        features[:, 2] = dscr
+
+        probs = self.model.predict_proba_batch(features)
+        return np.floor(probs * 100).astype(int).reshape(shape)
+
+    def size_batch(self, deals) -> List[Dict]:
+        """
+        Size a batch of deals
+
+        Args:
+            deals: DataFrame or list of deal dictionaries. property_value and
+                noi are used when present, otherwise derived like prepare_features
+
+        Returns:
+            One sizing result per deal with the (rate, term) frontier
+        """
+        frame = deals_to_frame(deals)
+        derived = derive_features(frame)
+        base = model_feature_matrix(frame, derived)
+        n_deals = len(frame)
+
+        value = derived['property_value'].to_numpy(dtype=float)
+        if 'property_value' in frame.columns:
+            supplied = pd.to_numeric(frame['property_value'], errors='coerce').to_numpy(dtype=float)
+            value = np.where(np.isnan(supplied), value, supplied)
+        noi = derived['noi'].to_numpy(dtype=float)
+        if 'noi' not in frame.columns:
+            noi = value * 0.06
+        noi = np.where(np.isnan(noi), value * 0.06, noi)
+
+        # (rate, term) cells, shape (deals, cells)
+        rates = np.asarray(self.rates, dtype=float) if self.rates else None
+        terms = np.asarray(self.terms, dtype=float) if self.terms else None
+        if rates is None:
+            rate_grid = frame['requested_rate'].to_numpy(dtype=float)[:, None]
+        else:
+            rate_grid = np.broadcast_to(rates, (n_deals, len(rates)))
+        if terms is None:
+            term_grid = frame['requested_term_months'].to_numpy(dtype=float)[:, None]
+        else:
+            term_grid = np.broadcast_to(terms, (n_deals, len(terms)))
+        rate_grid, term_grid = (
+            np.repeat(rate_grid, term_grid.shape[1], axis=1),
+            np.tile(term_grid, (1, rate_grid.shape[1]))
+        )
+        n_cells = rate_grid.shape[1]
+
+        # Closed-form DSCR and LTV caps per cell
+        constant = annual_debt_service(1.0, rate_grid, term_grid)
+        cap_ltv = np.broadcast_to((self.max_ltv * value)[:, None], constant.shape)
+        with np.errstate(divide='ignore'):
+            cap_dscr = np.where(constant > 0, noi[:, None] / (self.min_dscr * constant), np.inf)
+        cap = np.maximum(np.minimum(cap_ltv, cap_dscr), 0.0)
+        binding = np.where(cap_ltv <= cap_dscr, 'ltv', 'dscr').astype(object)
+
+        max_loan = cap.copy()
+        score_at = np.full(cap.shape, -1, dtype=int)
+        value_c = np.broadcast_to(value[:, None], cap.shape)
+        noi_c = np.broadcast_to(noi[:, None], cap.shape)
+        base_c = np.broadcast_to(base[:, None, :], cap.shape + (base.shape[1],))
+
+        if self.uses_model:
+            # Grid pass: every cell's candidate sizes in one model call
+            fractions = np.linspace(0, 1, self.grid_points + 1)[1:]
+            loans = cap[..., None] * fractions
+            scores = self._risk_scores(
+                loans,
+                value_c[..., None],
+                noi_c[..., None],
+                constant[..., None],
+                base_c[:, :, None, :]
+            )
+            feasible = scores <= self.max_risk_score
+
+            # Largest feasible grid size; bracket the crossing above it
+            any_feasible = feasible.any(axis=-1)
+            last = np.where(any_feasible, self.grid_points - 1 - np.argmax(feasible[..., ::-1], axis=-1), -1)
+            all_ok = last == self.grid_points - 1
+
+            lo = np.where(last >= 0, cap * fractions[np.maximum(last, 0)], 0.0)
+            hi = np.where(all_ok, cap, cap * fractions[np.minimum(last + 1, self.grid_points - 1)])
+            lo_score = np.where(
+                last >= 0,
+                np.take_along_axis(scores, np.maximum(last, 0)[..., None], axis=-1)[..., 0],
+                -1
+            )
+
+            # Vectorized bisection on the cells where risk binds
+            active = ~all_ok & (cap > 0)
+            for _ in range(self.max_iterations):
+                active &= (hi - lo) > self.tolerance
+                if not active.any():
+                    break
+                mid = (lo[active] + hi[active]) / 2
+                mid_scores = self._risk_scores(
+                    mid, value_c[active], noi_c[active], constant[active], base_c[active]
+                )
+                ok = mid_scores <= self.max_risk_score
+                lo_vals, hi_vals, lo_scores = lo[active], hi[active], lo_score[active]
+                lo_vals[ok] = mid[ok]
+                lo_scores[ok] = mid_scores[ok]
+                hi_vals[~ok] = mid[~ok]
+                lo[active], hi[active], lo_score[active] = lo_vals, hi_vals, lo_scores
+
+            max_loan = np.where(all_ok, cap, lo)
+            score_at = lo_score
+            binding = np.where(all_ok, binding, 'risk').astype(object)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ltv_at = np.where(value_c > 0, max_loan / value_c, np.nan)
+            dscr_at = np.where(max_loan > 0, noi_c / (max_loan * constant), np.nan)
+
+        results = []
+        for d in range(n_deals):
+            frontier = [
+                {
+                    'rate': float(rate_grid[d, c]),
+                    'term_months': int(term_grid[d, c]),
+                    'max_loan_amount': round(float(max_loan[d, c]), 2),
+                    'ltv': round(float(ltv_at[d, c]), 4) if max_loan[d, c] > 0 else None,
+                    'dscr': round(float(dscr_at[d, c]), 3) if max_loan[d, c] > 0 and np.isfinite(dscr_at[d, c]) else None,
+                    'risk_score': int(score_at[d, c]) if score_at[d, c] >= 0 else None,
+                    'binding_constraint': binding[d, c]
+                }
+                for c in range(n_cells)
+            ]
+            best = max(frontier, key=lambda cell: cell['max_loan_amount'])
+            results.append({
+                'max_loan_amount': best['max_loan_amount'],
+                'rate': best['rate'],
+                'term_months': best['term_months'],
+                'binding_constraint': best['binding_constraint'],
+                'property_value': round(float(value[d]), 2),
+                'noi': round(float(noi[d]), 2),
+                'constraints': {
+                    'min_dscr': self.min_dscr,
+                    'max_ltv': self.max_ltv,
+                    'max_risk_score': self.max_risk_score if self.uses_model else None
+                },
+                'frontier': frontier
+            })
+
+        return results
+
+    def size(self, deal: Dict) -> Dict:
+        """Size a single deal (see size_batch)"""
+        return self.size_batch([deal])[0]
+
+
+def _parse_list(text: str, cast) -> List:
+    return [cast(x) for x in text.split(',')] if text else None
+
+
+def main():
+    """Size one deal or a pipeline of deals"""
+    parser = argparse.ArgumentParser(
+        description='Largest loan a deal supports under DSCR, LTV and risk score limits'
+    )
+    parser.add_argument(
+        'deal',
+        nargs='?',
+        help='Deal JSON (omit when using --batch)'
+    )
+    parser.add_argument(
+        '--batch',
+        type=str,
+        default=None,
+        help='CSV of deals to size in one batch'
+    )
+    parser.add_argument(
+        '--max-risk-score',
+        type=int,
+        default=MAX_RISK_SCORE,
+        help=f'Highest acceptable risk score (default: {MAX_RISK_SCORE})'
+    )
+    parser.add_argument(
+        '--min-dscr',
+        type=float,
+        default=MIN_DSCR,
+        help=f'Minimum DSCR (default: {MIN_DSCR})'
+    )
+    parser.add_argument(
+        '--max-ltv',
+        type=float,
+        default=MAX_LTV,
+        help=f'Maximum LTV as a decimal (default: {MAX_LTV})'
+    )
+    parser.add_argument(
+        '--rates',
+        type=str,
+        default=None,
+        help='Comma-separated candidate rates in %% (default: deal rate)'
+    )
+    parser.add_argument(
+        '--terms',
+        type=str,
+        default=None,
+        help='Comma-separated candidate terms in months (default: deal term)'
+    )
+
+    args = parser.parse_args()
+
+    if not args.deal and not args.batch:
+        parser.error('Provide a deal JSON or --batch')
+
+    sizer = LoanSizer(
+        min_dscr=args.min_dscr,
+        max_ltv=args.max_ltv,
+        max_risk_score=args.max_risk_score,
+        rates=_parse_list(args.rates, float),
+        terms=_parse_list(args.terms, int)
+    )
+
+    started = time.time()
+    if args.batch:
+        results = sizer.size_batch(pd.read_csv(args.batch))
+    else:
+        results = [sizer.size(json.loads(args.deal))]
+    elapsed = time.time() - started
+
+    print(json.dumps(results if args.batch else results[0], indent=2))
+    print(f"[INFO] Sized {len(results)} deals in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
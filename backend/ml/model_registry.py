@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Per-Organization Model Registry
+===============================
+Serves org-specific model variants from one process, falling back to the
+global model (get_model) for orgs without one.
+
+Artifact store layout:
+    <root>/<org_id>/<version>.pkl     model artifacts (risk_model_trained.pkl layout)
+    <root>/<org_id>/CURRENT           name of the live version
+
+- Models are loaded lazily on first use and kept in an LRU cache under a
+  memory budget (artifact size is the per-model estimate); the global
+  model is always resident and never counted
+- CURRENT is re-read at most every refresh_seconds, so a newly published
+  version is picked up without a restart
+- predict_batch groups deals by resolved model and makes one call per
+  model; results carry a model_variant field ('global' or org/version)
+
+The registry exposes predict_risk_score/predict_batch like
+RiskAssessmentModel, so it can replace the model in worker_pool.py and
+risk_model_api.py. Deals name their org in an 'org_id' field.
+
+Usage:
+    python model_registry.py --publish org-123 models/org-123.pkl
+    python model_registry.py --list
+    python worker_pool.py --registry models/orgs
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from risk_model import RiskAssessmentModel, get_model, load_model_artifact
+
+DEFAULT_REGISTRY_ROOT = os.environ.get(
+    'RISK_MODEL_REGISTRY',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'orgs')
+)
+
+# Resident org models are evicted least-recently-used beyond this budget
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+# Seconds between checks of an org's CURRENT pointer
+DEFAULT_REFRESH_SECONDS = 30
+
+GLOBAL_VARIANT = 'global'
+
+# Registry key: (org_id, version)
+ModelKey = Tuple[str, str]
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, LRU-managed org model variants
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_REGISTRY_ROOT,
+        memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+        fallback: RiskAssessmentModel = None
+    ):
+        """
+        Initialize registry
+
+        Args:
+            root: Artifact store directory
+            memory_budget_mb: Resident size allowed for org models
+            refresh_seconds: How long an org's CURRENT version is cached
+            fallback: Model for orgs without a variant (default: get_model())
+        """
+        self.root = root
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.refresh_seconds = refresh_seconds
+        self._fallback = fallback
+
+        self._models: 'OrderedDict[ModelKey, Tuple[RiskAssessmentModel, int]]' = OrderedDict()
+        self._resident_bytes = 0
+        self._current: Dict[str, Tuple[Optional[str], float]] = {}
+        self._failed: Dict[ModelKey, float] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0, 'fallbacks': 0, 'load_errors': 0}
+
+    @property
+    def fallback(self) -> RiskAssessmentModel:
+        """Global model, loaded on first use"""
+        if self._fallback is None:
+            self._fallback = get_model()
+        return self._fallback
+
+    # Same attributes callers read from RiskAssessmentModel
+    @property
+    def model(self):
+        return self.fallback.model
+
+    @property
+    def model_version(self) -> str:
+        return self.fallback.model_version
+
+    def _org_dir(self, org_id: str) -> str:
+        # Org ids become directory names; keep them to one path component
+        return os.path.join(self.root, os.path.basename(str(org_id)))
+
+    def artifact_path(self, org_id: str, version: str) -> str:
+        return os.path.join(self._org_dir(org_id), f"{version}.pkl")
+
+    def current_version(self, org_id: str) -> Optional[str]:
+        """Live version for an org (None = use the global model)"""
+        now = time.monotonic()
+        cached = self._current.get(org_id)
+        if cached is not None and now - cached[1] < self.refresh_seconds:
+            return cached[0]
+
+        try:
+            with open(os.path.join(self._org_dir(org_id), 'CURRENT')) as f:
+                version = f.read().strip() or None
+        except OSError:
+            version = None
+        self._current[org_id] = (version, now)
+        return version
+
+    def versions(self, org_id: str) -> List[str]:
+        """Published versions for an org, oldest first"""
+        try:
+            names = os.listdir(self._org_dir(org_id))
+        except OSError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith('.pkl'))
+
+    def resolve(self, org_id: str = None, version: str = None) -> Tuple[Optional[ModelKey], RiskAssessmentModel]:
+        """
+        Model serving an org
+
+        Args:
+            org_id: Organization id (None = global model)
+            version: Pin a version (default: the org's CURRENT version)
+
+        Returns:
+            Tuple of (registry key or None for the global model, model)
+        """
+        if org_id is None:
+            return None, self.fallback
+        version = version or self.current_version(org_id)
+        if version is None:
+            return None, self.fallback
+
+        key = (str(org_id), version)
+        model = self._get(key)
+        if model is None:
+            self.stats['fallbacks'] += 1
+            return None, self.fallback
+        return key, model
+
+    def _get(self, key: ModelKey) -> Optional[RiskAssessmentModel]:
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+            failed_at = self._failed.get(key)
+            if failed_at is not None and time.monotonic() - failed_at < self.refresh_seconds:
+                return None
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One load per key; other keys keep being served meanwhile
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[0]
+
+            path = self.artifact_path(*key)
+            try:
+                model = load_model_artifact(path)
+                if model.model is None:
+                    raise ValueError("artifact has no trained model")
+            except Exception as e:
+                print(f"[WARNING] Could not load model {key[0]}/{key[1]}: {e}")
+                with self._lock:
+                    self._failed[key] = time.monotonic()
+                    self.stats['load_errors'] += 1
+                return None
+
+            size = os.path.getsize(path)
+            with self._lock:
+                self._failed.pop(key, None)
+                self._models[key] = (model, size)
+                self._resident_bytes += size
+                self.stats['loads'] += 1
+                self._evict()
+            return model
+
+    def _evict(self):
+        """Drop least-recently-used models until within budget (keeps the newest)"""
+        while self._resident_bytes > self.memory_budget and len(self._models) > 1:
+            _, (_, size) = self._models.popitem(last=False)
+            self._resident_bytes -= size
+            self.stats['evictions'] += 1
+
+    def predict_risk_score(self, deal_data: Dict) -> Dict:
+        """Score one deal with its org's model (see RiskAssessmentModel)"""
+        key, model = self.resolve(deal_data.get('org_id'))
+        result = model.predict_risk_score(deal_data)
+        result['model_variant'] = '/'.join(key) if key else GLOBAL_VARIANT
+        return result
+
+    def predict_batch(self, deals, org_ids: List[str] = None) -> List[Dict]:
+        """
+        Score deals with their orgs' models, one batch call per model
+
+        Args:
+            deals: List of deal dictionaries
+            org_ids: Org per deal (default: each deal's 'org_id')
+
+        Returns:
+            List of result dictionaries in input order
+        """
+        deals = list(deals)
+        if org_ids is None:
+            org_ids = [deal.get('org_id') for deal in deals]
+
+        resolved = {org_id: self.resolve(org_id) for org_id in set(org_ids)}
+        groups: Dict[Optional[ModelKey], List[int]] = {}
+        models = {}
+        for i, org_id in enumerate(org_ids):
+            key, model = resolved[org_id]
+            groups.setdefault(key, []).append(i)
+            models[key] = model
+
+        results: List[Optional[Dict]] = [None] * len(deals)
+        for key, rows in groups.items():
+            variant = '/'.join(key) if key else GLOBAL_VARIANT
+            for i, result in zip(rows, models[key].predict_batch([deals[i] for i in rows])):
+                result['model_variant'] = variant
+                results[i] = result
+        return results
+
+    def publish(self, org_id: str, artifact: str, version: str = None) -> str:
+        """
+        Add an artifact to the store and make it the org's live version
+
+        Args:
+            org_id: Organization id
+            artifact: Model artifact to copy in
+            version: Version name (default: timestamp)
+
+        Returns:
+            Published version
+        """
+        version = version or datetime.now().strftime('v%Y%m%d%H%M%S')
+        org_dir = self._org_dir(org_id)
+        os.makedirs(org_dir, exist_ok=True)
+
+        # Copy then rename so readers never see a partial file
+        target = self.artifact_path(org_id, version)
+        shutil.copy2(artifact, target + '.tmp')
+        os.replace(target + '.tmp', target)
+
+        current = os.path.join(org_dir, 'CURRENT')
+        with open(current + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(current + '.tmp', current)
+
+        self._current.pop(str(org_id), None)
+        return version
+
+    def status(self) -> Dict:
+        """Resident models, memory use and counters"""
+        with self._lock:
+            return {
+                'resident': ['/'.join(key) for key in self._models],
+                'resident_mb': round(self._resident_bytes / 1024 / 1024, 2),
+                'memory_budget_mb': round(self.memory_budget / 1024 / 1024, 2),
+                **self.stats
+            }
+
+
+# Global registry instance
+_registry_instance = None
+
+
+def get_registry() -> ModelRegistry:
+    """Get or create global registry instance"""
+    global _registry_instance
+    if _registry_instance is None:
+        _registry_instance = ModelRegistry()
+    return _registry_instance
+
+
+def main():
+    """Manage the org model artifact store"""
+    parser = argparse.ArgumentParser(description='Per-organization risk model registry')
+    parser.add_argument(
+        '--root',
+        type=str,
+        default=DEFAULT_REGISTRY_ROOT,
+        help=f'Artifact store directory (default: {DEFAULT_REGISTRY_ROOT})'
+    )
+    parser.add_argument(
+        '--publish',
+        nargs=2,
+        metavar=('ORG_ID', 'ARTIFACT'),
+        help='Copy a trained model into the store as the org\'s live version'
+    )
+    parser.add_argument('--version', type=str, default=None, help='Version name for --publish (default: timestamp)')
+    parser.add_argument('--list', action='store_true', help='List orgs with their live and published versions')
+
+    args = parser.parse_args()
+
+    # Only touches the store; the global model is never loaded here
+    registry = ModelRegistry(root=args.root, refresh_seconds=0)
+
+    if args.publish:
+        org_id, artifact = args.publish
+        if not os.path.exists(artifact):
+            raise FileNotFoundError(f"Model artifact not found: {artifact}")
+        version = registry.publish(org_id, artifact, args.version)
+        print(f"[SUCCESS] Published {org_id}/{version}")
+
+    if args.list:
+        orgs = sorted(os.listdir(args.root)) if os.path.isdir(args.root) else []
+        print(json.dumps({
+            org: {'current': registry.current_version(org), 'versions': registry.versions(org)}
+            for org in orgs
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
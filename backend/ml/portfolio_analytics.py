@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Portfolio Exposure Analytics
+============================
+Org-level concentration and expected loss over the scored book.
+
+- Exposure (balance, deal count, expected loss and balance-weighted PD)
+  is aggregated per org by asset type, LTV bucket and risk level
+- Expected loss = PD x LGD x balance; LGD comes from the deal or a
+  per-asset-type default
+- Herfindahl-Hirschman indices per dimension and single-name
+- Aggregates are kept incrementally: rescoring or removing deals
+  subtracts their old contribution and adds the new one with np.add.at,
+  so queries read a few small arrays instead of re-aggregating the book
+
+Usage:
+    python portfolio_analytics.py --input deals_export.csv --org <org_id>
+    python portfolio_analytics.py --input changed_deals.csv --state portfolio_state.npz
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from risk_model import RISK_LEVELS, deals_to_frame, get_model, risk_level_codes
+
+# Loss given default by asset type (share of balance lost on default)
+LGD_BY_ASSET_TYPE = {
+    'multifamily': 0.30,
+    'mhp': 0.30,
+    'industrial': 0.35,
+    'retail': 0.40,
+    'office': 0.40,
+    'mixed_use': 0.45,
+    'land': 0.60
+}
+DEFAULT_LGD = 0.40
+
+# LTV bucket edges (%): <60, 60-70, 70-75, 75-80, 80+
+LTV_BUCKET_EDGES = [60, 70, 75, 80]
+LTV_BUCKETS = ['<60%', '60-70%', '70-75%', '75-80%', '80%+']
+
+DIMENSIONS = ['asset_type', 'ltv_bucket', 'risk_level']
+
+# Per-group sums kept for every (org, dimension, group)
+MEASURES = ['deals', 'balance', 'expected_loss', 'pd_balance']
+
+# Org used for deals without an org_id
+DEFAULT_ORG = 'unassigned'
+
+
+def herfindahl(exposure: np.ndarray) -> float:
+    """Herfindahl-Hirschman index of exposure shares (0-1; 1 = one group)"""
+    total = exposure.sum()
+    return float(np.sum((exposure / total) ** 2)) if total > 0 else 0.0
+
+
+class PortfolioAnalytics:
+    """
+    Incrementally maintained exposure aggregates over the scored book
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Initialize an empty book
+
+        Args:
+            initial_capacity: Deal slots allocated up front (grows as needed)
+        """
+        self.deal_slots = {}
+        self.orgs = {}
+        self.asset_types = {name: code for code, name in enumerate(LGD_BY_ASSET_TYPE)}
+
+        # Per-deal state, one slot per deal ever seen
+        self.active = np.zeros(initial_capacity, dtype=bool)
+        self.org = np.zeros(initial_capacity, dtype=np.int64)
+        self.codes = {d: np.zeros(initial_capacity, dtype=np.int64) for d in DIMENSIONS}
+        self.balance = np.zeros(initial_capacity)
+        self.pd = np.zeros(initial_capacity)
+        self.lgd = np.zeros(initial_capacity)
+
+        # Aggregates: measure -> (orgs, groups) per dimension
+        self.aggregates = {d: {m: np.zeros((0, self._groups(d))) for m in MEASURES} for d in DIMENSIONS}
+        self.balance_squares = np.zeros(0)
+
+    def _groups(self, dimension: str) -> int:
+        if dimension == 'asset_type':
+            return len(self.asset_types)
+        return len(LTV_BUCKETS) if dimension == 'ltv_bucket' else len(RISK_LEVELS)
+
+    def _intern(self, table: Dict[str, int], values: np.ndarray) -> np.ndarray:
+        """Dictionary codes for values, adding unseen ones"""
+        for value in pd.unique(values):
+            table.setdefault(value, len(table))
+        return np.array([table[v] for v in values], dtype=np.int64)
+
+    def _reserve(self, deals: int):
+        """Grow per-deal arrays and aggregates to fit new slots, orgs and groups"""
+        if deals > len(self.active):
+            capacity = max(deals, 2 * len(self.active))
+            grow = lambda a: np.concatenate([a, np.zeros(capacity - len(a), dtype=a.dtype)])
+            self.active, self.org, self.balance, self.pd, self.lgd = (
+                grow(a) for a in (self.active, self.org, self.balance, self.pd, self.lgd)
+            )
+            self.codes = {d: grow(c) for d, c in self.codes.items()}
+
+        for dimension in DIMENSIONS:
+            for measure, values in self.aggregates[dimension].items():
+                rows, cols = len(self.orgs) - values.shape[0], self._groups(dimension) - values.shape[1]
+                if rows or cols:
+                    self.aggregates[dimension][measure] = np.pad(values, ((0, rows), (0, cols)))
+        self.balance_squares = np.pad(self.balance_squares, (0, len(self.orgs) - len(self.balance_squares)))
+
+    def _accumulate(self, slots: np.ndarray, sign: float):
+        """Add (sign=1) or remove (sign=-1) deals' contributions to the aggregates"""
+        if not len(slots):
+            return
+        org = self.org[slots]
+        balance = self.balance[slots]
+        contributions = {
+            'deals': np.full(len(slots), sign),
+            'balance': sign * balance,
+            'expected_loss': sign * self.pd[slots] * self.lgd[slots] * balance,
+            'pd_balance': sign * self.pd[slots] * balance
+        }
+        for dimension in DIMENSIONS:
+            index = (org, self.codes[dimension][slots])
+            for measure, values in contributions.items():
+                np.add.at(self.aggregates[dimension][measure], index, values)
+        np.add.at(self.balance_squares, org, sign * balance ** 2)
+
+    def update(self, deals, prob_default=None) -> Dict:
+        """
+        Add or rescore deals
+
+        Args:
+            deals: DataFrame or list of deal dictionaries with id/deal_id,
+                loan_amount (or balance), LTV, asset_type and optionally
+                org_id and lgd
+            prob_default: PD per deal (default: the deals' prob_default,
+                else risk_score / 100)
+
+        Returns:
+            Counts of inserted and updated deals
+        """
+        frame = deals_to_frame(deals)
+        if 'deal_id' not in frame.columns:
+            if 'id' not in frame.columns:
+                raise ValueError("Deals must include an 'id' or 'deal_id' column")
+            frame = frame.rename(columns={'id': 'deal_id'})
+
+        if prob_default is None:
+            if 'prob_default' in frame.columns:
+                prob_default = frame['prob_default']
+            elif 'risk_score' in frame.columns:
+                prob_default = frame['risk_score'] / 100
+            else:
+                raise ValueError("Provide prob_default or deals with prob_default/risk_score (see score_and_update)")
+        frame['prob_default'] = np.asarray(prob_default, dtype=float)
+
+        # Last occurrence wins for repeated deal ids
+        frame = frame.drop_duplicates('deal_id', keep='last').reset_index(drop=True)
+        ids = frame['deal_id'].astype(str).tolist()
+
+        known = np.array([i in self.deal_slots for i in ids], dtype=bool)
+        for deal_id in np.asarray(ids, dtype=object)[~known]:
+            self.deal_slots[deal_id] = len(self.deal_slots)
+        slots = np.array([self.deal_slots[i] for i in ids], dtype=np.int64)
+
+        if 'org_id' in frame.columns:
+            org_ids = frame['org_id'].fillna(DEFAULT_ORG).astype(str).to_numpy()
+        else:
+            org_ids = np.full(len(frame), DEFAULT_ORG)
+        org = self._intern(self.orgs, org_ids)
+        asset = self._intern(self.asset_types, frame['asset_type'].to_numpy())
+        self._reserve(len(self.deal_slots))
+
+        # Remove the previous contribution of rescored deals
+        self._accumulate(slots[known & self.active[slots]], -1.0)
+
+        ltv = frame['requested_ltv'].to_numpy(dtype=float)
+        ltv = np.where(ltv <= 1, ltv * 100, ltv)
+        balance = frame['balance'] if 'balance' in frame.columns else frame['loan_amount']
+        lgd = frame['asset_type'].map(LGD_BY_ASSET_TYPE).fillna(DEFAULT_LGD).to_numpy(dtype=float)
+        if 'lgd' in frame.columns:
+            lgd = frame['lgd'].fillna(pd.Series(lgd)).to_numpy(dtype=float)
+
+        self.active[slots] = True
+        self.org[slots] = org
+        self.balance[slots] = pd.to_numeric(balance, errors='coerce').fillna(0).to_numpy(dtype=float)
+        self.pd[slots] = np.clip(frame['prob_default'].to_numpy(dtype=float), 0, 1)
+        self.lgd[slots] = lgd
+        self.codes['asset_type'][slots] = asset
+        self.codes['ltv_bucket'][slots] = np.searchsorted(LTV_BUCKET_EDGES, ltv, side='right')
+        self.codes['risk_level'][slots] = risk_level_codes((self.pd[slots] * 100).astype(int))
+
+        self._accumulate(slots, 1.0)
+        return {'inserted': int((~known).sum()), 'updated': int(known.sum())}
+
+    def score_and_update(self, deals, model=None) -> Dict:
+        """
+        Score deals with the risk model (rules when unavailable) and update
+
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            model: RiskAssessmentModel (default: global model)
+        """
+        model = model or get_model()
+        frame = deals_to_frame(deals)
+        if model.model is not None:
+            prob_default = model.predict_proba_batch(model.prepare_features_batch(frame))
+        else:
+            prob_default = np.array([r['risk_score'] for r in model.rule_based_batch(frame)]) / 100
+        return self.update(frame, prob_default)
+
+    def remove(self, deal_ids: List[str]) -> int:
+        """
+        Take deals out of the book (e.g. paid off or declined)
+
+        Returns:
+            Number of active deals removed
+        """
+        slots = np.array([self.deal_slots[str(i)] for i in deal_ids if str(i) in self.deal_slots], dtype=np.int64)
+        slots = slots[self.active[slots]] if len(slots) else slots
+        self._accumulate(slots, -1.0)
+        self.active[slots] = False
+        return int(len(slots))
+
+    def rebuild(self):
+        """Recompute every aggregate from per-deal state (clears rounding drift)"""
+        for dimension in DIMENSIONS:
+            for values in self.aggregates[dimension].values():
+                values[:] = 0
+        self.balance_squares[:] = 0
+        self._accumulate(np.flatnonzero(self.active), 1.0)
+
+    def report(self, org_id: str = None) -> Dict:
+        """
+        Exposure and concentration for one org or the whole book
+
+        Args:
+            org_id: Org to report (default: every org combined)
+
+        Returns:
+            Dictionary with totals, HHI and per-dimension breakdowns
+        """
+        if org_id is not None and org_id not in self.orgs:
+            raise KeyError(f"Unknown org: {org_id}")
+
+        def select(values):
+            return values[self.orgs[org_id]] if org_id is not None else values.sum(axis=0)
+
+        labels = {
+            'asset_type': sorted(self.asset_types, key=self.asset_types.get),
+            'ltv_bucket': LTV_BUCKETS,
+            'risk_level': RISK_LEVELS
+        }
+
+        # Every dimension partitions the same deals; totals come from one
+        totals = {m: float(select(v).sum()) for m, v in self.aggregates['risk_level'].items()}
+        report = {
+            'org_id': org_id,
+            'deals': int(round(totals['deals'])),
+            'balance': round(totals['balance'], 2),
+            'expected_loss': round(totals['expected_loss'], 2),
+            'expected_loss_rate': round(totals['expected_loss'] / totals['balance'], 6) if totals['balance'] > 0 else 0.0
+        }
+
+        hhi = {}
+        for dimension in DIMENSIONS:
+            measures = {m: select(v) for m, v in self.aggregates[dimension].items()}
+            balance = np.maximum(measures['balance'], 0)
+            total = balance.sum()
+            hhi[dimension] = round(herfindahl(balance), 4)
+
+            report[f'by_{dimension}'] = [
+                {
+                    'group': label,
+                    'deals': int(round(measures['deals'][g])),
+                    'balance': round(float(balance[g]), 2),
+                    'share': round(float(balance[g] / total), 4) if total > 0 else 0.0,
+                    'expected_loss': round(float(measures['expected_loss'][g]), 2),
+                    'weighted_pd': round(float(measures['pd_balance'][g] / balance[g]), 4) if balance[g] > 0 else None
+                }
+                for g, label in enumerate(labels[dimension])
+                if round(measures['deals'][g]) > 0
+            ]
+
+        squares = select(self.balance_squares)
+        hhi['single_name'] = round(float(squares / totals['balance'] ** 2), 4) if totals['balance'] > 0 else 0.0
+        report['hhi'] = hhi
+        return report
+
+    def save(self, path: str):
+        """Persist the book (per-deal state and aggregates) to an .npz file"""
+        n = len(self.deal_slots)
+        arrays = {
+            'active': self.active[:n],
+            'org': self.org[:n],
+            'balance': self.balance[:n],
+            'pd': self.pd[:n],
+            'lgd': self.lgd[:n],
+            'balance_squares': self.balance_squares
+        }
+        arrays.update({f'code_{d}': c[:n] for d, c in self.codes.items()})
+        arrays.update({f'agg_{d}_{m}': v for d, measures in self.aggregates.items() for m, v in measures.items()})
+        keys = {
+            'deal_ids': sorted(self.deal_slots, key=self.deal_slots.get),
+            'orgs': sorted(self.orgs, key=self.orgs.get),
+            'asset_types': sorted(self.asset_types, key=self.asset_types.get)
+        }
+        np.savez(path, keys=json.dumps(keys), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'PortfolioAnalytics':
+        """Restore a book saved by save"""
+        state = np.load(path)
+        keys = json.loads(str(state['keys']))
+        book = cls(initial_capacity=max(len(keys['deal_ids']), 1))
+        book.deal_slots = {deal_id: i for i, deal_id in enumerate(keys['deal_ids'])}
+        book.orgs = {org: i for i, org in enumerate(keys['orgs'])}
+        book.asset_types = {name: i for i, name in enumerate(keys['asset_types'])}
+
+        n = len(book.deal_slots)
+        for name in ('active', 'org', 'balance', 'pd', 'lgd'):
+            getattr(book, name)[:n] = state[name]
+        for dimension in DIMENSIONS:
+            book.codes[dimension][:n] = state[f'code_{dimension}']
+            book.aggregates[dimension] = {m: state[f'agg_{dimension}_{m}'] for m in MEASURES}
+        book.balance_squares = state['balance_squares']
+        return book
+
+
+def main():
+    """Update the book from a deal export and print an exposure report"""
+    parser = argparse.ArgumentParser(
+        description='Portfolio concentration and expected loss analytics'
+    )
+    parser.add_argument(
+        '--input',
+        type=str,
+        default=None,
+        help='CSV of deals to add or rescore'
+    )
+    parser.add_argument(
+        '--state',
+        type=str,
+        default=None,
+        help='Saved book (.npz) to update and write back (optional)'
+    )
+    parser.add_argument(
+        '--org',
+        type=str,
+        default=None,
+        help='Org to report (default: whole book)'
+    )
+
+    args = parser.parse_args()
+
+    book = PortfolioAnalytics.load(args.state) if args.state and os.path.exists(args.state) else PortfolioAnalytics()
+
+    if args.input:
+        started = time.time()
+        stats = book.score_and_update(pd.read_csv(args.input))
+        print(f"[INFO] {stats['inserted']} deals added, {stats['updated']} rescored "
+              f"in {(time.time() - started) * 1000:.1f} ms")
+
+    started = time.time()
+    report = book.report(args.org)
+    print(json.dumps(report, indent=2))
+    print(f"[INFO] Report computed in {(time.time() - started) * 1000:.2f} ms")
+
+    if args.state:
+        book.save(args.state)
+        print(f"[INFO] Book saved to {args.state}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Portfolio Rescoring Job
+=======================
+Rescores every open deal from an export and writes one `risk_assessments`
+row per rescored deal (same columns mlController.getRiskScore inserts).
+
+- Deals are streamed from the export in chunks (CSV, Parquet or SQLite)
+- Deals whose normalized inputs and model artifact are unchanged since the
+  last run are skipped
+- Changed deals are scored with batched inference across a process pool
+- Results are bulk-written (executemany for SQLite, COPY for Postgres)
+- Progress is checkpointed per chunk, in the same transaction as the
+  chunk's output rows, so an interrupted run resumes where it stopped
+  without writing any chunk twice
+
+Usage:
+    python rescore_portfolio.py --input deals_export.csv --output risk.db
+    python rescore_portfolio.py --input deals.parquet --output postgresql://... --workers 8
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from data_validation import DataValidator
+from feature_store import FeatureStore, input_hashes
+from risk_model import deals_to_frame, get_model
+
+# Deals in these statuses are no longer part of the open book
+CLOSED_STATUSES = {'declined', 'closed', 'funded', 'withdrawn', 'archived'}
+
+RISK_ASSESSMENT_COLUMNS = [
+    'deal_id',
+    'org_id',
+    'risk_score',
+    'risk_level',
+    'confidence',
+    'risk_factors',
+    'model_version',
+    'assessed_by',
+    'created_at'
+]
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scored_deals (
+    deal_id TEXT PRIMARY KEY,
+    feature_hash TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    scored_at TEXT NOT NULL
+);
+"""
+
+# Kept in the output database so a chunk's rows and its checkpoint commit together
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+    run_key TEXT PRIMARY KEY,
+    chunks_done INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+SQLITE_RISK_ASSESSMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS risk_assessments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deal_id TEXT NOT NULL,
+    org_id TEXT,
+    risk_score INTEGER,
+    risk_level TEXT,
+    confidence REAL,
+    risk_factors TEXT,
+    model_version TEXT,
+    assessed_by TEXT,
+    created_at TEXT
+);
+"""
+
+
+# ============================================================
+# Input
+# ============================================================
+
+def iter_deal_chunks(source: str, chunk_size: int, table: str = 'deals') -> Iterator[pd.DataFrame]:
+    """
+    Stream deals from an export in chunks
+
+    Args:
+        source: Path to a .csv, .parquet or SQLite file
+        chunk_size: Rows per chunk
+        table: Table to read for SQLite sources
+
+    Yields:
+        DataFrame chunks
+    """
+    ext = os.path.splitext(source)[1].lower()
+
+    if ext == '.csv':
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+    elif ext == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow. Install with: pip install pyarrow")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+    elif ext in ('.db', '.sqlite', '.sqlite3'):
+        conn = sqlite3.connect(source)
+        try:
+            yield from pd.read_sql_query(f'SELECT * FROM {table} ORDER BY id', conn, chunksize=chunk_size)
+        finally:
+            conn.close()
+
+    else:
+        raise ValueError(f"Unsupported input format: {source}")
+
+
+def open_deals(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Drop deals that are no longer open"""
+    if 'id' in chunk.columns and 'deal_id' not in chunk.columns:
+        chunk = chunk.rename(columns={'id': 'deal_id'})
+    if 'deal_id' not in chunk.columns:
+        raise ValueError("Deal export must include an 'id' or 'deal_id' column")
+    if 'status' in chunk.columns:
+        chunk = chunk[~chunk['status'].astype(str).str.lower().isin(CLOSED_STATUSES)]
+    return chunk.reset_index(drop=True)
+
+
+def model_fingerprint(model) -> str:
+    """
+    Identify the loaded model artifact
+
+    Trainers save every artifact as version 1.0.0, so the version alone
+    cannot tell a newly promoted model from the previous one. The SHA-256
+    of the artifact file can.
+
+    Returns:
+        '<model_version>:<sha256 prefix>', or the version alone for the rule table
+    """
+    path = getattr(model, 'model_path', None)
+    if not path or not os.path.exists(path):
+        return model.model_version
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"{model.model_version}:{digest.hexdigest()[:16]}"
+
+
+# ============================================================
+# Scoring (process pool)
+# ============================================================
+
+_worker_model = None
+
+
+def _init_worker():
+    global _worker_model
+    _worker_model = get_model()
+
+
+def _score_records(records: List[Dict], features: np.ndarray = None) -> List[Dict]:
+    return _worker_model.predict_batch(records, features=features)
+
+
+# ============================================================
+# Output
+# ============================================================
+
+class AssessmentWriter:
+    """Bulk writer for risk_assessments rows"""
+
+    def __init__(self, target: str):
+        """
+        Args:
+            target: SQLite path or postgresql:// DSN
+        """
+        self.target = target
+        self.is_postgres = target.startswith(('postgres://', 'postgresql://'))
+
+        if self.is_postgres:
+            try:
+                import psycopg2
+            except ImportError:
+                raise ImportError("Postgres output requires psycopg2. Install with: pip install psycopg2-binary")
+            self.conn = psycopg2.connect(target)
+            with self.conn.cursor() as cur:
+                cur.execute(CHECKPOINT_SCHEMA)
+            self.conn.commit()
+        else:
+            self.conn = sqlite3.connect(target)
+            self.conn.executescript(SQLITE_RISK_ASSESSMENTS_SCHEMA + CHECKPOINT_SCHEMA)
+        self.param = '%s' if self.is_postgres else '?'
+
+    def _execute(self, sql: str, params: tuple = ()):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql.replace('?', self.param), params)
+            return cur.fetchall() if cur.description else None
+        finally:
+            cur.close()
+
+    def chunks_done(self, run_key: str) -> int:
+        """Chunks of a run already written, from its checkpoint"""
+        rows = self._execute('SELECT chunks_done FROM rescore_checkpoints WHERE run_key = ?', (run_key,))
+        self.conn.commit()
+        return rows[0][0] if rows else 0
+
+    def clear_checkpoint(self, run_key: str):
+        self._execute('DELETE FROM rescore_checkpoints WHERE run_key = ?', (run_key,))
+        self.conn.commit()
+
+    def write(self, rows: List[tuple], checkpoint: tuple = None):
+        """
+        Write rows and, in the same transaction, the run's checkpoint
+
+        Args:
+            rows: risk_assessments rows in RISK_ASSESSMENT_COLUMNS order
+            checkpoint: (run_key, chunks_done) recorded with the rows (optional)
+        """
+        if rows:
+            self._insert(rows)
+        if checkpoint is not None:
+            self._execute(
+                'INSERT INTO rescore_checkpoints VALUES (?, ?, ?) '
+                'ON CONFLICT (run_key) DO UPDATE SET chunks_done = excluded.chunks_done, '
+                'updated_at = excluded.updated_at',
+                (*checkpoint, datetime.now().isoformat())
+            )
+        self.conn.commit()
+
+    def _insert(self, rows: List[tuple]):
+        if self.is_postgres:
+            import io
+            import csv
+
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            with self.conn.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY risk_assessments ({', '.join(RISK_ASSESSMENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        else:
+            placeholders = ', '.join('?' for _ in RISK_ASSESSMENT_COLUMNS)
+            self.conn.executemany(
+                f"INSERT INTO risk_assessments ({', '.join(RISK_ASSESSMENT_COLUMNS)}) VALUES ({placeholders})",
+                rows
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+# ============================================================
+# Job
+# ============================================================
+
+class PortfolioRescorer:
+    """
+    Checkpointed, incremental rescoring of the open deal book
+    """
+
+    def __init__(
+        self,
+        state_path: str = 'rescore_state.db',
+        chunk_size: int = 10000,
+        workers: int = None,
+        assessed_by: str = None,
+        force: bool = False,
+        feature_store: FeatureStore = None,
+        validator: DataValidator = None
+    ):
+        """
+        Initialize rescoring job
+
+        Args:
+            state_path: SQLite file holding per-deal input and model hashes
+            chunk_size: Deals read, scored and written per checkpoint
+            workers: Scoring processes (default: CPU count)
+            assessed_by: Value for the assessed_by column (NULL for system runs)
+            force: Rescore every deal even if unchanged
+            feature_store: Read model features from this store instead of
+                deriving them per deal (optional)
+            validator: Skip and quarantine deals failing validation (optional)
+        """
+        self.state = sqlite3.connect(state_path)
+        self.state.executescript(STATE_SCHEMA)
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.assessed_by = assessed_by
+        self.force = force
+        self.feature_store = feature_store
+        self.validator = validator
+        self.model = get_model()
+        self.fingerprint = model_fingerprint(self.model)
+        self.stats = {'read': 0, 'quarantined': 0, 'skipped': 0, 'scored': 0, 'chunks': 0, 'resumed_chunks': 0}
+
+    def _run_key(self, source: str) -> str:
+        key = f"{os.path.abspath(source)}|{self.fingerprint}|{self.chunk_size}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _changed_mask(self, deal_ids: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        if self.force:
+            return np.ones(len(deal_ids), dtype=bool)
+
+        previous = {}
+        ids = deal_ids.tolist()
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(ids), 900):
+            batch = ids[start:start + 900]
+            previous.update(
+                (deal_id, (feature_hash, version))
+                for deal_id, feature_hash, version in self.state.execute(
+                    f"SELECT deal_id, feature_hash, model_version FROM scored_deals "
+                    f"WHERE deal_id IN ({', '.join('?' for _ in batch)})",
+                    batch
+                )
+            )
+
+        version = self.fingerprint
+        return np.array([
+            previous.get(deal_id) != (feature_hash, version)
+            for deal_id, feature_hash in zip(ids, hashes.tolist())
+        ], dtype=bool)
+
+    def run(self, source: str, writer: AssessmentWriter, restart: bool = False) -> Dict:
+        """
+        Rescore all open deals in source
+
+        Args:
+            source: Deal export (see iter_deal_chunks)
+            writer: Destination for risk_assessments rows
+            restart: Ignore any checkpoint left by an interrupted run
+
+        Returns:
+            Run statistics
+        """
+        run_key = self._run_key(source)
+        skip_chunks = 0 if restart else writer.chunks_done(run_key)
+        if skip_chunks:
+            print(f"[INFO] Resuming after {skip_chunks} completed chunks", file=sys.stderr)
+
+        started = time.time()
+        version = self.fingerprint
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            for index, chunk in enumerate(iter_deal_chunks(source, self.chunk_size)):
+                if index < skip_chunks:
+                    self.stats['resumed_chunks'] += 1
+                    continue
+
+                chunk = open_deals(chunk)
+                self.stats['read'] += len(chunk)
+                if self.validator is not None:
+                    passed = self.validator.validate(chunk)
+                    self.stats['quarantined'] += len(chunk) - len(passed)
+                    chunk = passed.reset_index(drop=True)
+                frame = deals_to_frame(chunk)
+
+                deal_ids = frame['deal_id'].astype(str).to_numpy()
+                hashes = input_hashes(frame).astype(str)
+                changed = self._changed_mask(deal_ids, hashes)
+                self.stats['skipped'] += int((~changed).sum())
+
+                to_score = frame[changed]
+                rows, scored = [], []
+                if len(to_score):
+                    records = to_score.to_dict('records')
+                    step = -(-len(records) // self.workers)
+                    batches = [records[i:i + step] for i in range(0, len(records), step)]
+
+                    if self.feature_store is not None:
+                        self.feature_store.upsert(to_score)
+                        features = self.feature_store.feature_matrix(deal_ids[changed])
+                        feature_batches = [features[i:i + step] for i in range(0, len(records), step)]
+                    else:
+                        feature_batches = [None] * len(batches)
+
+                    results = [
+                        r for batch in pool.map(_score_records, batches, feature_batches)
+                        for r in batch
+                    ]
+
+                    now = datetime.now().isoformat()
+                    org_ids = to_score['org_id'].tolist() if 'org_id' in to_score else [None] * len(to_score)
+                    rows = [
+                        (
+                            deal_id,
+                            org_id,
+                            result['risk_score'],
+                            result['risk_level'],
+                            result['confidence'],
+                            json.dumps(result['risk_factors']),
+                            result['model_version'],
+                            self.assessed_by,
+                            now
+                        )
+                        for deal_id, org_id, result in zip(deal_ids[changed].tolist(), org_ids, results)
+                    ]
+                    scored = [
+                        (deal_id, feature_hash, version, now)
+                        for deal_id, feature_hash in zip(deal_ids[changed].tolist(), hashes[changed].tolist())
+                    ]
+
+                # Rows and checkpoint commit together: a resumed run never writes a chunk twice.
+                # A crash before the hashes below commit only costs a rescore on the next run
+                writer.write(rows, checkpoint=(run_key, index + 1))
+                self.state.executemany('INSERT OR REPLACE INTO scored_deals VALUES (?, ?, ?, ?)', scored)
+                self.state.commit()
+                self.stats['scored'] += len(rows)
+                self.stats['chunks'] += 1
+
+                print(
+                    f"[INFO] Chunk {index + 1}: {len(frame)} deals, "
+                    f"{int(changed.sum())} rescored",
+                    file=sys.stderr
+                )
+
+        # Completed run: the next one starts from the beginning
+        writer.clear_checkpoint(run_key)
+
+        self.stats['elapsed_seconds'] = round(time.time() - started, 3)
+        return self.stats
+
+    def close(self):
+        self.state.close()
+
+
+def main():
+    """Main rescoring pipeline"""
+    parser = argparse.ArgumentParser(
+        description='Rescore all open deals and write risk_assessments rows'
+    )
+    parser.add_argument(
+        '--input',
+        type=str,
+        required=True,
+        help='Deal export: .csv, .parquet or SQLite file with a deals table'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='risk_assessments.db',
+        help='SQLite path or postgresql:// DSN for risk_assessments (default: risk_assessments.db)'
+    )
+    parser.add_argument(
+        '--state',
+        type=str,
+        default='rescore_state.db',
+        help='SQLite file for change detection (default: rescore_state.db)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=10000,
+        help='Deals per chunk/checkpoint (default: 10000)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Scoring processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--feature-store',
+        type=str,
+        default=None,
+        help='Feature store directory to read model features from (optional)'
+    )
+    parser.add_argument(
+        '--quarantine',
+        type=str,
+        default=None,
+        help='CSV for deals that fail validation (optional; they are skipped either way)'
+    )
+    parser.add_argument(
+        '--skip-validation',
+        action='store_true',
+        help='Score every open deal without validation'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rescore every deal, even if unchanged since the last run'
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Ignore the checkpoint of an interrupted run'
+    )
+
+    args = parser.parse_args()
+
+    rescorer = PortfolioRescorer(
+        state_path=args.state,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        force=args.force,
+        feature_store=FeatureStore(args.feature_store) if args.feature_store else None,
+        validator=None if args.skip_validation else DataValidator(quarantine_path=args.quarantine)
+    )
+    writer = AssessmentWriter(args.output)
+
+    try:
+        stats = rescorer.run(args.input, writer, restart=args.restart)
+    finally:
+        writer.close()
+        rescorer.close()
+
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
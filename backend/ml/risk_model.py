@@ -18,9 +18,15 @@ Output: Risk score (0-100) + confidence interval
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+from decimal import ROUND_HALF_UP, Decimal
 import json
 import os
+import time
+
+from drift_monitor import DriftMonitor
+from sampling import correct_probabilities
+from shadow_scoring import DEFAULT_DEAL_CAPACITY, ShadowLog
 
 # For production, install: pip install xgboost scikit-learn
 try:
@@ -32,6 +38,519 @@ except ImportError:
     HAS_ML_LIBS = False
     print("[WARNING] ML libraries not installed. Install with: pip install xgboost scikit-learn")
 
+# Feature layout expected by the trained model
+MODEL_FEATURES = [
+    'loan_amount',
+    'ltv',
+    'dscr',
+    'borrower_credit_score',
+    'occupancy_rate',
+    'property_age'
+]
+
+# Defaults for missing deal fields (same fallbacks as prepare_features)
+DEAL_DEFAULTS = {
+    'loan_amount': 0.0,
+    'requested_ltv': 75.0,
+    'requested_rate': 7.5,
+    'requested_term_months': 36,
+    'asset_type': 'multifamily',
+    'borrower_credit_score': 720,
+    'occupancy_rate': 0.9,
+    'property_age': 15
+}
+
+# Alternate column names used by training data and exports
+DEAL_ALIASES = {
+    'ltv': 'requested_ltv',
+    'rate': 'requested_rate',
+    'term_months': 'requested_term_months',
+    'property_type': 'asset_type',
+    'credit_score': 'borrower_credit_score',
+    'occupancy': 'occupancy_rate'
+}
+
+# Derived metrics computed from raw deal fields (see derive_features)
+DERIVED_FEATURES = [
+    'property_value',
+    'noi',
+    'annual_debt_service',
+    'dscr',
+    'cap_rate'
+]
+
+# Bump whenever derive_features or the model feature layout changes
+FEATURE_VERSION = 1
+
+# Risk levels by score band: <30, <50, <70, >=70 (see _get_risk_level)
+RISK_LEVELS = ['low', 'moderate', 'elevated', 'high']
+RISK_LEVEL_THRESHOLDS = [30, 50, 70]
+
+# Model-based risk factors, in reporting order. 'percent' features are
+# shown as percentages (decimals are scaled by 100 first)
+MODEL_RISK_FACTORS = [
+    {'factor': 'High Loan-to-Value Ratio', 'impact': 'high', 'feature': 'ltv',
+     'percent': True, 'op': '>', 'threshold': 80, 'format': 'percent1'},
+    {'factor': 'Low Debt Service Coverage', 'impact': 'high', 'feature': 'dscr',
+     'op': '<', 'threshold': 1.25, 'format': 'multiple'},
+    {'factor': 'Below Average Credit Score', 'impact': 'medium', 'feature': 'borrower_credit_score',
+     'op': '<', 'threshold': 680, 'format': 'integer'},
+    {'factor': 'Low Occupancy Rate', 'impact': 'medium', 'feature': 'occupancy_rate',
+     'percent': True, 'op': '<', 'threshold': 85, 'format': 'percent1'},
+    {'factor': 'Older Property', 'impact': 'low', 'feature': 'property_age',
+     'op': '>', 'threshold': 30, 'format': 'years'}
+]
+MAX_RISK_FACTORS = 5
+
+# Rule table shared with the Node fallback (lib/fallbackRiskScore.js)
+FALLBACK_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fallback_rules.json')
+
+
+def deals_to_frame(deals) -> pd.DataFrame:
+    """
+    Normalize a batch of deals into a DataFrame with every scoring field
+    
+    Args:
+        deals: DataFrame or list of deal dictionaries
+        
+    Returns:
+        DataFrame with DEAL_DEFAULTS columns filled in
+    """
+    frame = deals.copy() if isinstance(deals, pd.DataFrame) else pd.DataFrame(list(deals))
+    frame = frame.reset_index(drop=True)
+    
+    aliases = {
+        alias: column for alias, column in DEAL_ALIASES.items()
+        if alias in frame.columns and column not in frame.columns
+    }
+    frame = frame.rename(columns=aliases)
+    
+    for column, default in DEAL_DEFAULTS.items():
+        if column not in frame.columns:
+            frame[column] = default
+        else:
+            frame[column] = frame[column].fillna(default)
+    
+    frame['asset_type'] = frame['asset_type'].astype(str).str.lower()
+    return frame
+
+
+def apply_aliases(deal: Dict) -> Dict:
+    """Single-deal counterpart of the DEAL_ALIASES renaming in deals_to_frame"""
+    renamed = {
+        column: deal[alias] for alias, column in DEAL_ALIASES.items()
+        if alias in deal and column not in deal
+    }
+    return {**deal, **renamed} if renamed else deal
+
+
+def annual_debt_service(loan_amount, interest_rate, term_months) -> np.ndarray:
+    """Vectorized annual debt service (see _calculate_annual_debt_service)"""
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    monthly_rate = np.asarray(interest_rate, dtype=float) / 100 / 12
+    num_payments = np.asarray(term_months, dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + monthly_rate) ** num_payments
+        amortizing = loan_amount * monthly_rate * growth / (growth - 1)
+        monthly_payment = np.where(monthly_rate == 0, loan_amount / num_payments, amortizing)
+    
+    return np.where(num_payments == 0, 0.0, monthly_payment * 12)
+
+
+def _provided(frame: pd.DataFrame, column: str, computed: np.ndarray) -> np.ndarray:
+    """Use a deal's own value for column where present, else the computed one"""
+    if column not in frame.columns:
+        return computed
+    values = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=float)
+    return np.where(np.isnan(values), computed, values)
+
+
+def derive_features(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized derived deal metrics
+    
+    Property value is backed out of the LTV, NOI is estimated at 6% of value
+    and DSCR/cap rate follow from those, unless the deal supplies its own
+    noi, dscr or cap_rate.
+    
+    Args:
+        frame: Output of deals_to_frame
+        
+    Returns:
+        DataFrame with DERIVED_FEATURES columns
+    """
+    ltv = frame['requested_ltv'].to_numpy(dtype=float)
+    loan_amount = frame['loan_amount'].to_numpy(dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        property_value = np.where(ltv > 0, loan_amount / (ltv / 100), loan_amount * 1.5)
+        noi = _provided(frame, 'noi', property_value * 0.06)
+        debt_service = annual_debt_service(
+            loan_amount,
+            frame['requested_rate'].to_numpy(dtype=float),
+            frame['requested_term_months'].to_numpy(dtype=float)
+        )
+        dscr = _provided(frame, 'dscr', np.where(debt_service > 0, noi / debt_service, 1.0))
+        cap_rate = _provided(
+            frame, 'cap_rate', np.where(property_value > 0, noi / property_value * 100, 6.0)
+        )
+    
+    return pd.DataFrame({
+        'property_value': property_value,
+        'noi': noi,
+        'annual_debt_service': debt_service,
+        'dscr': dscr,
+        'cap_rate': cap_rate
+    })
+
+
+def model_feature_matrix(frame: pd.DataFrame, derived: pd.DataFrame) -> np.ndarray:
+    """
+    Assemble the MODEL_FEATURES matrix from normalized deals and their
+    derived metrics (LTV and occupancy as decimals)
+    """
+    ltv = frame['requested_ltv'].to_numpy(dtype=float)
+    occupancy = frame['occupancy_rate'].to_numpy(dtype=float)
+    
+    return np.column_stack([
+        frame['loan_amount'].to_numpy(dtype=float),
+        np.where(ltv > 1, ltv / 100, ltv),
+        derived['dscr'].to_numpy(dtype=float),
+        frame['borrower_credit_score'].to_numpy(dtype=float),
+        np.where(occupancy > 1, occupancy / 100, occupancy),
+        frame['property_age'].to_numpy(dtype=float)
+    ])
+
+
+def risk_level_codes(scores) -> np.ndarray:
+    """Vectorized _get_risk_level, as indices into RISK_LEVELS"""
+    return np.searchsorted(RISK_LEVEL_THRESHOLDS, np.asarray(scores), side='right')
+
+
+def _round_half_up(value: float, places: int) -> Decimal:
+    """
+    Round a float's exact binary value half away from zero, like JavaScript's toFixed
+
+    The fallback rule factors must read the same as lib/fallbackRiskScore.js;
+    Python's own float formatting rounds half to even.
+    """
+    return Decimal(value).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+
+
+def _format_percent(values: np.ndarray) -> List[str]:
+    return [format(_round_half_up(value, 2), 'f').rstrip('0').rstrip('.') + '%' for value in values.tolist()]
+
+
+def _format_currency(values: np.ndarray) -> List[str]:
+    return [f'${_round_half_up(value, 0):,.0f}' for value in values.tolist()]
+
+
+def _format_title(values: np.ndarray) -> List[str]:
+    return [' '.join(word.capitalize() for word in str(value).split('_')) for value in values.tolist()]
+
+
+def _format_percent1(values: np.ndarray) -> List[str]:
+    return [f'{value:.1f}%' for value in values.tolist()]
+
+
+def _format_multiple(values: np.ndarray) -> List[str]:
+    return [f'{value:.2f}x' for value in values.tolist()]
+
+
+def _format_integer(values: np.ndarray) -> List[str]:
+    return [f'{int(value)}' for value in values.tolist()]
+
+
+def _format_years(values: np.ndarray) -> List[str]:
+    return [f'{int(value)} years' for value in values.tolist()]
+
+
+MODEL_FACTOR_FORMATTERS = {
+    'percent1': _format_percent1,
+    'multiple': _format_multiple,
+    'integer': _format_integer,
+    'years': _format_years
+}
+
+FACTOR_COMPARISONS = {
+    '>': np.greater,
+    '<': np.less
+}
+
+
+def risk_factor_matrix(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized MODEL_RISK_FACTORS checks (see _identify_risk_factors)
+    
+    Args:
+        features: MODEL_FEATURES matrix
+        
+    Returns:
+        Tuple of (displayed values, match mask), each (deals, factors)
+    """
+    features = np.atleast_2d(np.asarray(features, dtype=float))
+    values = np.empty((len(features), len(MODEL_RISK_FACTORS)))
+    mask = np.empty(values.shape, dtype=bool)
+    
+    for j, spec in enumerate(MODEL_RISK_FACTORS):
+        column = features[:, MODEL_FEATURES.index(spec['feature'])]
+        if spec.get('percent'):
+            column = np.where(column <= 1, column * 100, column)
+        values[:, j] = column
+        mask[:, j] = FACTOR_COMPARISONS[spec['op']](column, spec['threshold'])
+    
+    return values, mask
+
+
+def columnar_results(
+    scores: np.ndarray,
+    confidence: np.ndarray,
+    model_version: str,
+    factor_dictionary: List[Dict],
+    factor_rows: np.ndarray,
+    factor_codes: np.ndarray,
+    factor_values: np.ndarray
+) -> Dict:
+    """
+    Assemble a columnar batch response
+    
+    Scores, level codes and confidence are parallel arrays. Risk factors are
+    stored CSR-style: deal i owns factor_codes/factor_values entries
+    factor_offsets[i]:factor_offsets[i + 1]. Codes index factor_dictionary,
+    whose entries carry the label and impact once per batch plus either a
+    'format' for the numeric value or a fixed 'value'.
+    
+    Args:
+        scores: Risk score per deal
+        confidence: Confidence (%) per deal
+        model_version: Version tag for every deal
+        factor_dictionary: Interned factor entries
+        factor_rows: Deal index of each factor, sorted
+        factor_codes: Dictionary code of each factor
+        factor_values: Numeric value of each factor (NaN for fixed values)
+        
+    Returns:
+        Dictionary of arrays (see result_encoding.py for wire formats)
+    """
+    scores = np.asarray(scores)
+    counts = np.bincount(np.asarray(factor_rows, dtype=np.int64), minlength=len(scores))
+    code_type = np.uint8 if len(factor_dictionary) <= 256 else np.uint16
+    
+    return {
+        'count': int(len(scores)),
+        'model_version': model_version,
+        'risk_levels': RISK_LEVELS,
+        'factor_dictionary': factor_dictionary,
+        'risk_score': scores.astype(np.int16),
+        'risk_level': risk_level_codes(scores).astype(np.uint8),
+        # Hundredths of a percent, exact for the two-decimal row format
+        'confidence_x100': np.rint(np.asarray(confidence, dtype=float) * 100).astype(np.uint16),
+        'factor_offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int32),
+        'factor_codes': np.asarray(factor_codes).astype(code_type),
+        'factor_values': np.asarray(factor_values, dtype=np.float64)
+    }
+
+
+class RuleTable:
+    """
+    Declarative risk rules compiled into vectorized NumPy checks
+    
+    Each rule compares one deal field against a threshold and, when it
+    matches, adds its score delta and (optionally) a labelled risk factor.
+    Rules sharing a group behave like an if/elif chain: only the first
+    matching rule of the group applies.
+    """
+    
+    FORMATTERS = {
+        'percent': _format_percent,
+        'currency': _format_currency,
+        'title': _format_title
+    }
+    
+    OPERATORS = {
+        '>': np.greater,
+        '>=': np.greater_equal,
+        '<': np.less,
+        '<=': np.less_equal,
+        'in': lambda values, options: np.isin(values, [str(o).lower() for o in options])
+    }
+    
+    def __init__(self, spec: Dict):
+        """
+        Compile a rule table
+        
+        Args:
+            spec: Parsed rule table (see fallback_rules.json)
+        """
+        self.base_score = spec['base_score']
+        self.min_score = spec.get('min_score', 0)
+        self.max_score = spec.get('max_score', 100)
+        self.confidence = spec.get('confidence', 75.0)
+        self.defaults = spec.get('defaults', {})
+        self.rules = spec['rules']
+        
+        for rule in self.rules:
+            if rule['op'] not in self.OPERATORS:
+                raise ValueError(f"Unsupported rule operator: {rule['op']}")
+            if rule.get('factor') and rule.get('format') not in self.FORMATTERS:
+                raise ValueError(f"Unsupported factor format: {rule.get('format')}")
+        
+        self.fields = list(dict.fromkeys(rule['field'] for rule in self.rules))
+        self.text_fields = {rule['field'] for rule in self.rules if rule['op'] == 'in'}
+    
+    @classmethod
+    def load(cls, path: str = FALLBACK_RULES_PATH) -> 'RuleTable':
+        """Load and compile a rule table from JSON"""
+        with open(path) as f:
+            return cls(json.load(f))
+    
+    def columns(self, deals) -> Dict[str, np.ndarray]:
+        """
+        Extract the rule fields of a batch of deals as arrays, with defaults
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+        """
+        columns = {}
+        for field in self.fields:
+            default = self.defaults.get(field)
+            if isinstance(deals, pd.DataFrame):
+                raw = deals[field] if field in deals.columns else pd.Series([None] * len(deals))
+                if field in self.text_fields:
+                    values = raw.where(raw.notna(), default or '').astype(str).str.lower().to_numpy()
+                else:
+                    values = pd.to_numeric(raw, errors='coerce').fillna(default).to_numpy(dtype=float)
+            else:
+                # Plain lists keep single-deal scoring free of pandas overhead
+                raw = [deal.get(field) for deal in deals]
+                if field in self.text_fields:
+                    values = np.array([(default or '') if pd.isna(v) else str(v).lower() for v in raw])
+                else:
+                    values = np.array([default if pd.isna(v) else v for v in raw], dtype=float)
+            columns[field] = values
+        return columns
+    
+    def evaluate(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Evaluate every rule over a batch
+        
+        Args:
+            columns: Output of columns()
+            
+        Returns:
+            Tuple of (clipped scores, one match mask per rule)
+        """
+        size = len(next(iter(columns.values()))) if columns else 0
+        scores = np.full(size, self.base_score, dtype=np.int64)
+        matched_groups = {}
+        masks = []
+        
+        for rule in self.rules:
+            mask = self.OPERATORS[rule['op']](columns[rule['field']], rule['threshold'])
+            group = rule.get('group')
+            if group is not None:
+                taken = matched_groups.get(group, np.zeros(size, dtype=bool))
+                mask = mask & ~taken
+                matched_groups[group] = taken | mask
+            scores += rule['delta'] * mask
+            masks.append(mask)
+        
+        return np.clip(scores, self.min_score, self.max_score), masks
+    
+    def score(self, deals, model_version: str = '1.0.0-rules') -> List[Dict]:
+        """
+        Score a batch of deals
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            model_version: Version tag for the results
+            
+        Returns:
+            List of result dictionaries, same shape as predict_risk_score
+        """
+        columns = self.columns(deals)
+        scores, masks = self.evaluate(columns)
+        factors = [[] for _ in range(len(scores))]
+        
+        for rule, mask in zip(self.rules, masks):
+            if not rule.get('factor'):
+                continue
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            label, impact = rule['factor'], rule['impact']
+            values = self.FORMATTERS[rule['format']](columns[rule['field']][rows])
+            for i, value in zip(rows.tolist(), values):
+                factors[i].append({'factor': label, 'value': value, 'impact': impact})
+        
+        levels = risk_level_codes(scores)
+        return [
+            {
+                'risk_score': score,
+                'confidence': self.confidence,
+                'risk_level': RISK_LEVELS[level],
+                'risk_factors': deal_factors,
+                'model_version': model_version
+            }
+            for score, level, deal_factors in zip(scores.tolist(), levels.tolist(), factors)
+        ]
+    
+    def score_columnar(self, deals, model_version: str = '1.0.0-rules') -> Dict:
+        """
+        Score a batch of deals into a columnar response
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            model_version: Version tag for the results
+            
+        Returns:
+            Columnar result dictionary (see columnar_results)
+        """
+        columns = self.columns(deals)
+        scores, masks = self.evaluate(columns)
+        dictionary, rows, codes, values, order = [], [], [], [], []
+        
+        for index, (rule, mask) in enumerate(zip(self.rules, masks)):
+            matched = np.flatnonzero(mask)
+            if not rule.get('factor') or not len(matched):
+                continue
+            entry = {'factor': rule['factor'], 'impact': rule['impact']}
+            field_values = columns[rule['field']][matched]
+            
+            if rule['op'] == 'in':
+                # Text values repeat, so each distinct label is interned
+                labels, inverse = np.unique(self.FORMATTERS[rule['format']](field_values), return_inverse=True)
+                codes.append(len(dictionary) + inverse)
+                dictionary.extend({**entry, 'value': label} for label in labels.tolist())
+                values.append(np.full(len(matched), np.nan))
+            else:
+                codes.append(np.full(len(matched), len(dictionary)))
+                dictionary.append({**entry, 'format': rule['format']})
+                values.append(field_values.astype(float))
+            rows.append(matched)
+            order.append(np.full(len(matched), index))
+        
+        if rows:
+            rows, codes, values, order = (np.concatenate(a) for a in (rows, codes, values, order))
+            sort = np.lexsort((order, rows))
+            rows, codes, values = rows[sort], codes[sort], values[sort]
+        else:
+            rows, codes, values = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        
+        return columnar_results(
+            scores,
+            np.full(len(scores), self.confidence),
+            model_version,
+            dictionary,
+            rows,
+            codes,
+            values
+        )
+
+
+FALLBACK_RULES = RuleTable.load()
+
 
 class RiskAssessmentModel:
     """
@@ -48,6 +567,14 @@ class RiskAssessmentModel:
         self.model = None
         self.scaler = None
         self.model_version = '1.0.0'
+        self.drift_monitor = None
+        self.prior_correction = None
+        self.model_path = None
+        self.comps_index = None
+        self.cascade_settings = None
+        self.cascade = None
+        self.shadow_models = {}
+        self.shadow_log = None
         
         # Try to load trained model by default
         if model_path is None:
@@ -102,6 +629,8 @@ class RiskAssessmentModel:
         Returns:
             Feature array ready for prediction
         """
+        deal_data = apply_aliases(deal_data)
+        
         # Property type encoding
         property_type_map = {
             'multifamily': 1,
@@ -124,11 +653,15 @@ class RiskAssessmentModel:
         
         # Calculate derived metrics
         # DSCR = NOI / Annual Debt Service
-        noi = property_value * 0.06  # Assume 6% NOI if not provided
+        noi = deal_data.get('noi')
+        if noi is None:
+            noi = property_value * 0.06  # Assume 6% NOI if not provided
         annual_debt_service = self._calculate_annual_debt_service(
             loan_amount, interest_rate, term_months
         )
-        dscr = noi / annual_debt_service if annual_debt_service > 0 else 1.0
+        dscr = deal_data.get('dscr')
+        if dscr is None:
+            dscr = noi / annual_debt_service if annual_debt_service > 0 else 1.0
         
         # Cap rate = NOI / Property Value
         cap_rate = (noi / property_value * 100) if property_value > 0 else 6.0
@@ -185,6 +718,175 @@ class RiskAssessmentModel:
         
         return monthly_payment * 12
     
+    def prepare_features_batch(self, deals) -> np.ndarray:
+        """
+        Vectorized prepare_features for a batch of deals
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            
+        Returns:
+            Feature matrix (n_deals x len(MODEL_FEATURES))
+        """
+        frame = deals_to_frame(deals)
+        return model_feature_matrix(frame, derive_features(frame))
+    
+    def predict_proba_batch(self, features: np.ndarray) -> np.ndarray:
+        """
+        Probability of default for a prepared feature matrix
+        
+        Args:
+            features: Output of prepare_features_batch
+            
+        Returns:
+            Array of default probabilities
+        """
+        features_scaled = self.scaler.transform(features) if self.scaler is not None else features
+        return self._corrected(self.model.predict_proba(features_scaled)[:, 1])
+    
+    def _corrected(self, probs: np.ndarray) -> np.ndarray:
+        """Undo the prior shift of a model trained with prior-mode negative sampling"""
+        if self.prior_correction:
+            return correct_probabilities(probs, self.prior_correction)
+        return probs
+    
+    def _batch_probabilities(self, frame: pd.DataFrame, features: np.ndarray) -> np.ndarray:
+        """Default probabilities for predict_batch (subclasses may route by deal)"""
+        if self.cascade is not None:
+            features_scaled = self.scaler.transform(features) if self.scaler is not None else features
+            return self._corrected(self.cascade.predict_proba(self.model, features_scaled))
+        return self.predict_proba_batch(features)
+    
+    def enable_cascade(self, settings: Dict = None):
+        """
+        Score batches through the cascade (see cascade.py)
+        
+        A few-tree screening model returns clearly low- and high-risk deals
+        early; only the ambiguous band is scored by the full model.
+        predict_batch and predict_batch_columnar use the cascade; single-deal
+        predict_risk_score always uses the full model.
+        
+        Args:
+            settings: Tuned cascade settings (default: the artifact's 'cascade')
+        
+        Raises:
+            ValueError: Without settings, or with settings that do not save
+                scoring time (relative_cost above 1 - min_saving)
+        """
+        from cascade import CascadeScorer, saves_time
+        
+        settings = settings or self.cascade_settings
+        if settings is None:
+            raise ValueError("Model artifact has no cascade settings; tune them with cascade.py")
+        if not saves_time(settings):
+            raise ValueError(f"Cascade settings cost {settings['relative_cost']:.2f}x full scoring; "
+                             f"not enabling a cascade that does not save time")
+        self.cascade = CascadeScorer(settings)
+        print(f"[INFO] Cascade scoring enabled: band [{settings['low']:.4f}, {settings['high']:.4f}), "
+              f"tuned short-circuit rate {settings['short_circuit_rate']:.1%}")
+    
+    def disable_cascade(self):
+        """Score every deal with the full model again"""
+        self.cascade = None
+    
+    def cascade_report(self) -> Dict:
+        """Deals scored and short-circuited so far, or None without the cascade"""
+        if self.cascade is None:
+            return None
+        return self.cascade.report()
+    
+    def _scored_probabilities(self, frame: pd.DataFrame, features: np.ndarray) -> np.ndarray:
+        """_batch_probabilities, with shadow candidates scored on the same features"""
+        if not self.shadow_models:
+            return self._batch_probabilities(frame, features)
+        
+        started = time.perf_counter()
+        probs = self._batch_probabilities(frame, features)
+        latency = [(time.perf_counter() - started) * 1000]
+        
+        # Candidate failures are logged, never surfaced to the caller
+        n = len(probs)
+        scores = np.full((n, len(self.shadow_models)), -1, dtype=np.int16)
+        levels = np.zeros((n, len(self.shadow_models)), dtype=np.uint8)
+        for j, (name, candidate) in enumerate(self.shadow_models.items()):
+            started = time.perf_counter()
+            try:
+                candidate_probs = np.asarray(candidate._batch_probabilities(frame, features), dtype=float)
+                scores[:, j] = (candidate_probs * 100).astype(int)
+                levels[:, j] = risk_level_codes(scores[:, j])
+            except Exception as e:
+                self.shadow_log.errors[j] += 1
+                print(f"[WARNING] Shadow model {name} failed: {e}")
+            latency.append((time.perf_counter() - started) * 1000)
+        
+        primary_scores = (np.asarray(probs, dtype=float) * 100).astype(int)
+        self.shadow_log.record(primary_scores, risk_level_codes(primary_scores), scores, levels, np.array(latency))
+        return probs
+    
+    def enable_shadow(
+        self,
+        candidates: Dict[str, Union[str, 'RiskAssessmentModel']],
+        capacity: int = DEFAULT_DEAL_CAPACITY
+    ):
+        """
+        Score batches through candidate models in shadow
+        
+        predict_batch and predict_batch_columnar keep returning the primary's
+        results; candidate score deltas, level flips and latency go to
+        self.shadow_log. Single-deal predict_risk_score is not shadowed.
+        
+        Args:
+            candidates: Candidate name -> model artifact path or loaded model
+            capacity: Deals kept in the shadow log per candidate
+        """
+        models = {}
+        for name, candidate in candidates.items():
+            if isinstance(candidate, str):
+                candidate = load_model_artifact(candidate)
+            if candidate.model is None:
+                raise ValueError(f"Shadow model {name} has no trained model")
+            models[name] = candidate
+        
+        self.shadow_models = models
+        self.shadow_log = ShadowLog(list(models), RISK_LEVELS, capacity=capacity)
+        print(f"[INFO] Shadow scoring enabled: {', '.join(models)}")
+    
+    def disable_shadow(self):
+        """Stop shadow scoring and drop the log"""
+        self.shadow_models = {}
+        self.shadow_log = None
+    
+    def shadow_report(self) -> Dict:
+        """Candidate vs. primary comparison, or None without shadow models"""
+        if self.shadow_log is None:
+            return None
+        return self.shadow_log.report()
+    
+    def find_comps(self, deals, k: int = 20, features: np.ndarray = None) -> List[Dict]:
+        """
+        Most similar historical deals and their outcomes (see comps_index.py)
+        
+        The index saved alongside the model artifact is loaded on first use.
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            k: Comps per deal
+            features: Precomputed MODEL_FEATURES matrix for deals (optional)
+            
+        Returns:
+            Per deal: k, default_rate of the comps and the comps themselves
+        """
+        if self.comps_index is None:
+            from comps_index import CompsIndex, comps_path
+            path = comps_path(self.model_path) if self.model_path else None
+            if path is None or not os.path.exists(path):
+                raise FileNotFoundError("No comps index for this model; build one with comps_index.py")
+            self.comps_index = CompsIndex.load(path)
+        
+        if features is None:
+            features = self.prepare_features_batch(deals)
+        return self.comps_index.comps(features, k)
+    
     def predict_risk_score(self, deal_data: Dict) -> Dict:
         """
         Predict risk score for a deal
@@ -200,8 +902,13 @@ class RiskAssessmentModel:
             return self._rule_based_scoring(deal_data)
         
         try:
+            # Same field aliases as the batch path
+            deal_data = apply_aliases(deal_data)
+            
             # Prepare features
             features = self.prepare_features(deal_data)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(features)
             
             # Scale features
             if self.scaler is not None:
@@ -210,7 +917,7 @@ class RiskAssessmentModel:
                 features_scaled = features
             
             # Predict probability of default
-            prob_default = self.model.predict_proba(features_scaled)[0][1]
+            prob_default = float(self._corrected(self.model.predict_proba(features_scaled)[:, 1])[0])
             
             # Convert to risk score (0-100, higher = more risky)
             risk_score = int(prob_default * 100)
@@ -233,126 +940,129 @@ class RiskAssessmentModel:
             print(f"[ERROR] Risk prediction failed: {e}")
             return self._rule_based_scoring(deal_data)
     
-    def _rule_based_scoring(self, deal_data: Dict) -> Dict:
+    def predict_batch(self, deals, features: np.ndarray = None) -> List[Dict]:
         """
-        Fallback rule-based risk scoring when ML model is not available
+        Predict risk scores for a batch of deals in one model call
+        
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            features: Precomputed MODEL_FEATURES matrix for deals, e.g. from
+                the feature store (optional)
+            
+        Returns:
+            List of result dictionaries, same shape as predict_risk_score
         """
-        risk_score = 50  # Start with neutral score
-        risk_factors = []
+        frame = deals_to_frame(deals)
         
-        # LTV risk
-        ltv = deal_data.get('requested_ltv', 75)
-        if ltv > 80:
-            risk_score += 15
-            risk_factors.append({
-                'factor': 'High LTV',
-                'value': f'{ltv}%',
-                'impact': 'high'
-            })
-        elif ltv > 75:
-            risk_score += 8
-            risk_factors.append({
-                'factor': 'Elevated LTV',
-                'value': f'{ltv}%',
-                'impact': 'medium'
-            })
-        elif ltv < 65:
-            risk_score -= 10
+        if not HAS_ML_LIBS or self.model is None:
+            return self.rule_based_batch(deals)
         
-        # Interest rate risk
-        rate = deal_data.get('requested_rate', 7.5)
-        if rate > 10:
-            risk_score += 10
-            risk_factors.append({
-                'factor': 'High Interest Rate',
-                'value': f'{rate}%',
-                'impact': 'medium'
-            })
+        try:
+            if features is None:
+                features = self.prepare_features_batch(frame)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(features)
+            probs = self._scored_probabilities(frame, features)
+        except Exception as e:
+            print(f"[ERROR] Batch risk prediction failed: {e}")
+            return self.rule_based_batch(deals)
         
-        # Loan amount risk
-        loan_amount = deal_data.get('loan_amount', 0)
-        if loan_amount > 10_000_000:
-            risk_score += 5
-            risk_factors.append({
-                'factor': 'Large Loan Amount',
-                'value': f'${loan_amount:,.0f}',
-                'impact': 'low'
-            })
+        factor_values, factor_mask = risk_factor_matrix(features)
         
-        # Property type risk
-        property_type = deal_data.get('asset_type', '').lower()
-        high_risk_types = ['land', 'mixed_use']
-        if property_type in high_risk_types:
-            risk_score += 12
-            risk_factors.append({
-                'factor': 'Higher Risk Property Type',
-                'value': property_type.title(),
-                'impact': 'high'
+        results = []
+        for values, mask, prob_default in zip(factor_values, factor_mask, probs.tolist()):
+            risk_score = int(prob_default * 100)
+            results.append({
+                'risk_score': risk_score,
+                'confidence': round(max(prob_default, 1 - prob_default) * 100, 2),
+                'risk_level': self._get_risk_level(risk_score),
+                'risk_factors': self._risk_factor_records(values, mask),
+                'model_version': '1.0.0'
             })
         
-        # Ensure score is in valid range
-        risk_score = max(0, min(100, risk_score))
-        
-        return {
-            'risk_score': risk_score,
-            'confidence': 75.0,  # Medium confidence for rule-based
-            'risk_level': self._get_risk_level(risk_score),
-            'risk_factors': risk_factors,
-            'model_version': '1.0.0-rules'
-        }
+        return results
     
-    def _identify_risk_factors(self, deal_data: Dict, features: np.ndarray) -> List[Dict]:
-        """Identify key risk factors from features"""
-        risk_factors = []
-        
-        # Features: loan_amount, ltv, dscr, borrower_credit_score, occupancy_rate, property_age
-        loan_amount, ltv, dscr, credit_score, occupancy, property_age = features
+    def predict_batch_columnar(self, deals, features: np.ndarray = None) -> Dict:
+        """
+        Predict risk scores for a batch of deals as a columnar response
         
-        # Convert to percentages if needed
-        ltv_pct = ltv * 100 if ltv <= 1 else ltv
-        occupancy_pct = occupancy * 100 if occupancy <= 1 else occupancy
+        Same scores as predict_batch without building a dictionary per deal;
+        encode with result_encoding.encode for the wire.
         
-        # High LTV
-        if ltv_pct > 80:
-            risk_factors.append({
-                'factor': 'High Loan-to-Value Ratio',
-                'value': f'{ltv_pct:.1f}%',
-                'impact': 'high'
-            })
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            features: Precomputed MODEL_FEATURES matrix (optional)
+            
+        Returns:
+            Columnar result dictionary (see columnar_results)
+        """
+        if not HAS_ML_LIBS or self.model is None:
+            return FALLBACK_RULES.score_columnar(deals)
         
-        # Low DSCR
-        if dscr < 1.25:
-            risk_factors.append({
-                'factor': 'Low Debt Service Coverage',
-                'value': f'{dscr:.2f}x',
-                'impact': 'high'
-            })
+        try:
+            frame = deals_to_frame(deals)
+            if features is None:
+                features = self.prepare_features_batch(frame)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(features)
+            probs = self._scored_probabilities(frame, features).astype(float)
+        except Exception as e:
+            print(f"[ERROR] Batch risk prediction failed: {e}")
+            return FALLBACK_RULES.score_columnar(deals)
         
-        # Low credit score
-        if credit_score < 680:
-            risk_factors.append({
-                'factor': 'Below Average Credit Score',
-                'value': f'{int(credit_score)}',
-                'impact': 'medium'
-            })
+        values, mask = risk_factor_matrix(features)
+        rows, columns = np.nonzero(mask)
+        dictionary = [
+            {'factor': spec['factor'], 'impact': spec['impact'], 'format': spec['format']}
+            for spec in MODEL_RISK_FACTORS
+        ]
         
-        # Low occupancy
-        if occupancy_pct < 85:
-            risk_factors.append({
-                'factor': 'Low Occupancy Rate',
-                'value': f'{occupancy_pct:.1f}%',
-                'impact': 'medium'
-            })
+        return columnar_results(
+            (probs * 100).astype(int),
+            np.round(np.maximum(probs, 1 - probs) * 100, 2),
+            '1.0.0',
+            dictionary,
+            rows,
+            columns,
+            values[rows, columns]
+        )
+    
+    def _rule_based_scoring(self, deal_data: Dict) -> Dict:
+        """
+        Fallback rule-based risk scoring when ML model is not available
+        """
+        return FALLBACK_RULES.score([deal_data])[0]
+    
+    def rule_based_batch(self, deals) -> List[Dict]:
+        """
+        Vectorized rule-based scoring for a batch of deals
         
-        # Old property
-        if property_age > 30:
+        Args:
+            deals: DataFrame or list of deal dictionaries
+            
+        Returns:
+            List of result dictionaries, same shape as predict_risk_score
+        """
+        return FALLBACK_RULES.score(deals)
+    
+    def _identify_risk_factors(self, deal_data: Dict, features: np.ndarray) -> List[Dict]:
+        """Identify key risk factors from features (see MODEL_RISK_FACTORS)"""
+        values, mask = risk_factor_matrix(features)
+        return self._risk_factor_records(values[0], mask[0])
+    
+    def _risk_factor_records(self, values: np.ndarray, mask: np.ndarray) -> List[Dict]:
+        """Risk factor dictionaries for one row of risk_factor_matrix"""
+        risk_factors = []
+        for spec, value, matched in zip(MODEL_RISK_FACTORS, values, mask):
+            if not matched:
+                continue
             risk_factors.append({
-                'factor': 'Older Property',
-                'value': f'{int(property_age)} years',
-                'impact': 'low'
+                'factor': spec['factor'],
+                'value': MODEL_FACTOR_FORMATTERS[spec['format']](np.array([value]))[0],
+                'impact': spec['impact']
             })
         
-        return risk_factors[:5]  # Return top 5 factors
+        return risk_factors[:MAX_RISK_FACTORS]
     
     def _get_risk_level(self, risk_score: int) -> str:
         """Convert risk score to risk level category"""
@@ -384,6 +1094,17 @@ class RiskAssessmentModel:
         
         print(f"[INFO] Model trained on {len(training_data)} samples")
     
+    def drift_report(self) -> Dict:
+        """
+        Drift statistics of the traffic scored so far against the training data
+        
+        Returns:
+            Report from DriftMonitor.report, or None if the artifact has no reference
+        """
+        if self.drift_monitor is None:
+            return None
+        return self.drift_monitor.report()
+    
     def save_model(self, path: str):
         """Save model to disk"""
         if not HAS_ML_LIBS:
@@ -412,13 +1133,41 @@ class RiskAssessmentModel:
         with open(path, 'rb') as f:
             model_data = pickle.load(f)
         
+        self._apply_model_data(model_data)
+        self.model_path = path
+        self.comps_index = None
+        
+        print(f"[INFO] Model loaded from {path}")
+        print(f"[INFO] Model version: {self.model_version}")
+    
+    def _apply_model_data(self, model_data: Dict):
+        """Set model state from a loaded artifact"""
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self.feature_names = model_data['feature_names']
         self.model_version = model_data.get('version', '1.0.0')
+        self.prior_correction = (model_data.get('sampling') or {}).get('prior_correction')
+        self.cascade_settings = model_data.get('cascade')
+        self.cascade = None
         
-        print(f"[INFO] Model loaded from {path}")
-        print(f"[INFO] Model version: {self.model_version}")
+        # Streaming drift monitoring when the artifact carries a training
+        # reference for the feature layout we score with
+        reference = model_data.get('drift_reference')
+        if reference and reference['feature_names'] == MODEL_FEATURES:
+            self.drift_monitor = DriftMonitor(reference)
+        else:
+            self.drift_monitor = None
+
+
+def load_model_artifact(path: str) -> RiskAssessmentModel:
+    """Load a model artifact with the model class it was saved for"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model artifact not found: {path}")
+    model = RiskAssessmentModel(path)
+    if model.model_version.endswith('-segmented'):
+        from segmented_model import SegmentedRiskModel
+        model = SegmentedRiskModel(path)
+    return model
 
 
 # Global model instance
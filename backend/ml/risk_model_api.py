@@ -4,28 +4,95 @@ Risk Model API Wrapper
 ======================
 Standalone script that can be called from Node.js
 Accepts JSON input via command line and outputs JSON result
+
+With RISK_MODEL_REGISTRY set, deals carrying an org_id are scored by that
+org's model variant (see model_registry.py).
+
+A JSON list of deals is scored as one batch. With --columnar FORMAT
+(json, msgpack or arrow) a batch is written as a columnar frame instead
+(see result_encoding.py); msgpack and arrow frames are binary.
+
+With --cascade, a batch is scored through the cascade tuned at training
+time: a screening model answers clearly low- and high-risk deals and only
+the rest go to the full model (see cascade.py).
+
+With --comps K, each JSON result gets the K most similar historical deals
+and their outcomes under 'comps' (see comps_index.py).
 """
 
+import os
 import sys
 import json
+from contextlib import redirect_stdout
 from risk_model import get_model
+from model_registry import get_registry
+from result_encoding import FORMATS, encode
 
 def main():
     try:
+        args = sys.argv[1:]
+        columnar = None
+        if '--columnar' in args:
+            index = args.index('--columnar')
+            columnar = args[index + 1] if index + 1 < len(args) else 'json'
+            del args[index:index + 2]
+            if columnar not in FORMATS:
+                raise ValueError(f"Unknown columnar format: {columnar} (expected one of {FORMATS})")
+        
+        cascade = '--cascade' in args
+        if cascade:
+            args.remove('--cascade')
+        
+        comps = None
+        if '--comps' in args:
+            index = args.index('--comps')
+            comps = int(args[index + 1]) if index + 1 < len(args) else 20
+            del args[index:index + 2]
+        
         # Read deal data from command line argument
-        if len(sys.argv) < 2:
+        if len(args) < 1:
             print(json.dumps({
                 'error': 'No deal data provided',
-                'usage': 'python risk_model_api.py \'{"loan_amount": 5000000, ...}\''
+                'usage': 'python risk_model_api.py \'{"loan_amount": 5000000, ...}\' '
+                         '[--columnar json|msgpack|arrow] [--cascade] [--comps K]'
             }))
             sys.exit(1)
         
-        deal_data_json = sys.argv[1]
+        deal_data_json = args[0]
         deal_data = json.loads(deal_data_json)
         
+        # Batches go through the global model's cascade (org models score in full)
+        if cascade:
+            with redirect_stdout(sys.stderr):
+                try:
+                    get_model().enable_cascade()
+                except ValueError as e:
+                    print(f"[WARNING] {e}; scoring every deal with the full model")
+        
+        if columnar:
+            # Keep model loading logs out of the frame
+            with redirect_stdout(sys.stderr):
+                model = get_model()
+                columns = model.predict_batch_columnar(deal_data if isinstance(deal_data, list) else [deal_data])
+            sys.stdout.buffer.write(encode(columns, columnar))
+            sys.stdout.flush()
+            sys.exit(0)
+        
         # Get model and predict
-        model = get_model()
-        result = model.predict_risk_score(deal_data)
+        model = get_registry() if os.environ.get('RISK_MODEL_REGISTRY') else get_model()
+        if isinstance(deal_data, list):
+            result = model.predict_batch(deal_data)
+        else:
+            result = model.predict_risk_score(deal_data)
+        
+        # Comps come from the global model's index, one query for the batch
+        if comps:
+            deals = deal_data if isinstance(deal_data, list) else [deal_data]
+            results = result if isinstance(result, list) else [result]
+            with redirect_stdout(sys.stderr):
+                found = get_model().find_comps(deals, comps)
+            for entry, deal_comps in zip(results, found):
+                entry['comps'] = deal_comps
         
         # Output JSON result
         print(json.dumps(result))
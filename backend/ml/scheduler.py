@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Priority Scheduling for the Worker Pool
+=======================================
+Keeps interactive scoring fast while bulk jobs (rescoring, Monte Carlo,
+backtests) share the same workers.
+
+- Priority classes with weights: the next request handed to a free worker
+  is chosen by weighted fair queuing (self-clocked: each queued item gets
+  a virtual finish tag of start + cost / weight, and the smallest tag
+  goes first), so interactive requests overtake queued bulk work
+- Bulk requests ({"deals": [...]}) are split into chunks that are queued
+  separately. A bulk job therefore yields the worker at every chunk
+  boundary
+- Per-class limits on workers in use. By default bulk work may use all
+  workers but one, which is kept free for interactive requests. A
+  one-worker pool has none to spare: bulk chunks use the only worker,
+  and interactive requests overtake them only at chunk boundaries
+- Queue-time and service-time percentiles per class
+
+Used by worker_pool.py, whose request lines may carry "priority"
+(default: interactive for one deal, batch for a "deals" list).
+
+Usage:
+    python worker_pool.py --workers 4 --chunk-size 500 --batch-workers 3 < requests.jsonl
+    python load_test.py --target server --rate 50 --bulk-deals 100000 --bulk-interval 5
+
+Author: Underwrite Pro ML Team
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Deals per chunk of a bulk request
+DEFAULT_CHUNK_SIZE = 500
+
+# Weight of each class in fair queuing; cost is measured in deals
+INTERACTIVE_WEIGHT = 64.0
+BATCH_WEIGHT = 1.0
+
+# Measurements kept per class for the percentiles
+METRICS_WINDOW = 4096
+
+
+def default_classes(workers: int, batch_workers: int = None) -> Dict[str, Dict]:
+    """
+    Interactive and batch priority classes for a pool
+
+    Args:
+        workers: Pool size
+        batch_workers: Workers batch work may use at once (default: all but one;
+            a one-worker pool lets batch work use its only worker, or bulk
+            requests would never run)
+
+    Returns:
+        Class name -> {'weight', 'max_workers'} (max_workers None = no limit)
+    """
+    if batch_workers is None:
+        batch_workers = max(1, workers - 1)
+    return {
+        'interactive': {'weight': INTERACTIVE_WEIGHT, 'max_workers': None},
+        'batch': {'weight': BATCH_WEIGHT, 'max_workers': max(1, batch_workers)}
+    }
+
+
+def split_chunks(deals: List[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[List[Dict]]:
+    """Consecutive chunks of at most chunk_size deals"""
+    return [deals[i:i + chunk_size] for i in range(0, len(deals), max(1, chunk_size))]
+
+
+def _percentiles(values) -> Dict:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.fromiter(values, dtype=float), [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+
+class WeightedFairQueue:
+    """
+    Per-class queues drained by weighted fair queuing
+
+    A drop-in for the deque PreforkPool._dispatch drains: items are
+    (request_id, payload, attempts, deadline) tuples with unique request
+    ids, and len() / truthiness count only items whose class is below its
+    worker limit.
+    """
+
+    def __init__(self, classes: Dict[str, Dict]):
+        """
+        Args:
+            classes: Class name -> {'weight', 'max_workers'}, see default_classes
+        """
+        self.classes = classes
+        self.queues = {name: deque() for name in classes}
+        self.finish = {name: 0.0 for name in classes}
+        self.running = {name: 0 for name in classes}
+        self.virtual_time = 0.0
+        self.class_of = {}
+        self.started = {}
+        self.metrics = {
+            name: {
+                'completed': 0,
+                'deals': 0,
+                'queue_ms': deque(maxlen=METRICS_WINDOW),
+                'service_ms': deque(maxlen=METRICS_WINDOW)
+            }
+            for name in classes
+        }
+        self.lock = threading.RLock()
+
+    def push(self, item: tuple, priority: str, cost: float = 1.0):
+        """
+        Queue an item
+
+        Args:
+            item: (request_id, payload, attempts, deadline)
+            priority: Class name
+            cost: Work in the item, in deals
+        """
+        if priority not in self.classes:
+            raise ValueError(f"Unknown priority class '{priority}'. Expected one of {list(self.classes)}")
+        with self.lock:
+            start = max(self.virtual_time, self.finish[priority])
+            self.finish[priority] = start + cost / self.classes[priority]['weight']
+            self.queues[priority].append((self.finish[priority], item, time.monotonic(), cost))
+            self.class_of[item[0]] = priority
+
+    def append(self, item: tuple):
+        """Queue a single-deal item as interactive"""
+        self.push(item, 'interactive')
+
+    def _eligible(self) -> List[str]:
+        return [
+            name for name, queue in self.queues.items()
+            if queue and (self.classes[name]['max_workers'] is None
+                          or self.running[name] < self.classes[name]['max_workers'])
+        ]
+
+    def queued(self, priority: str) -> int:
+        """Items queued in classes weighted at least as high as priority, i.e. served before it"""
+        with self.lock:
+            weight = self.classes[priority]['weight']
+            return sum(
+                len(queue) for name, queue in self.queues.items()
+                if self.classes[name]['weight'] >= weight
+            )
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(self.queues[name]) for name in self._eligible())
+
+    def __bool__(self) -> bool:
+        with self.lock:
+            return bool(self._eligible())
+
+    def popleft(self) -> tuple:
+        """Item with the smallest finish tag among classes below their worker limit"""
+        with self.lock:
+            eligible = self._eligible()
+            if not eligible:
+                raise IndexError('pop from an empty queue')
+            name = min(eligible, key=lambda c: self.queues[c][0][0])
+            tag, item, enqueued, cost = self.queues[name].popleft()
+            # Retried items keep their old tag; virtual time never moves back
+            self.virtual_time = max(self.virtual_time, tag)
+            self.running[name] += 1
+            now = time.monotonic()
+            self.started[item[0]] = (now, cost, tag)
+            self.metrics[name]['queue_ms'].append((now - enqueued) * 1000)
+            return item
+
+    def appendleft(self, item: tuple):
+        """Put a dispatched item back at the head of its class (retry after a worker crash)"""
+        with self.lock:
+            name = self.class_of[item[0]]
+            _, cost, tag = self.started.pop(item[0])
+            self.running[name] -= 1
+            self.queues[name].appendleft((tag, item, time.monotonic(), cost))
+
+    def done(self, request_id):
+        """Mark a dispatched item finished"""
+        with self.lock:
+            name = self.class_of.pop(request_id, None)
+            if name is None:
+                return
+            started, cost, _ = self.started.pop(request_id)
+            self.running[name] -= 1
+            metrics = self.metrics[name]
+            metrics['completed'] += 1
+            metrics['deals'] += int(cost)
+            metrics['service_ms'].append((time.monotonic() - started) * 1000)
+
+    def report(self) -> Dict:
+        """Per class: limits, queued and running items, and queue/service time percentiles (ms)"""
+        with self.lock:
+            return {
+                name: {
+                    'weight': config['weight'],
+                    'max_workers': config['max_workers'],
+                    'queued': len(self.queues[name]),
+                    'running': self.running[name],
+                    'completed': self.metrics[name]['completed'],
+                    'deals': self.metrics[name]['deals'],
+                    'queue_ms': _percentiles(self.metrics[name]['queue_ms']),
+                    'service_ms': _percentiles(self.metrics[name]['service_ms'])
+                }
+                for name, config in self.classes.items()
+            }
+
+
+class ChunkAssembler:
+    """
+    Collects the parts of chunked bulk requests back into input order
+    """
+
+    def __init__(self):
+        self.jobs: Dict[int, Dict] = {}
+        self.lock = threading.Lock()
+
+    def register(self, job: int, chunks: int):
+        with self.lock:
+            self.jobs[job] = {'remaining': chunks, 'parts': [None] * chunks}
+
+    def add(self, job: int, index: int, part) -> Optional[List]:
+        """
+        Store one chunk's part
+
+        Returns:
+            All parts in chunk order once the last one arrives, else None
+        """
+        with self.lock:
+            state = self.jobs[job]
+            state['parts'][index] = part
+            state['remaining'] -= 1
+            if state['remaining']:
+                return None
+            del self.jobs[job]
+        return state['parts']
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Segmented Risk Models
+=====================
+One model per asset type plus a global fallback.
+
+- Training fits every segment and the global model in parallel processes
+  on the six-feature layout (MODEL_FEATURES), from sample_data.csv-style
+  or historical_deals.csv-style data
+- Segments with too few deals or defaults are not fit; their deals are
+  scored by the global model
+- Batch scoring groups deals by segment, scores each group with one
+  vectorized call and writes probabilities back in input order, so the
+  per-deal cost does not grow with the number of segments
+
+Usage:
+    python segmented_model.py --data sample_data.csv --output risk_model_segmented.pkl
+    python segmented_model.py --model risk_model_segmented.pkl --score deals.csv
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from drift_monitor import build_reference
+from risk_model import (
+    HAS_ML_LIBS,
+    MODEL_FEATURES,
+    RiskAssessmentModel,
+    deals_to_frame,
+    derive_features,
+    model_feature_matrix
+)
+
+if HAS_ML_LIBS:
+    import xgboost as xgb
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_model_segmented.pkl')
+
+# Deal column that selects the model
+SEGMENT_COLUMN = 'asset_type'
+
+# Key of the fallback model in the artifact
+GLOBAL_SEGMENT = '__global__'
+
+# A segment gets its own model only with enough deals of both outcomes
+MIN_SEGMENT_SAMPLES = 50
+MIN_SEGMENT_DEFAULTS = 5
+
+SEGMENT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 4,
+    'learning_rate': 0.1,
+    'tree_method': 'hist',
+    'objective': 'binary:logistic',
+    'eval_metric': 'auc',
+    'random_state': 42,
+    # Segments already train in parallel processes
+    'n_jobs': 1
+}
+
+LABEL_COLUMNS = ['default', 'defaulted', 'default_outcome']
+
+
+def training_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Six-feature matrix, labels and segments from raw training data
+
+    Args:
+        df: Deals with a default label column
+
+    Returns:
+        Tuple of (features, labels, segments)
+    """
+    label_column = next((c for c in LABEL_COLUMNS if c in df.columns), None)
+    if label_column is None:
+        raise ValueError(f"No label column found. Expected one of {LABEL_COLUMNS}")
+
+    frame = deals_to_frame(df)
+    features = model_feature_matrix(frame, derive_features(frame))
+    labels = df[label_column].to_numpy(dtype=int)
+    segments = frame[SEGMENT_COLUMN].to_numpy(dtype=str)
+    return features, labels, segments
+
+
+def _fit_segment(name: str, X: np.ndarray, y: np.ndarray) -> Dict:
+    """Fit one segment's scaler and model, with a holdout AUC when possible"""
+    holdout_auc = None
+    if min(np.bincount(y, minlength=2)) >= 2:
+        X_fit, X_test, y_fit, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=SEGMENT_PARAMS['random_state'], stratify=y
+        )
+        scaler = StandardScaler().fit(X_fit)
+        model = xgb.XGBClassifier(**SEGMENT_PARAMS)
+        model.fit(scaler.transform(X_fit), y_fit, verbose=False)
+        if len(np.unique(y_test)) == 2:
+            holdout_auc = float(roc_auc_score(y_test, model.predict_proba(scaler.transform(X_test))[:, 1]))
+
+    # Final model uses every deal in the segment
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(**SEGMENT_PARAMS)
+    model.fit(scaler.transform(X), y, verbose=False)
+
+    return {
+        'segment': name,
+        'model': model,
+        'scaler': scaler,
+        'metrics': {
+            'samples': int(len(y)),
+            'default_rate': float(y.mean()),
+            'holdout_auc': holdout_auc
+        }
+    }
+
+
+def train_segments(
+    df: pd.DataFrame,
+    workers: int = None,
+    min_samples: int = MIN_SEGMENT_SAMPLES,
+    min_defaults: int = MIN_SEGMENT_DEFAULTS
+) -> Dict:
+    """
+    Fit per-segment models and the global fallback in parallel
+
+    Args:
+        df: Training deals
+        workers: Training processes (default: one per CPU)
+        min_samples: Deals a segment needs for its own model
+        min_defaults: Defaults (and non-defaults) a segment needs
+
+    Returns:
+        Artifact dictionary for SegmentedRiskModel
+    """
+    if not HAS_ML_LIBS:
+        raise ImportError("Segmented training requires xgboost and scikit-learn. Install with: pip install xgboost scikit-learn")
+
+    X, y, segments = training_matrix(df)
+    names, counts = np.unique(segments, return_counts=True)
+
+    jobs = {GLOBAL_SEGMENT: np.arange(len(y))}
+    skipped = {}
+    for name, count in zip(names, counts):
+        rows = np.flatnonzero(segments == name)
+        defaults = int(y[rows].sum())
+        if count < min_samples:
+            skipped[name] = f"{count} deals"
+        elif min(defaults, count - defaults) < min_defaults:
+            skipped[name] = f"{defaults} defaults in {count} deals"
+        else:
+            jobs[name] = rows
+
+    print(f"[INFO] Training {len(jobs) - 1} segment models and a global model on {len(y)} deals")
+    for name, reason in skipped.items():
+        print(f"[INFO] Segment '{name}' uses the global model ({reason})")
+
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fit_segment, name, X[rows], y[rows]) for name, rows in jobs.items()]
+        fitted = {f.result()['segment']: f.result() for f in futures}
+    print(f"[INFO] Trained {len(fitted)} models in {time.time() - started:.1f}s")
+
+    for name, entry in sorted(fitted.items()):
+        auc = entry['metrics']['holdout_auc']
+        print(f"  {name:15s} {entry['metrics']['samples']:6d} deals  "
+              f"default rate {entry['metrics']['default_rate']:6.2%}  "
+              f"holdout AUC {'n/a' if auc is None else f'{auc:.4f}'}")
+
+    global_entry = fitted.pop(GLOBAL_SEGMENT)
+    return {
+        'model': global_entry['model'],
+        'scaler': global_entry['scaler'],
+        'training_metrics': global_entry['metrics'],
+        'segments': {
+            name: {'model': e['model'], 'scaler': e['scaler'], 'metrics': e['metrics']}
+            for name, e in fitted.items()
+        },
+        'skipped_segments': skipped,
+        'segment_column': SEGMENT_COLUMN,
+        'feature_names': MODEL_FEATURES,
+        'drift_reference': build_reference(X, MODEL_FEATURES),
+        'trained_at': datetime.now().isoformat(),
+        'version': '1.0.0-segmented'
+    }
+
+
+class SegmentedRiskModel(RiskAssessmentModel):
+    """
+    Risk model that routes each deal to its asset type's model
+    """
+
+    def __init__(self, model_path: str = None):
+        """
+        Initialize segmented model
+
+        Args:
+            model_path: Segmented artifact (default: risk_model_segmented.pkl).
+                A plain artifact loads as a global model with no segments
+        """
+        self.segments = {}
+        self.segment_column = SEGMENT_COLUMN
+        super().__init__(model_path or DEFAULT_MODEL_PATH)
+
+    def _apply_model_data(self, model_data: Dict):
+        """Set the global model and the per-segment models from an artifact"""
+        super()._apply_model_data(model_data)
+        self.segments = {
+            name: (entry['model'], entry['scaler'])
+            for name, entry in model_data.get('segments', {}).items()
+        }
+        self.segment_column = model_data.get('segment_column', SEGMENT_COLUMN)
+
+    def predict_proba_batch(self, features: np.ndarray, segments: np.ndarray = None) -> np.ndarray:
+        """
+        Probability of default, one vectorized call per segment present
+
+        Args:
+            features: Output of prepare_features_batch
+            segments: Segment of each row (default: every row uses the global model)
+
+        Returns:
+            Array of default probabilities in input order
+        """
+        if segments is None or not self.segments:
+            return super().predict_proba_batch(features)
+        return self._routed_probabilities(features, segments, cascade=False)
+
+    def _routed_probabilities(self, features: np.ndarray, segments: np.ndarray, cascade: bool) -> np.ndarray:
+        """
+        Route rows to their segment's model, prior-corrected like the global path
+
+        The cascade's screening model is distilled from the global model,
+        so with cascade=True it screens only the rows the global model scores.
+        """
+        names, inverse = np.unique(np.asarray(segments, dtype=str), return_inverse=True)
+        probs = np.empty(len(features))
+        for code, name in enumerate(names):
+            rows = np.flatnonzero(inverse == code)
+            if name in self.segments:
+                model, scaler = self.segments[name]
+                probs[rows] = model.predict_proba(scaler.transform(features[rows]))[:, 1]
+                continue
+            scaled = self.scaler.transform(features[rows]) if self.scaler is not None else features[rows]
+            if cascade and self.cascade is not None:
+                probs[rows] = self.cascade.predict_proba(self.model, scaled)
+            else:
+                probs[rows] = self.model.predict_proba(scaled)[:, 1]
+        return self._corrected(probs)
+
+    def _batch_probabilities(self, frame: pd.DataFrame, features: np.ndarray) -> np.ndarray:
+        if not self.segments:
+            return super()._batch_probabilities(frame, features)
+        return self._routed_probabilities(features, frame[self.segment_column].to_numpy(dtype=str), cascade=True)
+
+    def predict_risk_score(self, deal_data: Dict) -> Dict:
+        """Predict risk score for one deal with its segment's model"""
+        return self.predict_batch([deal_data])[0]
+
+    def segment_counts(self, deals) -> Dict[str, int]:
+        """Deals per model for a batch (unfit segments count as global)"""
+        segments = deals_to_frame(deals)[self.segment_column]
+        routed = segments.where(segments.isin(list(self.segments)), GLOBAL_SEGMENT)
+        return {name: int(n) for name, n in routed.value_counts().items()}
+
+
+def main():
+    """Train segmented models or score a batch with them"""
+    parser = argparse.ArgumentParser(
+        description='Per-asset-type risk models with a global fallback'
+    )
+    parser.add_argument(
+        '--data',
+        type=str,
+        default=None,
+        help='Training CSV (sample_data.csv or historical_deals.csv layout)'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=DEFAULT_MODEL_PATH,
+        help='Path to save the segmented artifact (default: risk_model_segmented.pkl)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Training processes (default: one per CPU)'
+    )
+    parser.add_argument(
+        '--min-samples',
+        type=int,
+        default=MIN_SEGMENT_SAMPLES,
+        help=f'Deals a segment needs for its own model (default: {MIN_SEGMENT_SAMPLES})'
+    )
+    parser.add_argument(
+        '--model',
+        type=str,
+        default=None,
+        help='Segmented artifact to score with (default: --output)'
+    )
+    parser.add_argument(
+        '--score',
+        type=str,
+        default=None,
+        help='CSV of deals to score with the segmented model'
+    )
+
+    args = parser.parse_args()
+
+    if not args.data and not args.score:
+        parser.error('Provide --data to train or --score to score')
+
+    if args.data:
+        artifact = train_segments(pd.read_csv(args.data), workers=args.workers, min_samples=args.min_samples)
+        with open(args.output, 'wb') as f:
+            pickle.dump(artifact, f)
+        print(f"[SUCCESS] Segmented model saved to {args.output}")
+
+    if args.score:
+        model = SegmentedRiskModel(args.model or args.output)
+        deals = pd.read_csv(args.score)
+
+        started = time.time()
+        results = model.predict_batch(deals)
+        elapsed = time.time() - started
+
+        print(json.dumps(results, indent=2))
+        print(f"[INFO] Scored {len(results)} deals in {elapsed * 1000:.1f} ms "
+              f"({json.dumps(model.segment_counts(deals))})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Shadow Scoring
+==============
+Records how candidate models would have scored live traffic next to the
+primary model, so a new artifact can be compared before it is promoted.
+
+- The scorer prepares features once per batch; each candidate scores the
+  same matrix and only the primary's result is returned
+- Per deal, the log keeps the risk score delta and both risk levels for
+  each candidate in fixed-size ring buffers (no per-deal objects)
+- Per batch, it keeps the batch size and the latency of every model, so the
+  shadow overhead can be read off directly
+- Reports (delta distribution, level flip matrix, latency) are computed on
+  demand; the log can be saved for offline analysis
+
+Usage:
+    model.enable_shadow({'candidate': 'risk_model_candidate.pkl'})
+    model.predict_batch(deals)
+    model.shadow_report()
+
+    python shadow_scoring.py --candidate risk_model_candidate.pkl --data deals.csv
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import json
+from typing import Dict, List
+
+import numpy as np
+
+# Deals kept per candidate before the oldest are overwritten
+DEFAULT_DEAL_CAPACITY = 100000
+
+# Batches kept for latency statistics
+DEFAULT_BATCH_CAPACITY = 4096
+
+
+class ShadowLog:
+    """
+    Ring buffers of candidate-vs-primary differences
+    """
+
+    def __init__(
+        self,
+        candidates: List[str],
+        levels: List[str],
+        capacity: int = DEFAULT_DEAL_CAPACITY,
+        batch_capacity: int = DEFAULT_BATCH_CAPACITY
+    ):
+        """
+        Initialize an empty log
+
+        Args:
+            candidates: Candidate model names, in scoring order
+            levels: Risk level names the level codes index into
+            capacity: Deals kept per candidate
+            batch_capacity: Batches kept for latency
+        """
+        self.candidates = list(candidates)
+        self.levels = list(levels)
+        k = len(self.candidates)
+
+        self.score_delta = np.zeros((capacity, k), dtype=np.int16)
+        self.primary_level = np.zeros(capacity, dtype=np.uint8)
+        self.candidate_level = np.zeros((capacity, k), dtype=np.uint8)
+        self.valid = np.zeros((capacity, k), dtype=bool)
+        self.deals_seen = 0
+
+        # Column 0 is the primary model
+        self.batch_size = np.zeros(batch_capacity, dtype=np.int32)
+        self.latency_ms = np.zeros((batch_capacity, k + 1), dtype=np.float32)
+        self.batches_seen = 0
+        self.errors = np.zeros(k, dtype=np.int64)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.primary_level)
+
+    def record(
+        self,
+        primary_scores: np.ndarray,
+        primary_levels: np.ndarray,
+        candidate_scores: np.ndarray,
+        candidate_levels: np.ndarray,
+        latency_ms: np.ndarray
+    ):
+        """
+        Append one scored batch
+
+        Args:
+            primary_scores: Primary risk scores (n,)
+            primary_levels: Primary risk level codes (n,)
+            candidate_scores: Candidate risk scores (n, k); rows of a failed
+                candidate are ignored via a negative score
+            candidate_levels: Candidate risk level codes (n, k)
+            latency_ms: Primary then candidate latency for the batch (k + 1,)
+        """
+        n = len(primary_scores)
+        slot = self.batches_seen % len(self.batch_size)
+        self.batch_size[slot] = n
+        self.latency_ms[slot] = latency_ms
+        self.batches_seen += 1
+
+        # Only the newest capacity rows of an oversized batch survive
+        if n > self.capacity:
+            keep = slice(n - self.capacity, n)
+            self.deals_seen += n - self.capacity
+            primary_scores, primary_levels = primary_scores[keep], primary_levels[keep]
+            candidate_scores, candidate_levels = candidate_scores[keep], candidate_levels[keep]
+            n = self.capacity
+
+        rows = (self.deals_seen + np.arange(n)) % self.capacity
+        self.score_delta[rows] = candidate_scores - primary_scores[:, None]
+        self.primary_level[rows] = primary_levels
+        self.candidate_level[rows] = candidate_levels
+        self.valid[rows] = candidate_scores >= 0
+        self.deals_seen += n
+
+    def report(self) -> Dict:
+        """
+        Summarize the buffered deals and batches per candidate
+
+        Returns:
+            Dictionary with per-candidate score deltas, level flips and
+            latency against the primary
+        """
+        deals = min(self.deals_seen, self.capacity)
+        batches = min(self.batches_seen, len(self.batch_size))
+        latency = self.latency_ms[:batches].astype(float)
+        sizes = self.batch_size[:batches]
+
+        def latency_stats(column: int) -> Dict:
+            if not batches:
+                return {}
+            values = latency[:, column]
+            return {
+                'p50_ms': round(float(np.percentile(values, 50)), 3),
+                'p95_ms': round(float(np.percentile(values, 95)), 3),
+                'us_per_deal': round(float(values.sum() / max(sizes.sum(), 1) * 1000), 3)
+            }
+
+        primary_total = latency[:, 0].sum() if batches else 0.0
+        report = {
+            'deals_seen': self.deals_seen,
+            'deals_buffered': deals,
+            'batches_seen': self.batches_seen,
+            'primary': {'latency': latency_stats(0)},
+            'candidates': {}
+        }
+
+        k_levels = len(self.levels)
+        for j, name in enumerate(self.candidates):
+            valid = self.valid[:deals, j]
+            delta = self.score_delta[:deals, j][valid].astype(float)
+            before = self.primary_level[:deals][valid].astype(np.int64)
+            after = self.candidate_level[:deals, j][valid].astype(np.int64)
+
+            flips = np.bincount(before * k_levels + after, minlength=k_levels * k_levels)
+            flips = flips.reshape(k_levels, k_levels)
+            flipped = int(len(delta) - np.trace(flips))
+
+            entry = {
+                'deals': int(len(delta)),
+                'errors': int(self.errors[j]),
+                'latency': latency_stats(j + 1),
+                'overhead_ratio': round(float(latency[:, j + 1].sum() / primary_total), 3) if primary_total else None
+            }
+            if len(delta):
+                abs_delta = np.abs(delta)
+                entry.update({
+                    'mean_delta': round(float(delta.mean()), 3),
+                    'mean_abs_delta': round(float(abs_delta.mean()), 3),
+                    'p95_abs_delta': float(np.percentile(abs_delta, 95)),
+                    'max_abs_delta': int(abs_delta.max()),
+                    'level_flips': flipped,
+                    'flip_rate': round(flipped / len(delta), 4),
+                    'upgrades': int(np.triu(flips, 1).sum()),
+                    'downgrades': int(np.tril(flips, -1).sum()),
+                    'flip_matrix': {
+                        self.levels[a]: {self.levels[b]: int(flips[a, b]) for b in range(k_levels)}
+                        for a in range(k_levels)
+                    }
+                })
+            report['candidates'][name] = entry
+
+        return report
+
+    def save(self, path: str):
+        """Write the buffers to an .npz file"""
+        np.savez_compressed(
+            path,
+            candidates=np.array(self.candidates),
+            levels=np.array(self.levels),
+            score_delta=self.score_delta,
+            primary_level=self.primary_level,
+            candidate_level=self.candidate_level,
+            valid=self.valid,
+            batch_size=self.batch_size,
+            latency_ms=self.latency_ms,
+            errors=self.errors,
+            counters=np.array([self.deals_seen, self.batches_seen])
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'ShadowLog':
+        """Read a log written by save"""
+        with np.load(path) as data:
+            log = cls(
+                data['candidates'].tolist(),
+                data['levels'].tolist(),
+                capacity=len(data['primary_level']),
+                batch_capacity=len(data['batch_size'])
+            )
+            for name in ('score_delta', 'primary_level', 'candidate_level', 'valid',
+                         'batch_size', 'latency_ms', 'errors'):
+                getattr(log, name)[...] = data[name]
+            log.deals_seen, log.batches_seen = (int(v) for v in data['counters'])
+        return log
+
+
+def main():
+    """Replay deals through the primary model with candidates in shadow"""
+    parser = argparse.ArgumentParser(description='Compare candidate models against the primary on a deal file')
+    parser.add_argument('--data', type=str, required=True, help='CSV or JSON list of deals to replay')
+    parser.add_argument(
+        '--model',
+        type=str,
+        default=None,
+        help='Primary model artifact (default: risk_model_trained.pkl)'
+    )
+    parser.add_argument(
+        '--candidate',
+        type=str,
+        action='append',
+        required=True,
+        help='Candidate model artifact, as PATH or NAME=PATH (repeatable)'
+    )
+    parser.add_argument('--batch-size', type=int, default=500, help='Deals per scoring batch (default: 500)')
+    parser.add_argument('--save', type=str, default=None, help='Write the shadow log to this .npz file (optional)')
+
+    args = parser.parse_args()
+
+    import pandas as pd
+    from risk_model import RiskAssessmentModel
+
+    candidates = {}
+    for spec in args.candidate:
+        name, _, path = spec.rpartition('=')
+        candidates[name or path] = path
+
+    model = RiskAssessmentModel(args.model)
+    model.enable_shadow(candidates)
+
+    deals = pd.read_json(args.data) if args.data.endswith('.json') else pd.read_csv(args.data)
+    for start in range(0, len(deals), args.batch_size):
+        model.predict_batch(deals.iloc[start:start + args.batch_size])
+
+    print(json.dumps(model.shadow_report(), indent=2))
+    if args.save:
+        model.shadow_log.save(args.save)
+        print(f"[INFO] Shadow log saved to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
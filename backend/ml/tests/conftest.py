@@ -0,0 +1,27 @@
+"""
+Shared fixtures for the ML module tests
+
+The ML modules are flat scripts that import each other by name, so the
+directory above is put on sys.path the way scripts/train_risk_model.py does.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+
+@pytest.fixture(scope='session')
+def sample_deals() -> pd.DataFrame:
+    """Deals from sample_data.csv, with ids"""
+    return pd.read_csv(os.path.join(ML_DIR, 'sample_data.csv'), nrows=200)
+
+
+@pytest.fixture(scope='session')
+def model():
+    from risk_model import get_model
+    return get_model()
@@ -0,0 +1,74 @@
+"""Tests for admission.py: degradation levels and deadline checks"""
+
+import time
+
+import pytest
+
+from admission import CACHED_SUFFIX, REJECTED_VERSION, SHED_RULES_VERSION, AdmissionController
+
+
+@pytest.fixture
+def deal(sample_deals):
+    return sample_deals.drop(columns=['deal_id']).iloc[0].to_dict()
+
+
+def test_degrade_returns_cached_model_result(deal):
+    controller = AdmissionController(workers=2)
+    controller.record(deal, {'risk_score': 42, 'model_version': '1.0.0'}, 0.005)
+
+    result = controller.degrade(deal, time.monotonic() + 1)
+
+    assert result['risk_score'] == 42
+    assert result['model_version'] == '1.0.0' + CACHED_SUFFIX
+    assert controller.report()['cached'] == 1
+
+
+def test_degrade_falls_back_to_rules_without_cache(deal):
+    controller = AdmissionController(workers=2)
+    # Error results are not cached
+    controller.record(deal, {'error': 'Model failed'}, 0.005)
+
+    result = controller.degrade(deal, time.monotonic() + 1)
+
+    assert result['model_version'] == SHED_RULES_VERSION
+    assert 'risk_score' in result
+    assert controller.report()['rules'] == 1
+
+
+def test_degrade_rejects_after_deadline(deal):
+    controller = AdmissionController(workers=2)
+    controller.record(deal, {'risk_score': 42, 'model_version': '1.0.0'}, 0.005)
+
+    result = controller.degrade(deal, time.monotonic() - 1)
+
+    assert result['model_version'] == REJECTED_VERSION
+    assert result['error'] == 'Deadline exceeded'
+    report = controller.report()
+    assert (report['cached'], report['rules'], report['rejected']) == (0, 0, 1)
+
+
+def test_can_meet_spreads_queue_over_workers():
+    controller = AdmissionController(workers=4, default_deadline_ms=100)
+    controller.service_time.estimate = 0.03
+    deadline = controller.deadline()
+
+    # 7 ahead on 4 workers is two rounds (60 ms); 12 ahead is four (120 ms)
+    assert controller.can_meet(deadline, ahead=7)
+    assert not controller.can_meet(deadline, ahead=12)
+    assert controller.can_meet(None, ahead=10 ** 6)
+
+
+def test_rule_failure_is_logged_off_the_response_stream(deal, monkeypatch, capsys):
+    import admission
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('broken rule table')
+
+    monkeypatch.setattr(admission.FALLBACK_RULES, 'score', fail)
+    result = AdmissionController(workers=2).degrade(deal, time.monotonic() + 1)
+
+    assert result['model_version'] == REJECTED_VERSION
+    captured = capsys.readouterr()
+    # worker_pool.serve writes JSON lines to stdout; diagnostics must go to stderr
+    assert captured.out == ''
+    assert 'broken rule table' in captured.err
@@ -0,0 +1,54 @@
+"""Tests for cascade.py: cascade scores agree with the full model, and slow cascades are refused"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cascade import CascadeScorer, _disagrees, saves_time, tune_cascade
+
+from conftest import ML_DIR
+
+
+@pytest.fixture(scope='module')
+def X_scaled(model):
+    deals = pd.read_csv(os.path.join(ML_DIR, '..', 'data', 'historical_deals.csv'))
+    return model.scaler.transform(model.prepare_features_batch(deals))
+
+
+def test_cascade_agrees_with_full_scoring(model, X_scaled):
+    # A negative min_saving keeps the settings whatever the timings, so the band can be checked
+    settings = tune_cascade(
+        model.model, X_scaled, stages=[(20, 4)], max_disagreement=0.05,
+        prior_correction=model.prior_correction, min_saving=-1.0, timing_runs=1
+    )
+    assert settings is not None and settings['short_circuit_rate'] > 0
+
+    scorer = CascadeScorer(settings)
+    cascaded = model._corrected(scorer.predict_proba(model.model, X_scaled))
+    full = model._corrected(model.model.predict_proba(X_scaled)[:, 1])
+
+    assert _disagrees(cascaded, full, settings['score_tolerance']).mean() <= settings['max_disagreement']
+    # Deals in the band are scored by the full model exactly
+    report = scorer.report()
+    assert report['full_model'] + report['short_circuited_low'] + report['short_circuited_high'] == len(X_scaled)
+    assert np.isclose(cascaded, full).sum() >= report['full_model']
+
+
+def test_no_cascade_when_nothing_is_saved(model, X_scaled):
+    # A few-tree screen cannot save 99% of the scoring time
+    settings = tune_cascade(
+        model.model, X_scaled, prior_correction=model.prior_correction, min_saving=0.99, timing_runs=1
+    )
+    assert settings is None
+
+
+def test_enable_cascade_refuses_settings_that_cost_more(model):
+    slower = {'relative_cost': 1.55, 'min_saving': 0.1, 'low': 0.0, 'high': 2.0, 'short_circuit_rate': 0.0}
+    assert not saves_time(slower)
+    assert not saves_time(None)
+
+    with pytest.raises(ValueError):
+        model.enable_cascade(slower)
+    assert model.cascade is None
@@ -0,0 +1,43 @@
+"""Tests for data_validation.py: percent units are decided per column, not per row"""
+
+import numpy as np
+import pandas as pd
+
+from data_validation import DataValidator
+
+
+def deals(occupancy):
+    return pd.DataFrame({
+        'deal_id': range(len(occupancy)),
+        'loan_amount': 5_000_000,
+        'requested_ltv': 70.0,
+        'occupancy_rate': occupancy
+    })
+
+
+def test_decimal_column_is_converted_to_percent():
+    validator = DataValidator()
+    clean = validator.validate(deals([0.5, 0.92, 1.0]))
+
+    np.testing.assert_allclose(clean['occupancy_rate'], [50.0, 92.0, 100.0])
+    assert validator.summary()['unit_conversions'] == {'occupancy_rate': 3}
+
+
+def test_small_values_in_percent_column_are_quarantined_not_rescaled():
+    validator = DataValidator()
+    clean = validator.validate(deals([0.0, 0.5, 1.0, 85.0]))
+
+    np.testing.assert_allclose(clean['occupancy_rate'], [0.0, 85.0])
+    summary = validator.summary()
+    assert summary['failures'] == {'unit:occupancy_rate': 2}
+    assert summary['unit_conversions'] == {}
+
+
+def test_unit_is_kept_across_chunks():
+    validator = DataValidator()
+    validator.validate(deals([40.0, 85.0]))
+    # A later chunk of low values is still in percent, not decimals
+    clean = validator.validate(deals([0.5, 1.0, 2.0]))
+
+    np.testing.assert_allclose(clean['occupancy_rate'], [2.0])
+    assert validator.summary()['failures'] == {'unit:occupancy_rate': 2}
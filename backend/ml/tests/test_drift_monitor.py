@@ -0,0 +1,34 @@
+"""Tests for drift_monitor.py: check files follow the reference layout"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drift_monitor import DriftMonitor, build_reference, check_matrix
+from risk_model import MODEL_FEATURES, deals_to_frame, derive_features, model_feature_matrix
+
+
+def test_scorer_layout_is_derived_from_raw_deals(sample_deals):
+    frame = deals_to_frame(sample_deals)
+    expected = model_feature_matrix(frame, derive_features(frame))
+
+    np.testing.assert_array_equal(check_matrix(sample_deals, MODEL_FEATURES), expected)
+
+
+def test_other_layouts_use_named_columns(sample_deals):
+    names = ['noi', 'cap_rate', 'location_score']
+    reference = build_reference(sample_deals[names])
+
+    matrix = check_matrix(sample_deals, reference['feature_names'])
+    monitor = DriftMonitor(reference)
+    monitor.update(matrix)
+
+    assert matrix.shape == (len(sample_deals), 3)
+    np.testing.assert_array_equal(matrix[:, 0], sample_deals['noi'])
+    # Same rows as the reference: no drift
+    assert all(f['psi'] < 0.01 for f in monitor.report()['features'].values())
+
+
+def test_layout_mismatch_raises(sample_deals):
+    with pytest.raises(ValueError, match='property_type_encoded'):
+        check_matrix(sample_deals, ['ltv_ratio', 'property_type_encoded'])
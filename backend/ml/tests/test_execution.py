@@ -0,0 +1,44 @@
+"""Tests for execution.py: cross-validation fits folds like the final model"""
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from execution import model_fingerprint, parallel_cross_val, plan_budget
+
+PARAMS = {'n_estimators': 20, 'max_depth': 3, 'learning_rate': 0.2, 'random_state': 42}
+
+
+def _data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(scale=1.0, size=n) > 1).astype(int)
+    # Downsampled negatives carry weight 1 / rate, as in sampling.sample_training
+    weights = np.where(y == 0, 4.0, 1.0)
+    return X, y, weights
+
+
+def test_folds_are_fit_with_their_sample_weights():
+    X, y, weights = _data()
+
+    cv = parallel_cross_val(PARAMS, X, y, 3, plan_budget(1, 3), sample_weight=weights)
+
+    for (train, test), score, fingerprint in zip(
+        StratifiedKFold(n_splits=3).split(X, y), cv['scores'], cv['fingerprints']
+    ):
+        model = xgb.XGBClassifier(**{**PARAMS, 'n_jobs': 1})
+        model.fit(X[train], y[train], sample_weight=weights[train])
+        assert model_fingerprint(model) == fingerprint
+        probs = model.predict_proba(X[test])[:, 1]
+        assert score == roc_auc_score(y[test], probs, sample_weight=weights[test])
+
+
+def test_weights_change_the_fold_models():
+    X, y, weights = _data()
+    budget = plan_budget(1, 3)
+
+    weighted = parallel_cross_val(PARAMS, X, y, 3, budget, sample_weight=weights)
+    unweighted = parallel_cross_val(PARAMS, X, y, 3, budget)
+
+    assert weighted['fingerprints'] != unweighted['fingerprints']
@@ -0,0 +1,23 @@
+"""Tests for explainability.py: explain() leaves the caller's model and process untouched"""
+
+import warnings
+
+import numpy as np
+import xgboost as xgb
+
+from explainability import explain
+
+
+def test_explain_does_not_pin_caller_model_or_leak_warning_filters():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 3))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, n_jobs=4).fit(X, y)
+    filters = len(warnings.filters)
+
+    result = explain(model, None, X, y, ['a', 'b', 'c'], repeats=2, grid_points=5, pd_rows=100, ice_rows=5)
+
+    assert model.get_params()['n_jobs'] == 4
+    assert len(warnings.filters) == filters
+    # The informative feature matters most
+    assert max(result['permutation_importance'], key=lambda name: result['permutation_importance'][name]['mean']) == 'a'
@@ -0,0 +1,78 @@
+"""Tests for feature_store.py: generations and incremental upserts"""
+
+import json
+import os
+
+import numpy as np
+
+from feature_store import FeatureStore, input_hashes
+from risk_model import deals_to_frame
+
+
+def _generation_dir(store):
+    with open(os.path.join(store.version_dir, 'CURRENT')) as f:
+        return os.path.join(store.version_dir, f.read().strip())
+
+
+def _meta(store):
+    with open(os.path.join(_generation_dir(store), 'meta.json')) as f:
+        return json.load(f)
+
+
+def test_upsert_publishes_generations(tmp_path, sample_deals):
+    store = FeatureStore(str(tmp_path / 'store'))
+    deals = sample_deals.head(30)
+
+    assert store.upsert(deals) == {'inserted': 30, 'updated': 0, 'unchanged': 0}
+    first = _generation_dir(store)
+    assert len(store) == 30
+    assert list(store.deal_ids) == sorted(deals['deal_id'])
+
+    # Nothing changed: no new generation
+    assert store.upsert(deals) == {'inserted': 0, 'updated': 0, 'unchanged': 30}
+    assert _generation_dir(store) == first
+
+    assert store.upsert(sample_deals.head(40))['inserted'] == 10
+    assert _generation_dir(store) != first
+    assert len(store) == 40
+
+    # Reopening reads the live generation
+    reopened = FeatureStore(str(tmp_path / 'store'))
+    np.testing.assert_array_equal(reopened.feature_matrix(), store.feature_matrix())
+
+
+def test_update_writes_only_changed_columns(tmp_path, sample_deals):
+    store = FeatureStore(str(tmp_path / 'store'))
+    deals = sample_deals.head(30).copy()
+    store.upsert(deals)
+    before = _generation_dir(store)
+
+    deals.loc[3, 'credit_score'] = deals.loc[3, 'credit_score'] - 50
+    assert store.upsert(deals) == {'inserted': 0, 'updated': 1, 'unchanged': 29}
+
+    assert _meta(store)['written'] == ['borrower_credit_score', 'input_hash']
+    after = _generation_dir(store)
+    # Unchanged columns are the previous generation's files
+    assert os.path.samefile(os.path.join(before, 'loan_amount.npy'), os.path.join(after, 'loan_amount.npy'))
+
+    row = store.rows_for([deals.loc[3, 'deal_id']])[0]
+    assert store.column('borrower_credit_score')[row] == deals.loc[3, 'credit_score']
+
+
+def test_supplied_noi_is_an_input(sample_deals):
+    frame = deals_to_frame(sample_deals.head(5))
+    changed = frame.copy()
+    changed.loc[0, 'noi'] = changed.loc[0, 'noi'] * 2
+
+    before, after = input_hashes(frame), input_hashes(changed)
+
+    assert before[0] != after[0]
+    np.testing.assert_array_equal(before[1:], after[1:])
+
+
+def test_integer_and_float_inputs_hash_equal(sample_deals):
+    frame = deals_to_frame(sample_deals.head(5))
+    as_float = frame.copy()
+    as_float['requested_term_months'] = as_float['requested_term_months'].astype(float)
+
+    np.testing.assert_array_equal(input_hashes(frame), input_hashes(as_float))
@@ -0,0 +1,96 @@
+"""Tests for rescore_portfolio.py: change detection and resume"""
+
+import sqlite3
+
+import pytest
+
+from rescore_portfolio import AssessmentWriter, PortfolioRescorer
+
+
+@pytest.fixture
+def export(tmp_path, sample_deals):
+    path = tmp_path / 'deals.csv'
+    sample_deals.head(60).to_csv(path, index=False)
+    return str(path)
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT deal_id FROM risk_assessments').fetchall()
+    finally:
+        conn.close()
+
+
+def _run(tmp_path, export, writer=None, **kwargs):
+    rescorer = PortfolioRescorer(state_path=str(tmp_path / 'state.db'), chunk_size=20, workers=1, **kwargs)
+    writer = writer or AssessmentWriter(str(tmp_path / 'out.db'))
+    try:
+        return rescorer, rescorer.run(export, writer)
+    finally:
+        writer.close()
+        rescorer.close()
+
+
+def test_unchanged_deals_are_skipped(tmp_path, export):
+    _, first = _run(tmp_path, export)
+    assert first['scored'] == 60
+
+    _, second = _run(tmp_path, export)
+    assert second['scored'] == 0
+    assert second['skipped'] == 60
+    assert len(_rows(tmp_path / 'out.db')) == 60
+
+
+def test_new_model_artifact_rescores(tmp_path, export):
+    _run(tmp_path, export)
+
+    rescorer = PortfolioRescorer(state_path=str(tmp_path / 'state.db'), chunk_size=20, workers=1)
+    # Same version string, different artifact
+    rescorer.fingerprint = rescorer.fingerprint + '-promoted'
+    writer = AssessmentWriter(str(tmp_path / 'out.db'))
+    try:
+        stats = rescorer.run(export, writer)
+    finally:
+        writer.close()
+        rescorer.close()
+    assert stats['scored'] == 60
+
+
+class _CrashingWriter(AssessmentWriter):
+    """Fails on the second chunk, before anything of it is committed"""
+
+    def __init__(self, target):
+        super().__init__(target)
+        self.calls = 0
+
+    def write(self, rows, checkpoint=None):
+        self.calls += 1
+        if self.calls == 2:
+            raise RuntimeError('simulated crash')
+        super().write(rows, checkpoint)
+
+
+def test_resume_after_interrupted_run(tmp_path, export):
+    with pytest.raises(RuntimeError):
+        _run(tmp_path, export, writer=_CrashingWriter(str(tmp_path / 'out.db')))
+    assert len(_rows(tmp_path / 'out.db')) == 20
+
+    _, resumed = _run(tmp_path, export)
+    assert resumed['resumed_chunks'] == 1
+    assert resumed['scored'] == 40
+
+    deal_ids = [row[0] for row in _rows(tmp_path / 'out.db')]
+    assert len(deal_ids) == 60
+    assert len(set(deal_ids)) == 60
+
+
+def test_changed_noi_is_rescored(tmp_path, export, sample_deals):
+    _run(tmp_path, export)
+
+    deals = sample_deals.head(60).copy()
+    deals.loc[7, 'noi'] = deals.loc[7, 'noi'] * 0.5
+    deals.to_csv(export, index=False)
+
+    _, stats = _run(tmp_path, export)
+    assert stats['scored'] == 1
@@ -0,0 +1,33 @@
+"""Tests for risk_model.py: batch scoring matches single-deal scoring"""
+
+import pytest
+
+from risk_model import RiskAssessmentModel
+
+
+def test_predict_batch_matches_predict_risk_score(model, sample_deals):
+    deals = sample_deals.head(50).to_dict('records')
+
+    batch = model.predict_batch(deals)
+
+    assert len(batch) == len(deals)
+    for deal, result in zip(deals, batch):
+        single = model.predict_risk_score(deal)
+        assert result['risk_score'] == single['risk_score']
+        assert result['risk_level'] == single['risk_level']
+        assert result['confidence'] == pytest.approx(single['confidence'], abs=0.01)
+        assert result['model_version'] == single['model_version']
+
+
+def test_rule_table_batch_matches_single():
+    rules = RiskAssessmentModel(model_path='does-not-exist.pkl')
+    rules.model = None
+    deals = [
+        {'loan_amount': 5000000, 'requested_ltv': 82, 'borrower_credit_score': 640},
+        {'loan_amount': 1200000, 'requested_ltv': 60, 'borrower_credit_score': 760, 'asset_type': 'industrial'}
+    ]
+
+    batch = rules.predict_batch(deals)
+
+    for deal, result in zip(deals, batch):
+        assert result['risk_score'] == rules.predict_risk_score(deal)['risk_score']
@@ -0,0 +1,81 @@
+"""Tests for scheduler.py: weighted fair queuing order and per-class worker limits"""
+
+import pytest
+
+from scheduler import ChunkAssembler, WeightedFairQueue, default_classes, split_chunks
+
+
+def item(request_id):
+    return (request_id, {}, 0, None)
+
+
+@pytest.fixture
+def queue():
+    return WeightedFairQueue(default_classes(workers=3))
+
+
+def test_interactive_overtakes_queued_batch_chunks(queue):
+    for n in range(3):
+        queue.push(item(f'chunk-{n}'), 'batch', cost=500)
+    queue.push(item('deal'), 'interactive')
+
+    assert queue.popleft()[0] == 'deal'
+    assert [queue.popleft()[0] for _ in range(2)] == ['chunk-0', 'chunk-1']
+
+
+def test_order_follows_finish_tags_within_and_across_classes():
+    queue = WeightedFairQueue({'a': {'weight': 2.0, 'max_workers': None}, 'b': {'weight': 1.0, 'max_workers': None}})
+    for n in range(4):
+        queue.push(item(f'a{n}'), 'a')
+    for n in range(2):
+        queue.push(item(f'b{n}'), 'b')
+
+    # Tags: a 0.5, 1, 1.5, 2; b 1, 2 (ties go to the class listed first)
+    assert [queue.popleft()[0] for _ in range(6)] == ['a0', 'a1', 'b0', 'a2', 'a3', 'b1']
+
+
+def test_batch_limited_to_max_workers(queue):
+    assert queue.classes['batch']['max_workers'] == 2
+    for n in range(4):
+        queue.push(item(f'chunk-{n}'), 'batch', cost=10)
+
+    first, second = queue.popleft(), queue.popleft()
+    # Both batch slots are taken; queued chunks are not eligible
+    assert not queue and len(queue) == 0
+    with pytest.raises(IndexError):
+        queue.popleft()
+
+    queue.push(item('deal'), 'interactive')
+    assert queue.popleft()[0] == 'deal'
+
+    queue.done(first[0])
+    assert queue.popleft()[0] == 'chunk-2'
+    assert queue.report()['batch']['running'] == 2
+
+
+def test_retry_does_not_move_virtual_time_back(queue):
+    queue.push(item('a'), 'batch', cost=10)
+    queue.push(item('b'), 'batch', cost=10)
+    first = queue.popleft()
+    queue.popleft()
+    before = queue.virtual_time
+
+    # A worker crash puts the first item back with its older tag
+    queue.appendleft(first)
+    queue.popleft()
+    assert queue.virtual_time == before
+
+
+def test_one_worker_pool_lets_batch_use_it():
+    assert default_classes(workers=1)['batch']['max_workers'] == 1
+
+
+def test_chunks_reassemble_in_input_order():
+    chunks = split_chunks(list(range(7)), chunk_size=3)
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+    assembler = ChunkAssembler()
+    assembler.register(1, len(chunks))
+    assert assembler.add(1, 2, chunks[2]) is None
+    assert assembler.add(1, 0, chunks[0]) is None
+    assert assembler.add(1, 1, chunks[1]) == chunks
@@ -0,0 +1,44 @@
+"""Tests for segmented_model.py: routed scoring matches the global path"""
+
+import os
+
+import numpy as np
+import pytest
+
+from risk_model import deals_to_frame
+from sampling import correct_probabilities
+from segmented_model import SegmentedRiskModel
+
+from conftest import ML_DIR
+
+
+@pytest.fixture
+def segmented():
+    model = SegmentedRiskModel(os.path.join(ML_DIR, 'risk_model_trained.pkl'))
+    # The global model doubles as the retail segment's model
+    model.segments = {'retail': (model.model, model.scaler)}
+    return model
+
+
+def test_routed_probabilities_are_prior_corrected(segmented, sample_deals):
+    frame = deals_to_frame(sample_deals)
+    features = segmented.prepare_features_batch(frame)
+    segments = frame[segmented.segment_column].to_numpy(dtype=str)
+    raw = segmented.predict_proba_batch(features, segments)
+
+    segmented.prior_correction = 0.25
+    corrected = segmented.predict_proba_batch(features, segments)
+
+    np.testing.assert_allclose(corrected, correct_probabilities(raw, 0.25))
+    assert (segments == 'retail').any() and (segments != 'retail').any()
+
+
+def test_routed_scores_match_global_model(segmented, sample_deals):
+    segmented.prior_correction = 0.25
+    frame = deals_to_frame(sample_deals)
+    features = segmented.prepare_features_batch(frame)
+
+    routed = segmented._batch_probabilities(frame, features)
+    unrouted = segmented.predict_proba_batch(features)
+
+    np.testing.assert_allclose(routed, unrouted)
@@ -22,24 +22,109 @@ import argparse
 import json
 import os
 import pickle
+import time
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
     recall_score,
     f1_score,
-    roc_auc_score,
-    confusion_matrix,
-    classification_report
+    roc_auc_score
 )
-import matplotlib.pyplot as plt
+
+from data_validation import LABEL_COLUMNS, DataValidator
+from drift_monitor import build_reference
+from execution import (
+    available_cores,
+    fit_final,
+    model_fingerprint,
+    parallel_cross_val,
+    plan_budget,
+    scaling_benchmark
+)
+from explainability import explain, print_importance
+from feature_store import FeatureStore
+from sampling import (
+    SAMPLING_MODES,
+    WEIGHT_COLUMN,
+    correct_probabilities,
+    print_sampling_report,
+    reservoir_sample,
+    sample_training,
+    sampling_report
+)
+from training_report import evaluation_results, launch_report, plot_feature_importance
+
+# Required direction of risk in each feature for constrained training
+# (+1 non-decreasing, -1 non-increasing); matched by column name
+MONOTONE_DIRECTIONS = {
+    'ltv': 1,
+    'ltv_ratio': 1,
+    'dscr': -1,
+    'borrower_credit_score': -1,
+    'occupancy_rate': -1
+}
+
+# Model sizes searched by constrained training
+CONSTRAINED_DEPTHS = [2, 3, 4]
+CONSTRAINED_N_ESTIMATORS = [25, 50, 100, 200]
+
+# Smallest model within this validation AUC of the best is selected
+AUC_TOLERANCE = 0.005
+
+# Rows scored when timing inference
+TIMING_ROWS = 10000
+
+
+def monotone_constraints(feature_names: List[str]) -> Tuple[int, ...]:
+    """
+    XGBoost monotone constraints for a feature layout
+
+    Args:
+        feature_names: Columns in training order
+
+    Returns:
+        Tuple with one direction per column (0 = unconstrained)
+    """
+    return tuple(MONOTONE_DIRECTIONS.get(name, 0) for name in feature_names)
+
+
+def model_cost(model: xgb.XGBClassifier, X: np.ndarray, n_trees: int = None) -> Dict:
+    """
+    Size and inference cost of a model (or its first n_trees trees)
+
+    Args:
+        model: Fitted classifier
+        X: Feature rows to time inference on (tiled up to TIMING_ROWS)
+        n_trees: Only count the first n_trees trees (default: all)
+
+    Returns:
+        Dictionary with tree and node counts and microseconds per row
+    """
+    dump = model.get_booster().get_dump()
+    n_trees = n_trees or len(dump)
+    rows = np.resize(X, (TIMING_ROWS, X.shape[1]))
+
+    # Best of three runs keeps the timing stable on a busy machine
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        model.predict_proba(rows, iteration_range=(0, n_trees))
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'trees': n_trees,
+        # One dump line per node
+        'nodes': sum(tree.count('\n') for tree in dump[:n_trees]),
+        'inference_us_per_row': round(min(timings) / TIMING_ROWS * 1e6, 3)
+    }
 
 
 class RiskModelTrainer:
@@ -47,14 +132,31 @@ class RiskModelTrainer:
     Trainer for commercial real estate loan risk assessment model
     """
     
-    def __init__(self, random_state: int = 42):
+    def __init__(
+        self,
+        random_state: int = 42,
+        cores: int = None,
+        fold_processes: int = None,
+        negative_rate: float = 1.0,
+        sampling_mode: str = 'weights'
+    ):
         """
         Initialize trainer
         
         Args:
             random_state: Random seed for reproducibility
+            cores: Core budget for training (default: all available)
+            fold_processes: Processes for cross-validation folds; the rest of
+                the budget goes to threads per model (default: one per fold)
+            negative_rate: Fraction of non-defaults kept in the training
+                split (default: 1.0, no sampling)
+            sampling_mode: How the rate is compensated (see sampling.py)
         """
         self.random_state = random_state
+        self.cores = cores
+        self.fold_processes = fold_processes
+        self.negative_rate = negative_rate
+        self.sampling_mode = sampling_mode
         self.model = None
         self.scaler = None
         self.feature_names = [
@@ -72,6 +174,11 @@ class RiskModelTrainer:
             'cap_rate'
         ]
         self.training_metrics = {}
+        self.drift_reference = None
+        self.validation_summary = None
+        self.holdout = None
+        self.explanations = None
+        self.sampling = None
     
     def load_data(self, filepath: str) -> pd.DataFrame:
         """
@@ -94,18 +201,88 @@ class RiskModelTrainer:
         
         return df
     
-    def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    def sample_data(self, filepath: str, capacity: int, strata: List[str] = None) -> pd.DataFrame:
+        """
+        Stratified reservoir sample of a training file in one streaming pass
+        
+        Args:
+            filepath: Path to CSV file
+            capacity: Rows kept per stratum
+            strata: Stratum columns besides the label (optional)
+            
+        Returns:
+            Sampled rows with a sample_weight column (seen / kept per stratum)
+        """
+        print(f"\n[INFO] Sampling data from {filepath} ({capacity} rows per stratum)...")
+        
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"Data file not found: {filepath}")
+        
+        columns = pd.read_csv(filepath, nrows=0).columns
+        label = next((c for c in LABEL_COLUMNS if c in columns), None)
+        if label is None:
+            raise ValueError(f"No label column found. Expected one of {LABEL_COLUMNS}")
+        
+        df, summary = reservoir_sample(filepath, capacity, [label] + list(strata or []), seed=self.random_state)
+        print(f"[INFO] Kept {summary['rows_kept']} of {summary['rows_seen']} records "
+              f"in {summary['seconds']:.2f}s")
+        for stratum, counts in summary['per_stratum'].items():
+            print(f"[INFO]   {stratum}: {counts['kept']} of {counts['seen']}")
+        
+        return df
+    
+    def validate_data(self, df: pd.DataFrame, quarantine_path: str = None) -> pd.DataFrame:
+        """
+        Drop invalid rows before prepare_features (see data_validation.py)
+        
+        Args:
+            df: Raw dataframe
+            quarantine_path: CSV to write quarantined rows to (optional)
+            
+        Returns:
+            Rows that passed validation, with percent units normalized
+        """
+        print("\n[INFO] Validating data...")
+        
+        validator = DataValidator(labels=True, quarantine_path=quarantine_path)
+        clean = validator.validate(df).reset_index(drop=True)
+        validator.print_summary()
+        self.validation_summary = validator.summary()
+        
+        if clean.empty:
+            raise ValueError("Every row failed validation; see the quarantine summary above")
+        
+        return clean
+    
+    def prepare_features(
+        self,
+        df: pd.DataFrame,
+        feature_store: FeatureStore = None
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
         """
         Prepare features and labels from raw data
         
         Args:
             df: Raw dataframe
+            feature_store: Optional store to read derived metrics from; only
+                deals that are new or changed get their metrics recomputed
             
         Returns:
             Tuple of (features_df, labels_array)
         """
         print("\n[INFO] Preparing features...")
         
+        stored = None
+        if feature_store is not None:
+            stats = feature_store.upsert(df)
+            print(f"[INFO] Feature store: {stats['unchanged']} cached, "
+                  f"{stats['inserted'] + stats['updated']} computed")
+            deal_ids = df['deal_id' if 'deal_id' in df.columns else 'id'].astype(str)
+            stored = dict(zip(
+                ['property_value', 'noi', 'dscr', 'cap_rate'],
+                feature_store.feature_matrix(deal_ids, ['property_value', 'noi', 'dscr', 'cap_rate']).T
+            ))
+        
         # Property type encoding
         property_type_map = {
             'multifamily': 1,
@@ -135,7 +312,10 @@ class RiskModelTrainer:
             features['property_type_encoded'] = 1  # Default to multifamily
         
         # Calculate property value from LTV
-        features['property_value'] = features['loan_amount'] / (features['ltv_ratio'] / 100)
+        if stored is not None:
+            features['property_value'] = stored['property_value']
+        else:
+            features['property_value'] = features['loan_amount'] / (features['ltv_ratio'] / 100)
         
         # Borrower credit score
         features['borrower_credit_score'] = df['credit_score'] if 'credit_score' in df.columns else 720
@@ -147,14 +327,18 @@ class RiskModelTrainer:
         features['location_score'] = df['location_score'] if 'location_score' in df.columns else 70.0
         
         # Calculate NOI (Net Operating Income)
-        if 'noi' in df.columns:
+        if stored is not None:
+            features['noi'] = stored['noi']
+        elif 'noi' in df.columns:
             features['noi'] = df['noi']
         else:
             # Estimate NOI as 6% of property value
             features['noi'] = features['property_value'] * 0.06
         
         # Calculate DSCR (Debt Service Coverage Ratio)
-        if 'dscr' in df.columns:
+        if stored is not None:
+            features['dscr'] = stored['dscr']
+        elif 'dscr' in df.columns:
             features['dscr'] = df['dscr']
         else:
             # Calculate DSCR = NOI / Annual Debt Service
@@ -171,7 +355,9 @@ class RiskModelTrainer:
             features['dscr'] = features['dscr'].fillna(1.0)
         
         # Calculate Cap Rate
-        if 'cap_rate' in df.columns:
+        if stored is not None:
+            features['cap_rate'] = stored['cap_rate']
+        elif 'cap_rate' in df.columns:
             features['cap_rate'] = df['cap_rate']
         else:
             features['cap_rate'] = (features['noi'] / features['property_value']) * 100
@@ -200,7 +386,8 @@ class RiskModelTrainer:
         X: pd.DataFrame,
         y: np.ndarray,
         test_size: float = 0.2,
-        cv_folds: int = 5
+        cv_folds: int = 5,
+        sample_weight: np.ndarray = None
     ) -> Dict:
         """
         Train XGBoost model with cross-validation
@@ -210,6 +397,7 @@ class RiskModelTrainer:
             y: Labels array
             test_size: Fraction of data for testing
             cv_folds: Number of cross-validation folds
+            sample_weight: Row weights, e.g. from sample_data (optional)
             
         Returns:
             Dictionary with training metrics
@@ -217,13 +405,23 @@ class RiskModelTrainer:
         print("\n[INFO] Training XGBoost model...")
         
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=self.random_state, stratify=y
-        )
+        X_train, X_test, y_train, y_test, w_train = self._split(X, y, sample_weight, test_size)
         
         print(f"[INFO] Training set: {len(X_train)} samples")
         print(f"[INFO] Test set: {len(X_test)} samples")
         
+        # Unscaled holdout, for explanations after training
+        self.holdout = (X_test, y_test)
+        
+        # Name features in the order they are trained on
+        self.feature_names = list(X.columns)
+        
+        # Training distribution for production drift monitoring
+        self.drift_reference = build_reference(X_train)
+        
+        # Downsample non-defaults in the training split only
+        X_train, y_train, fit_kwargs, model_params = self._sample_training(X_train, y_train, w_train)
+        
         # Scale features
         self.scaler = StandardScaler()
         X_train_scaled = self.scaler.fit_transform(X_train)
@@ -237,31 +435,61 @@ class RiskModelTrainer:
             objective='binary:logistic',
             eval_metric='auc',
             random_state=self.random_state,
-            use_label_encoder=False
+            use_label_encoder=False,
+            **model_params
         )
         
         # Train model
         print("[INFO] Training in progress...")
-        self.model.fit(
+        self._fit(
             X_train_scaled,
             y_train,
             eval_set=[(X_test_scaled, y_test)],
-            verbose=False
+            verbose=False,
+            **fit_kwargs
         )
         
-        # Cross-validation
-        print(f"[INFO] Running {cv_folds}-fold cross-validation...")
-        cv_scores = cross_val_score(
-            self.model,
-            X_train_scaled,
-            y_train,
-            cv=cv_folds,
-            scoring='roc_auc'
+        metrics = self._evaluate(
+            X_train_scaled, y_train, X_test_scaled, y_test, cv_folds, y.mean(), fit_kwargs.get('sample_weight')
         )
         
+        return metrics
+    
+    def _evaluate(
+        self,
+        X_train_scaled: np.ndarray,
+        y_train: np.ndarray,
+        X_test_scaled: np.ndarray,
+        y_test: np.ndarray,
+        cv_folds: int,
+        default_rate: float,
+        sample_weight: np.ndarray = None
+    ) -> Dict:
+        """
+        Cross-validate and score the fitted model on the test split
+        
+        Args:
+            X_train_scaled: Scaled training features
+            y_train: Training labels
+            X_test_scaled: Scaled test features
+            y_test: Test labels
+            cv_folds: Number of cross-validation folds
+            default_rate: Default rate of the full (unsampled) data
+            sample_weight: Training weights the model was fit with (optional)
+            
+        Returns:
+            Dictionary with training metrics
+        """
+        # Cross-validation, folds spread over the core budget
+        budget = plan_budget(self.cores, cv_folds, self.fold_processes)
+        print(f"[INFO] Running {cv_folds}-fold cross-validation "
+              f"({budget['processes']} processes x {budget['threads']} threads)...")
+        cv = parallel_cross_val(self.model.get_params(), X_train_scaled, y_train, cv_folds, budget, sample_weight)
+        cv_scores = cv['scores']
+        
         # Predictions
-        y_pred = self.model.predict(X_test_scaled)
-        y_pred_proba = self.model.predict_proba(X_test_scaled)[:, 1]
+        y_pred_proba = self.predict_proba(X_test_scaled)
+        y_pred = (y_pred_proba > 0.5).astype(int)
         
         # Calculate metrics
         metrics = {
@@ -272,9 +500,13 @@ class RiskModelTrainer:
             'roc_auc': roc_auc_score(y_test, y_pred_proba),
             'cv_mean': cv_scores.mean(),
             'cv_std': cv_scores.std(),
-            'train_samples': len(X_train),
-            'test_samples': len(X_test),
-            'default_rate': y.mean()
+            'train_samples': len(X_train_scaled),
+            'test_samples': len(X_test_scaled),
+            'default_rate': default_rate,
+            'execution': budget,
+            'model_fingerprint': model_fingerprint(self.model),
+            'sampling': self.sampling,
+            'evaluation': evaluation_results(y_test, y_pred_proba, self.feature_names, self.model.feature_importances_)
         }
         
         self.training_metrics = metrics
@@ -289,30 +521,240 @@ class RiskModelTrainer:
         print(f"F1 Score:      {metrics['f1_score']:.4f}")
         print(f"ROC AUC:       {metrics['roc_auc']:.4f}")
         print(f"CV Mean AUC:   {metrics['cv_mean']:.4f} (+/- {metrics['cv_std']:.4f})")
+        print(f"Fingerprint:   {metrics['model_fingerprint'][:16]}")
         print("="*60)
         
-        # Confusion matrix
-        cm = confusion_matrix(y_test, y_pred)
-        print("\nConfusion Matrix:")
-        print(f"TN: {cm[0,0]:4d}  FP: {cm[0,1]:4d}")
-        print(f"FN: {cm[1,0]:4d}  TP: {cm[1,1]:4d}")
+        # Confusion matrix, classification report and importance are
+        # rendered by training_report.py from metrics['evaluation']
         
-        # Classification report
-        print("\nClassification Report:")
-        print(classification_report(y_test, y_pred, target_names=['No Default', 'Default']))
+        return metrics
+    
+    def train_constrained(
+        self,
+        X: pd.DataFrame,
+        y: np.ndarray,
+        test_size: float = 0.2,
+        cv_folds: int = 5,
+        depths: List[int] = None,
+        n_estimators_grid: List[int] = None,
+        tolerance: float = AUC_TOLERANCE,
+        sample_weight: np.ndarray = None
+    ) -> Dict:
+        """
+        Train a monotone-constrained model sized by validation
         
-        # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': self.feature_names,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
+        Risk is constrained non-decreasing in LTV and non-increasing in DSCR,
+        credit score and occupancy (MONOTONE_DIRECTIONS, by column name). One
+        model per depth is fit with the largest tree count; smaller tree counts
+        are scored as prefixes of it, so the grid costs one fit per depth. The
+        smallest model (fewest nodes) within tolerance of the best validation
+        AUC is refit on the full training split.
         
-        print("\nTop 5 Most Important Features:")
-        for idx, row in feature_importance.head(5).iterrows():
-            print(f"  {row['feature']:25s}: {row['importance']:.4f}")
+        Args:
+            X: Feature dataframe
+            y: Labels array
+            test_size: Fraction of data for testing
+            cv_folds: Number of cross-validation folds
+            depths: Candidate max depths (default: CONSTRAINED_DEPTHS)
+            n_estimators_grid: Candidate tree counts (default: CONSTRAINED_N_ESTIMATORS)
+            tolerance: Validation AUC a smaller model may give up
+            sample_weight: Row weights, e.g. from sample_data (optional)
+        
+        Returns:
+            Dictionary with training metrics, model size and inference cost
+        """
+        print("\n[INFO] Training monotone-constrained XGBoost model...")
+        
+        depths = depths or CONSTRAINED_DEPTHS
+        n_estimators_grid = sorted(n_estimators_grid or CONSTRAINED_N_ESTIMATORS)
+        self.feature_names = list(X.columns)
+        constraints = monotone_constraints(self.feature_names)
+        
+        constrained = [f for f, c in zip(self.feature_names, constraints) if c]
+        print(f"[INFO] Monotone constraints: {', '.join(constrained) or 'none'}")
+        
+        # Test split; non-defaults are downsampled in the training split only
+        X_train, X_test, y_train, y_test, w_train = self._split(X, y, sample_weight, test_size)
+        self.drift_reference = build_reference(X_train)
+        X_train, y_train, fit_kwargs, model_params = self._sample_training(X_train, y_train, w_train)
+        
+        # Validation split from training for model selection
+        X_fit, X_val, y_fit, y_val, w_fit = self._split(X_train, y_train, fit_kwargs.get('sample_weight'), 0.25)
+        fit_weights = {} if w_fit is None else {'sample_weight': w_fit}
+        
+        print(f"[INFO] Training set: {len(X_train)} samples ({len(X_val)} for validation)")
+        print(f"[INFO] Test set: {len(X_test)} samples")
+        
+        # Unscaled holdout, for explanations after training
+        self.holdout = (X_test, y_test)
+        
+        # StandardScaler is increasing per feature, so constraint directions hold
+        selection_scaler = StandardScaler()
+        X_fit_scaled = selection_scaler.fit_transform(X_fit)
+        X_val_scaled = selection_scaler.transform(X_val)
+        
+        grid = []
+        for depth in depths:
+            candidate = fit_final(
+                self._constrained_classifier(depth, n_estimators_grid[-1], constraints, model_params).get_params(),
+                X_fit_scaled, y_fit, plan_budget(self.cores), verbose=False, **fit_weights
+            )
+        
+            for n_estimators in n_estimators_grid:
+                proba = candidate.predict_proba(X_val_scaled, iteration_range=(0, n_estimators))[:, 1]
+                cost = model_cost(candidate, X_val_scaled, n_estimators)
+                grid.append({
+                    'max_depth': depth,
+                    'n_estimators': n_estimators,
+                    'val_auc': round(float(roc_auc_score(y_val, proba)), 4),
+                    'nodes': cost['nodes'],
+                    'inference_us_per_row': cost['inference_us_per_row']
+                })
+        
+        best_auc = max(row['val_auc'] for row in grid)
+        eligible = [row for row in grid if row['val_auc'] >= best_auc - tolerance]
+        selected = min(eligible, key=lambda row: (row['nodes'], row['inference_us_per_row']))
+        
+        print("\nModel Selection (validation):")
+        print(f"  {'depth':>5s} {'trees':>5s} {'AUC':>7s} {'nodes':>7s} {'us/row':>8s}")
+        for row in grid:
+            marker = ' <- selected' if row is selected else ''
+            print(f"  {row['max_depth']:5d} {row['n_estimators']:5d} {row['val_auc']:7.4f} "
+                  f"{row['nodes']:7d} {row['inference_us_per_row']:8.3f}{marker}")
+        
+        # Refit the selected size on the full training split
+        self.scaler = StandardScaler()
+        X_train_scaled = self.scaler.fit_transform(X_train)
+        X_test_scaled = self.scaler.transform(X_test)
+        
+        self.model = self._constrained_classifier(
+            selected['max_depth'], selected['n_estimators'], constraints, model_params
+        )
+        self._fit(X_train_scaled, y_train, eval_set=[(X_test_scaled, y_test)], verbose=False, **fit_kwargs)
+        
+        metrics = self._evaluate(
+            X_train_scaled, y_train, X_test_scaled, y_test, cv_folds, y.mean(), fit_kwargs.get('sample_weight')
+        )
+        
+        cost = model_cost(self.model, X_test_scaled)
+        metrics.update({
+            'training_mode': 'constrained',
+            'monotone_constraints': dict(zip(self.feature_names, constraints)),
+            'max_depth': selected['max_depth'],
+            'n_estimators': selected['n_estimators'],
+            'model_trees': cost['trees'],
+            'model_nodes': cost['nodes'],
+            'model_bytes': len(self.model.get_booster().save_raw('ubj')),
+            'inference_us_per_row': cost['inference_us_per_row'],
+            'selection_grid': grid
+        })
+        self.training_metrics = metrics
+        
+        print(f"\n[INFO] Selected depth {selected['max_depth']} x {selected['n_estimators']} trees: "
+              f"{cost['nodes']} nodes, {metrics['model_bytes'] / 1024:.1f} KB, "
+              f"{cost['inference_us_per_row']:.3f} us/row")
         
         return metrics
     
+    def explain(self, repeats: int = 5, workers: int = None) -> Dict:
+        """
+        Permutation importance and partial dependence on the holdout set
+        
+        Args:
+            repeats: Shuffles per feature
+            workers: Processes (default: the trainer's core budget)
+            
+        Returns:
+            Explanations dictionary (also saved with the model)
+        """
+        if self.model is None or self.holdout is None:
+            raise ValueError("Train a model before explaining it")
+        
+        X_test, y_test = self.holdout
+        workers = workers or plan_budget(self.cores)['cores']
+        print(f"\n[INFO] Explaining model on {len(X_test)} holdout rows ({workers} workers)...")
+        
+        self.explanations = explain(
+            self.model, self.scaler, X_test.to_numpy(), y_test, self.feature_names,
+            repeats=repeats, workers=workers, seed=self.random_state
+        )
+        print_importance(self.explanations, top=5)
+        print(f"[INFO] Explanations computed in {self.explanations['seconds']:.2f}s")
+        
+        return self.explanations
+    
+    def _fit(self, X: np.ndarray, y: np.ndarray, **fit_kwargs):
+        """Fit self.model with the whole core budget as threads"""
+        self.model = fit_final(self.model.get_params(), X, y, plan_budget(self.cores), **fit_kwargs)
+    
+    def _constrained_classifier(
+        self,
+        max_depth: int,
+        n_estimators: int,
+        constraints: Tuple[int, ...],
+        model_params: Dict = None
+    ):
+        """XGBoost classifier for constrained training"""
+        return xgb.XGBClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            learning_rate=0.1,
+            tree_method='hist',
+            monotone_constraints=constraints,
+            objective='binary:logistic',
+            eval_metric='auc',
+            random_state=self.random_state,
+            **(model_params or {})
+        )
+    
+    def _split(
+        self,
+        X: pd.DataFrame,
+        y: np.ndarray,
+        sample_weight: np.ndarray,
+        test_size: float
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+        """Stratified split that carries row weights along with the training rows"""
+        if sample_weight is None:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=self.random_state, stratify=y
+            )
+            return X_train, X_test, y_train, y_test, None
+        
+        X_train, X_test, y_train, y_test, w_train, _ = train_test_split(
+            X, y, sample_weight, test_size=test_size, random_state=self.random_state, stratify=y
+        )
+        return X_train, X_test, y_train, y_test, w_train
+    
+    def _sample_training(
+        self,
+        X_train: pd.DataFrame,
+        y_train: np.ndarray,
+        sample_weight: np.ndarray = None
+    ) -> Tuple[pd.DataFrame, np.ndarray, Dict, Dict]:
+        """
+        Downsample non-defaults in a training split (see sampling.sample_training)
+        
+        Returns:
+            Tuple of (X_train, y_train, fit kwargs, model params)
+        """
+        rows, fit_kwargs, model_params, self.sampling = sample_training(
+            y_train, self.negative_rate, self.sampling_mode, sample_weight, seed=self.random_state
+        )
+        
+        if len(rows) < len(y_train):
+            print(f"[INFO] Negative sampling at {self.negative_rate:.0%} ({self.sampling_mode}): "
+                  f"{len(rows)} of {len(y_train)} training rows")
+        
+        return X_train.iloc[rows], np.asarray(y_train)[rows], fit_kwargs, model_params
+    
+    def predict_proba(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Default probabilities, corrected for prior-mode negative sampling"""
+        probs = self.model.predict_proba(X_scaled)[:, 1]
+        if self.sampling and self.sampling['prior_correction']:
+            probs = correct_probabilities(probs, self.sampling['prior_correction'])
+        return probs
+    
     def save_model(self, output_path: str):
         """
         Save trained model to disk
@@ -331,6 +773,9 @@ class RiskModelTrainer:
             'scaler': self.scaler,
             'feature_names': self.feature_names,
             'training_metrics': self.training_metrics,
+            'drift_reference': self.drift_reference,
+            'explanations': self.explanations,
+            'sampling': self.sampling,
             'trained_at': datetime.now().isoformat(),
             'version': '1.0.0'
         }
@@ -359,22 +804,80 @@ class RiskModelTrainer:
             print("[WARNING] No trained model available")
             return
         
-        feature_importance = pd.DataFrame({
-            'feature': self.feature_names,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=True)
-        
-        plt.figure(figsize=(10, 6))
-        plt.barh(feature_importance['feature'], feature_importance['importance'])
-        plt.xlabel('Importance')
-        plt.title('Feature Importance - Risk Assessment Model')
-        plt.tight_layout()
+        # Permutation importance when explanations were computed, gain otherwise
+        if self.explanations is not None:
+            entries = self.explanations['permutation_importance']
+            plot_feature_importance(
+                {name: entry['mean'] for name, entry in entries.items()},
+                'Permutation Importance (holdout AUC drop)',
+                output_path,
+                {name: entry['std'] for name, entry in entries.items()}
+            )
+        else:
+            plot_feature_importance(
+                dict(zip(self.feature_names, self.model.feature_importances_)),
+                'Importance (gain)',
+                output_path
+            )
         
         if output_path:
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
             print(f"[INFO] Feature importance plot saved to {output_path}")
-        else:
-            plt.show()
+
+
+def run_scaling_benchmark(trainer: RiskModelTrainer, X: pd.DataFrame, y: np.ndarray, args):
+    """Print the scaling table for the default model on the training split"""
+    X_train, _, y_train, _ = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.random_state, stratify=y
+    )
+    X_train_scaled = StandardScaler().fit_transform(X_train)
+    params = xgb.XGBClassifier(
+        n_estimators=100,
+        max_depth=6,
+        learning_rate=0.1,
+        objective='binary:logistic',
+        eval_metric='auc',
+        random_state=args.random_state
+    ).get_params()
+    
+    max_cores = min(args.cores or available_cores(), available_cores())
+    print(f"\n[INFO] Scaling benchmark: {args.cv_folds}-fold CV + final fit, 1 to {max_cores} cores")
+    rows = scaling_benchmark(params, X_train_scaled, y_train, args.cv_folds, max_cores)
+    
+    print(f"  {'cores':>5s} {'procs':>5s} {'threads':>7s} {'seconds':>8s} {'speedup':>7s} {'identical':>9s}")
+    for row in rows:
+        print(f"  {row['cores']:5d} {row['processes']:5d} {row['threads']:7d} {row['seconds']:8.3f} "
+              f"{row['speedup']:7.2f} {str(row['identical']):>9s}")
+    
+    if all(row['identical'] for row in rows):
+        print("[SUCCESS] Models are bit-identical across every core split")
+    else:
+        print("[ERROR] Models differ between core splits")
+
+
+def run_sampling_report(trainer: RiskModelTrainer, X: pd.DataFrame, y: np.ndarray, args):
+    """Print training time and holdout quality per negative sampling rate"""
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.random_state, stratify=y
+    )
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    params = xgb.XGBClassifier(
+        n_estimators=100,
+        max_depth=6,
+        learning_rate=0.1,
+        objective='binary:logistic',
+        eval_metric='auc',
+        random_state=args.random_state
+    ).get_params()
+    
+    rates = [float(r) for r in args.sampling_report.split(',')]
+    print(f"\n[INFO] Sampling report: negative rates {rates} on {len(X_train)} training rows")
+    rows = sampling_report(
+        params, X_train_scaled, np.asarray(y_train), X_test_scaled, np.asarray(y_test),
+        rates, mode=args.sampling_mode, cores=args.cores, seed=args.random_state
+    )
+    print_sampling_report(rows, args.sampling_mode)
 
 
 def main():
@@ -413,36 +916,182 @@ def main():
         help='Random seed for reproducibility (default: 42)'
     )
     parser.add_argument(
+        '--cores',
+        type=int,
+        default=None,
+        help=f'Core budget for training (default: all available, {available_cores()} here)'
+    )
+    parser.add_argument(
+        '--fold-processes',
+        type=int,
+        default=None,
+        help='Processes for cross-validation folds, rest of the budget as threads (default: one per fold)'
+    )
+    parser.add_argument(
+        '--benchmark-scaling',
+        action='store_true',
+        help='Time training from 1 to --cores cores, check models are identical, and exit'
+    )
+    parser.add_argument(
+        '--negative-rate',
+        type=float,
+        default=1.0,
+        help='Fraction of non-defaults kept in the training split (default: 1.0, no sampling)'
+    )
+    parser.add_argument(
+        '--sampling-mode',
+        type=str,
+        choices=SAMPLING_MODES,
+        default='weights',
+        help='Compensation for --negative-rate: sample weights, scale_pos_weight, '
+             'or prior correction of scores (default: weights)'
+    )
+    parser.add_argument(
+        '--reservoir-size',
+        type=int,
+        default=None,
+        help='Stream the data file and keep this many rows per stratum (label x --strata)'
+    )
+    parser.add_argument(
+        '--strata',
+        type=str,
+        default=None,
+        help='Comma-separated stratum columns for --reservoir-size besides the label (optional)'
+    )
+    parser.add_argument(
+        '--sampling-report',
+        type=str,
+        default=None,
+        help='Comma-separated negative rates; report fit time and holdout AUC for each and exit'
+    )
+    parser.add_argument(
+        '--feature-store',
+        type=str,
+        default=None,
+        help='Feature store directory to read/update derived metrics (optional)'
+    )
+    parser.add_argument(
+        '--constrained',
+        action='store_true',
+        help='Monotone-constrained training with model size chosen by validation'
+    )
+    parser.add_argument(
+        '--max-depths',
+        type=str,
+        default=','.join(map(str, CONSTRAINED_DEPTHS)),
+        help=f'Comma-separated depths for --constrained (default: {",".join(map(str, CONSTRAINED_DEPTHS))})'
+    )
+    parser.add_argument(
+        '--n-estimators',
+        type=str,
+        default=','.join(map(str, CONSTRAINED_N_ESTIMATORS)),
+        help=f'Comma-separated tree counts for --constrained (default: {",".join(map(str, CONSTRAINED_N_ESTIMATORS))})'
+    )
+    parser.add_argument(
+        '--auc-tolerance',
+        type=float,
+        default=AUC_TOLERANCE,
+        help=f'Validation AUC a smaller constrained model may give up (default: {AUC_TOLERANCE})'
+    )
+    parser.add_argument(
+        '--quarantine',
+        type=str,
+        default=None,
+        help='CSV for rows that fail validation (default: <output>_quarantine.csv)'
+    )
+    parser.add_argument(
+        '--skip-validation',
+        action='store_true',
+        help='Train on every row without validation'
+    )
+    parser.add_argument(
+        '--explain',
+        action='store_true',
+        help='Compute permutation importance and partial dependence on the holdout set and save them with the model'
+    )
+    parser.add_argument(
+        '--explain-repeats',
+        type=int,
+        default=5,
+        help='Shuffles per feature for --explain (default: 5)'
+    )
+    parser.add_argument(
+        '--report',
         '--plot',
         action='store_true',
-        help='Generate feature importance plot'
+        help='Render plots and an HTML report in a background process after saving (see training_report.py)'
     )
     
     args = parser.parse_args()
     
     # Initialize trainer
-    trainer = RiskModelTrainer(random_state=args.random_state)
+    trainer = RiskModelTrainer(
+        random_state=args.random_state,
+        cores=args.cores,
+        fold_processes=args.fold_processes,
+        negative_rate=args.negative_rate,
+        sampling_mode=args.sampling_mode
+    )
     
     # Load data
-    df = trainer.load_data(args.data)
+    if args.reservoir_size:
+        strata = args.strata.split(',') if args.strata else []
+        df = trainer.sample_data(args.data, args.reservoir_size, strata)
+    else:
+        df = trainer.load_data(args.data)
+    
+    # Validate data
+    if not args.skip_validation:
+        df = trainer.validate_data(df, args.quarantine or args.output.replace('.pkl', '_quarantine.csv'))
     
     # Prepare features
-    X, y = trainer.prepare_features(df)
+    feature_store = FeatureStore(args.feature_store) if args.feature_store else None
+    X, y = trainer.prepare_features(df, feature_store=feature_store)
+    
+    weights = df[WEIGHT_COLUMN].to_numpy() if WEIGHT_COLUMN in df.columns else None
+    
+    if args.benchmark_scaling:
+        run_scaling_benchmark(trainer, X, y, args)
+        return
+    
+    if args.sampling_report:
+        run_sampling_report(trainer, X, y, args)
+        return
     
     # Train model
-    metrics = trainer.train(X, y, test_size=args.test_size, cv_folds=args.cv_folds)
+    if args.constrained:
+        metrics = trainer.train_constrained(
+            X,
+            y,
+            test_size=args.test_size,
+            cv_folds=args.cv_folds,
+            depths=[int(d) for d in args.max_depths.split(',')],
+            n_estimators_grid=[int(n) for n in args.n_estimators.split(',')],
+            tolerance=args.auc_tolerance,
+            sample_weight=weights
+        )
+    else:
+        metrics = trainer.train(X, y, test_size=args.test_size, cv_folds=args.cv_folds, sample_weight=weights)
+    
+    if trainer.validation_summary is not None:
+        metrics['data_validation'] = trainer.validation_summary
+    
+    # Explain model
+    if args.explain:
+        trainer.explain(repeats=args.explain_repeats)
     
     # Save model
     trainer.save_model(args.output)
     
-    # Plot feature importance
-    if args.plot:
-        plot_path = args.output.replace('.pkl', '_feature_importance.png')
-        trainer.plot_feature_importance(plot_path)
-    
     print("\n[SUCCESS] Training complete!")
     print(f"[INFO] Model saved to: {args.output}")
     print(f"[INFO] ROC AUC Score: {metrics['roc_auc']:.4f}")
+    
+    # Render report off the critical path, from the saved artifact
+    if args.report:
+        process = launch_report(args.output)
+        print(f"[INFO] Rendering training report in the background (pid {process.pid}), "
+              f"log: {args.output.replace('.pkl', '_report.log')}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Training Report
+===============
+Renders the evaluation of a trained model as PNG plots and one HTML page,
+after the artifact is written and off the training critical path.
+
+train_model.py stores the evaluation (confusion matrix, classification
+report, ROC and calibration curves, gain importance) under 'evaluation'
+in <model>_metrics.json. This stage reads that file, plus explanations
+from the artifact when present, and writes next to the model:
+
+    <model>_report.html               metrics, tables and plots
+    <model>_feature_importance.png    permutation importance, or gain
+    <model>_roc.png, <model>_calibration.png, <model>_confusion.png
+    <model>_partial_dependence.png    with train_model.py --explain
+
+matplotlib is imported only while rendering (Agg backend), so importing
+this module or the trainer never loads it.
+
+Usage:
+    python train_model.py --data sample_data.csv --report     # renders in the background
+    python training_report.py --model models/risk_model.pkl
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import html
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# Points kept on the stored ROC curve
+ROC_POINTS = 100
+
+# Equal-count bins for the stored calibration curve
+CALIBRATION_BINS = 10
+
+CLASS_NAMES = ['No Default', 'Default']
+
+
+def evaluation_results(
+    y_true: np.ndarray,
+    y_proba: np.ndarray,
+    feature_names: List[str],
+    gain_importance: np.ndarray,
+    threshold: float = 0.5
+) -> Dict:
+    """
+    Evaluation data the report renders (JSON-serializable)
+
+    Args:
+        y_true: Holdout labels
+        y_proba: Holdout default probabilities
+        feature_names: Model feature names
+        gain_importance: model.feature_importances_
+        threshold: Probability above which a deal is predicted to default
+
+    Returns:
+        Dictionary stored in training metrics under 'evaluation'
+    """
+    from sklearn.metrics import classification_report, confusion_matrix, roc_curve
+
+    y_true = np.asarray(y_true).astype(int)
+    y_proba = np.asarray(y_proba, dtype=float)
+    y_pred = (y_proba > threshold).astype(int)
+
+    fpr, tpr, _ = roc_curve(y_true, y_proba)
+    keep = np.unique(np.linspace(0, len(fpr) - 1, min(ROC_POINTS, len(fpr))).round().astype(int))
+
+    order = np.argsort(y_proba)
+    bins = [b for b in np.array_split(order, CALIBRATION_BINS) if len(b)]
+
+    return {
+        'threshold': threshold,
+        'confusion_matrix': confusion_matrix(y_true, y_pred, labels=[0, 1]).tolist(),
+        'classification_report': classification_report(
+            y_true, y_pred, labels=[0, 1], target_names=CLASS_NAMES, output_dict=True, zero_division=0
+        ),
+        'roc_curve': {'fpr': fpr[keep].round(4).tolist(), 'tpr': tpr[keep].round(4).tolist()},
+        'calibration': {
+            'predicted': [round(float(y_proba[b].mean()), 4) for b in bins],
+            'observed': [round(float(y_true[b].mean()), 4) for b in bins],
+            'count': [int(len(b)) for b in bins]
+        },
+        'gain_importance': dict(sorted(
+            ((name, round(float(value), 6)) for name, value in zip(feature_names, gain_importance)),
+            key=lambda item: -item[1]
+        ))
+    }
+
+
+def report_paths(model_path: str) -> Dict[str, str]:
+    """Output files of the report for a model artifact"""
+    base = os.path.splitext(model_path)[0]
+    return {
+        'html': base + '_report.html',
+        'feature_importance': base + '_feature_importance.png',
+        'roc': base + '_roc.png',
+        'calibration': base + '_calibration.png',
+        'confusion': base + '_confusion.png',
+        'partial_dependence': base + '_partial_dependence.png',
+        'log': base + '_report.log'
+    }
+
+
+def load_results(model_path: str) -> Dict:
+    """Training metrics and (if stored) explanations for a model artifact"""
+    metrics_path = os.path.splitext(model_path)[0] + '_metrics.json'
+    with open(metrics_path) as f:
+        metrics = json.load(f)
+
+    explanations = None
+    if os.path.exists(model_path):
+        with open(model_path, 'rb') as f:
+            explanations = pickle.load(f).get('explanations')
+
+    return {'metrics': metrics, 'explanations': explanations}
+
+
+# ============================================================
+# Plots
+# ============================================================
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _save(plt, path: str):
+    plt.tight_layout()
+    plt.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close()
+
+
+def plot_feature_importance(importance: Dict[str, float], xlabel: str, output_path: str = None, errors: Dict = None):
+    """
+    Horizontal bar chart of feature importance
+
+    Args:
+        importance: Feature -> importance
+        xlabel: Axis label naming the importance measure
+        output_path: PNG to write (default: show interactively)
+        errors: Feature -> error bar half-width (optional)
+    """
+    if output_path:
+        plt = _pyplot()
+    else:
+        import matplotlib.pyplot as plt
+
+    names = sorted(importance, key=importance.get)
+    plt.figure(figsize=(10, 6))
+    plt.barh(names, [importance[n] for n in names], xerr=[(errors or {}).get(n, 0.0) for n in names])
+    plt.xlabel(xlabel)
+    plt.title('Feature Importance - Risk Assessment Model')
+
+    if output_path:
+        _save(plt, output_path)
+    else:
+        plt.tight_layout()
+        plt.show()
+
+
+def _importance(results: Dict):
+    explanations = results['explanations']
+    if explanations:
+        entries = explanations['permutation_importance']
+        return (
+            {name: entry['mean'] for name, entry in entries.items()},
+            'Permutation Importance (holdout AUC drop)',
+            {name: entry['std'] for name, entry in entries.items()}
+        )
+    return results['metrics']['evaluation']['gain_importance'], 'Importance (gain)', None
+
+
+def _plot_roc(evaluation: Dict, auc: float, path: str):
+    plt = _pyplot()
+    plt.figure(figsize=(6, 6))
+    plt.plot(evaluation['roc_curve']['fpr'], evaluation['roc_curve']['tpr'], label=f'AUC {auc:.4f}')
+    plt.plot([0, 1], [0, 1], linestyle='--', color='grey')
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('ROC Curve (holdout)')
+    plt.legend(loc='lower right')
+    _save(plt, path)
+
+
+def _plot_calibration(evaluation: Dict, path: str):
+    plt = _pyplot()
+    calibration = evaluation['calibration']
+    top = max(calibration['predicted'] + calibration['observed'] + [0.01])
+    plt.figure(figsize=(6, 6))
+    plt.plot(calibration['predicted'], calibration['observed'], marker='o')
+    plt.plot([0, top], [0, top], linestyle='--', color='grey')
+    plt.xlabel('Mean Predicted PD')
+    plt.ylabel('Observed Default Rate')
+    plt.title('Calibration (holdout deciles)')
+    _save(plt, path)
+
+
+def _plot_confusion(evaluation: Dict, path: str):
+    plt = _pyplot()
+    matrix = np.array(evaluation['confusion_matrix'])
+    plt.figure(figsize=(5, 4))
+    plt.imshow(matrix, cmap='Blues')
+    for (i, j), count in np.ndenumerate(matrix):
+        plt.text(j, i, str(count), ha='center', va='center')
+    plt.xticks([0, 1], CLASS_NAMES)
+    plt.yticks([0, 1], CLASS_NAMES)
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+    plt.title(f"Confusion Matrix (threshold {evaluation['threshold']})")
+    _save(plt, path)
+
+
+def _plot_partial_dependence(explanations: Dict, path: str):
+    plt = _pyplot()
+    curves = explanations['partial_dependence']
+    cols = 3
+    rows = (len(curves) + cols - 1) // cols
+    fig, axes = plt.subplots(rows, cols, figsize=(4 * cols, 3 * rows), squeeze=False)
+    for ax, (name, curve) in zip(axes.flat, curves.items()):
+        for ice in curve['ice']:
+            ax.plot(curve['grid'], ice, color='grey', alpha=0.15, linewidth=0.8)
+        ax.plot(curve['grid'], curve['average'], color='C0', linewidth=2)
+        ax.set_title(name)
+        ax.set_ylabel('PD')
+    for ax in list(axes.flat)[len(curves):]:
+        ax.axis('off')
+    _save(plt, path)
+
+
+# ============================================================
+# HTML
+# ============================================================
+
+def _table(rows: List[List], header: List[str] = None) -> str:
+    cells = ''
+    if header:
+        cells += '<tr>' + ''.join(f'<th>{html.escape(str(h))}</th>' for h in header) + '</tr>'
+    for row in rows:
+        cells += '<tr>' + ''.join(f'<td>{html.escape(str(c))}</td>' for c in row) + '</tr>'
+    return f'<table>{cells}</table>'
+
+
+def _html(results: Dict, paths: Dict[str, str], model_path: str) -> str:
+    metrics = results['metrics']
+    evaluation = metrics['evaluation']
+    summary = [
+        [name, f"{metrics[key]:.4f}"]
+        for name, key in [
+            ('Accuracy', 'accuracy'), ('Precision', 'precision'), ('Recall', 'recall'),
+            ('F1 Score', 'f1_score'), ('ROC AUC', 'roc_auc'), ('CV Mean AUC', 'cv_mean'), ('CV Std', 'cv_std')
+        ]
+        if key in metrics
+    ]
+    summary += [
+        ['Train / Test Samples', f"{metrics.get('train_samples')} / {metrics.get('test_samples')}"],
+        ['Default Rate', f"{metrics.get('default_rate', 0):.2%}"],
+        ['Fingerprint', str(metrics.get('model_fingerprint', ''))[:16]]
+    ]
+
+    (tn, fp), (fn, tp) = evaluation['confusion_matrix']
+    report = evaluation['classification_report']
+    classes = [
+        [name, f"{r['precision']:.4f}", f"{r['recall']:.4f}", f"{r['f1-score']:.4f}", int(r['support'])]
+        for name, r in report.items() if isinstance(r, dict)
+    ]
+
+    images = [
+        paths[key] for key in ['feature_importance', 'roc', 'calibration', 'confusion', 'partial_dependence']
+        if os.path.exists(paths[key])
+    ]
+    sections = [
+        f"<h1>Training Report - {html.escape(os.path.basename(model_path))}</h1>",
+        f"<p>Generated {time.strftime('%Y-%m-%d %H:%M:%S')}</p>",
+        '<h2>Holdout Metrics</h2>', _table(summary),
+        '<h2>Confusion Matrix</h2>', _table([['Actual No Default', tn, fp], ['Actual Default', fn, tp]],
+                                            ['', 'Predicted No Default', 'Predicted Default']),
+        '<h2>Classification Report</h2>', _table(classes, ['', 'Precision', 'Recall', 'F1', 'Support']),
+        '<h2>Plots</h2>',
+        *[f'<img src="{html.escape(os.path.basename(image))}" style="max-width: 48%">' for image in images]
+    ]
+    for key, title in [('sampling', 'Sampling'), ('data_validation', 'Data Validation')]:
+        if metrics.get(key):
+            sections += [f'<h2>{title}</h2>', f'<pre>{html.escape(json.dumps(metrics[key], indent=2))}</pre>']
+
+    style = ('body { font-family: sans-serif; margin: 2em; } '
+             'table { border-collapse: collapse; margin-bottom: 1em; } '
+             'td, th { border: 1px solid #ccc; padding: 4px 10px; text-align: right; }')
+    return f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><style>{style}</style></head>" \
+           f"<body>\n{chr(10).join(sections)}\n</body></html>\n"
+
+
+def render_report(model_path: str) -> Dict[str, str]:
+    """
+    Render every plot and the HTML page for a trained model
+
+    Args:
+        model_path: Model artifact written by train_model.py
+
+    Returns:
+        Paths of the files written
+    """
+    results = load_results(model_path)
+    if 'evaluation' not in results['metrics']:
+        raise ValueError(f"No stored evaluation for {model_path}; retrain with the current train_model.py")
+
+    paths = report_paths(model_path)
+    evaluation = results['metrics']['evaluation']
+
+    importance, xlabel, errors = _importance(results)
+    plot_feature_importance(importance, xlabel, paths['feature_importance'], errors)
+    _plot_roc(evaluation, results['metrics']['roc_auc'], paths['roc'])
+    _plot_calibration(evaluation, paths['calibration'])
+    _plot_confusion(evaluation, paths['confusion'])
+    if results['explanations']:
+        _plot_partial_dependence(results['explanations'], paths['partial_dependence'])
+
+    with open(paths['html'], 'w') as f:
+        f.write(_html(results, paths, model_path))
+
+    return {key: path for key, path in paths.items() if key != 'log' and os.path.exists(path)}
+
+
+def launch_report(model_path: str) -> subprocess.Popen:
+    """
+    Render the report in a detached background process
+
+    The process outlives the caller; its output goes to <model>_report.log.
+
+    Returns:
+        The started process
+    """
+    log_path = report_paths(model_path)['log']
+    with open(log_path, 'w') as log:
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--model', os.path.abspath(model_path)],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            start_new_session=True
+        )
+
+
+def main():
+    """Render the training report for a model artifact"""
+    parser = argparse.ArgumentParser(description='Render plots and an HTML report for a trained risk model')
+    parser.add_argument('--model', type=str, required=True, help='Model artifact written by train_model.py')
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = render_report(os.path.abspath(args.model))
+    for key, path in written.items():
+        print(f"[INFO] {key}: {path}")
+    print(f"[SUCCESS] Training report rendered in {time.perf_counter() - started:.2f}s: {written['html']}")
+
+
+if __name__ == '__main__':
+    main()
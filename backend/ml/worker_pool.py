@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Pre-forked Risk Model Worker Pool
+=================================
+Loads the risk model once in a parent process and forks N scoring workers
+that share the loaded model copy-on-write, instead of starting a fresh
+interpreter (and reloading the model) for every request.
+
+- Requests are dispatched to idle workers (one in flight per worker)
+- Crashed workers are restarted and their in-flight request retried once
+- Workers are recycled after a configurable number of requests
+- Requests with a deadline are admitted against measured service time
+  and degraded (cached result, rule table, rejection) when it cannot be
+  met (see admission.py)
+- Bulk requests are split into chunks, and interactive requests are
+  scheduled ahead of them by weighted fair queuing (see scheduler.py)
+
+Usage:
+    python worker_pool.py --workers 4 --max-requests 1000 < deals.jsonl
+    python worker_pool.py --workers 4 --deadline-ms 250 < deals.jsonl
+    python worker_pool.py --workers 4 --chunk-size 500 --batch-workers 3 < requests.jsonl
+
+Each input line is a JSON deal, or {"id": ..., "deal": {...}} to tag the
+request, optionally with "deadline_ms" and "priority". Each output line is
+{"id": ..., "result": {...}} in completion order. A bulk request
+{"id": ..., "deals": [...]} is answered with one {"id": ..., "results": [...]}
+line, in input order, once all its chunks are scored.
+
+Author: Underwrite Pro ML Team
+"""
+
+import argparse
+import gc
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import redirect_stdout
+from typing import Callable, Dict, Iterable, List, Optional
+
+from admission import DEFAULT_CACHE_SIZE, AdmissionController
+from model_registry import DEFAULT_MEMORY_BUDGET_MB, ModelRegistry
+from risk_model import RiskAssessmentModel, get_model
+from scheduler import DEFAULT_CHUNK_SIZE, ChunkAssembler, WeightedFairQueue, default_classes, split_chunks
+
+# Attempts per request before a worker crash is reported back as an error
+MAX_ATTEMPTS = 2
+
+
+class _Worker:
+    """Parent-side handle for one forked scoring worker"""
+
+    def __init__(self, pid: int, sock: socket.socket):
+        self.pid = pid
+        self.sock = sock
+        self.rfile = sock.makefile('rb')
+        self.served = 0
+        self.in_flight = None  # (request_id, deal or chunk, attempts, deadline) or None
+        self.sent_at = None
+
+    def send(self, request_id, deal):
+        key = 'deals' if isinstance(deal, list) else 'deal'
+        payload = json.dumps({'id': request_id, key: deal}).encode('utf-8')
+        self.sock.sendall(payload + b'\n')
+
+    def close(self):
+        try:
+            self.rfile.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _worker_main(sock: socket.socket, model: RiskAssessmentModel, max_requests: int):
+    """
+    Scoring loop run inside a forked worker
+
+    Reads one JSON request per line (a deal, or a chunk of deals scored in
+    one batch call), scores it with the inherited model and writes the
+    result back. Exits after max_requests so the parent can
+    replace it with a fresh fork.
+    """
+    # stdout belongs to the parent's output stream
+    sys.stdout = sys.stderr
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    rfile = sock.makefile('rb')
+    served = 0
+
+    for line in rfile:
+        request = json.loads(line)
+        try:
+            if 'deals' in request:
+                result = model.predict_batch(request['deals'])
+            else:
+                result = model.predict_risk_score(request['deal'])
+        except Exception as e:
+            result = {'error': 'Risk assessment failed', 'message': str(e)}
+
+        sock.sendall(json.dumps({'id': request['id'], 'result': result}).encode('utf-8') + b'\n')
+
+        served += 1
+        if max_requests and served >= max_requests:
+            break
+
+
+class PreforkPool:
+    """
+    Pool of forked scoring workers sharing one copy of the risk model
+    """
+
+    def __init__(
+        self,
+        num_workers: int = None,
+        max_requests: int = 1000,
+        model_factory: Callable[[], RiskAssessmentModel] = get_model,
+        admission: AdmissionController = None,
+        scheduler: WeightedFairQueue = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        """
+        Initialize worker pool
+
+        Args:
+            num_workers: Number of worker processes (default: CPU count)
+            max_requests: Requests served before a worker is recycled (0 = never)
+            model_factory: Callable returning the model to share with workers
+            admission: Deadline admission control for served requests (optional)
+            scheduler: Priority queue for served requests (default: FIFO)
+            chunk_size: Deals per chunk of a served bulk request
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.max_requests = max_requests
+        self.model_factory = model_factory
+        self.admission = admission
+        self.scheduler = scheduler
+        self.chunk_size = chunk_size
+        self.model = None
+        self.workers: Dict[int, _Worker] = {}
+        self.selector = None
+        self.stats = {'served': 0, 'restarts': 0, 'recycled': 0, 'errors': 0}
+        # Guards the queue, the worker table and in-flight slots against serve()'s reader thread
+        self.lock = threading.Lock()
+        self._stopping = False
+
+    def start(self):
+        """Load the model in the parent and fork the workers"""
+        self.model = self.model_factory()
+
+        # Move everything allocated so far (model included) out of the GC's
+        # reach so collections in the workers don't dirty the shared pages
+        gc.collect()
+        gc.freeze()
+
+        self.selector = selectors.DefaultSelector()
+        for _ in range(self.num_workers):
+            self._spawn()
+
+        print(f"[INFO] Worker pool started with {self.num_workers} workers", file=sys.stderr)
+
+    def stop(self):
+        """Shut down all workers"""
+        self._stopping = True
+        for worker in list(self.workers.values()):
+            self._remove(worker)
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            self._reap(worker)
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _spawn(self):
+        """Fork a new worker sharing the parent's model"""
+        parent_sock, child_sock = socket.socketpair()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+
+        if pid == 0:
+            parent_sock.close()
+            for worker in self.workers.values():
+                worker.sock.close()
+            code = 0
+            try:
+                _worker_main(child_sock, self.model, self.max_requests)
+            except Exception as e:
+                print(f"[ERROR] Worker {os.getpid()} failed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+
+        child_sock.close()
+        worker = _Worker(pid, parent_sock)
+        with self.lock:
+            self.workers[pid] = worker
+        self.selector.register(worker.sock, selectors.EVENT_READ, worker)
+
+    def _remove(self, worker: _Worker):
+        with self.lock:
+            removed = self.workers.pop(worker.pid, None) is not None
+        if removed:
+            self.selector.unregister(worker.sock)
+            worker.close()
+
+    def _in_flight(self) -> int:
+        """Requests currently held by workers (call with self.lock held)"""
+        return sum(w.in_flight is not None for w in self.workers.values())
+
+    def _reap(self, worker: _Worker) -> int:
+        try:
+            _, status = os.waitpid(worker.pid, 0)
+        except ChildProcessError:
+            return 0
+        return status
+
+    def _handle_exit(self, worker: _Worker, pending: deque, on_result: Callable):
+        """Replace a worker that exited, retrying its in-flight request"""
+        self._remove(worker)
+        status = self._reap(worker)
+
+        if worker.in_flight is None and status == 0:
+            self.stats['recycled'] += 1
+        else:
+            self.stats['restarts'] += 1
+            print(f"[WARNING] Worker {worker.pid} exited unexpectedly (status {status})", file=sys.stderr)
+
+        if worker.in_flight is not None:
+            request_id, deal, attempts, deadline = worker.in_flight
+            if attempts < MAX_ATTEMPTS:
+                with self.lock:
+                    pending.appendleft((request_id, deal, attempts, deadline))
+            else:
+                self.stats['errors'] += 1
+                on_result(request_id, {
+                    'error': 'Risk assessment failed',
+                    'message': 'Scoring worker exited while handling request'
+                })
+
+        if not self._stopping:
+            self._spawn()
+
+    def _dispatch(self, pending: deque, on_result: Callable, more_input: Callable[[], bool], wakeup=None,
+                  completed: deque = None):
+        """
+        Main dispatch loop
+
+        Args:
+            pending: Queue of (request_id, deal, attempts, deadline) waiting for a
+                worker; a deque, or a WeightedFairQueue for priority scheduling
+            on_result: Called with (request_id, result) for each finished request,
+                always on this thread
+            more_input: Returns True while new requests may still arrive
+            wakeup: Optional socket signalled when new requests are queued
+            completed: Optional (request_id, result) answers produced on other
+                threads, reported through on_result here; signal wakeup after
+                appending
+        """
+        while True:
+            while completed:
+                on_result(*completed.popleft())
+
+            # Hand queued requests to idle workers that still have budget left
+            for worker in list(self.workers.values()):
+                if not pending:
+                    break
+                if worker.in_flight is not None:
+                    continue
+                if self.max_requests and worker.served >= self.max_requests:
+                    continue
+                while True:
+                    # Popping and taking the slot together keeps queued + in flight consistent for the reader
+                    with self.lock:
+                        if not pending:
+                            break
+                        request_id, deal, attempts, deadline = pending.popleft()
+                        meets = self.admission is None or self.admission.can_meet(deadline)
+                        if meets:
+                            worker.in_flight = (request_id, deal, attempts + 1, deadline)
+                    # Requests that waited past the point of making their deadline degrade here
+                    if not meets:
+                        on_result(request_id, self.admission.degrade(deal, deadline))
+                        continue
+                    worker.sent_at = time.monotonic()
+                    if self.admission is not None and attempts == 0 and isinstance(deal, dict):
+                        self.admission.admit()
+                    try:
+                        worker.send(request_id, deal)
+                    except OSError:
+                        # Worker died between requests; EOF handling retries it
+                        pass
+                    break
+
+            busy = any(w.in_flight is not None for w in self.workers.values())
+            if not pending and not busy and not completed and not more_input():
+                return
+
+            for key, _ in self.selector.select():
+                if key.fileobj is wakeup:
+                    wakeup.recv(4096)
+                    continue
+
+                worker = key.data
+                line = worker.rfile.readline()
+                if not line:
+                    self._handle_exit(worker, pending, on_result)
+                    continue
+
+                response = json.loads(line)
+                # Service time estimates are per deal; chunks would skew them
+                if self.admission is not None and isinstance(worker.in_flight[1], dict):
+                    self.admission.record(worker.in_flight[1], response['result'], time.monotonic() - worker.sent_at)
+                worker.in_flight = None
+                worker.served += 1
+                self.stats['served'] += 1
+                on_result(response['id'], response['result'])
+
+    def map(self, deals: Iterable[Dict]) -> List[Dict]:
+        """
+        Score a batch of deals across the pool
+
+        Args:
+            deals: Iterable of deal dictionaries
+
+        Returns:
+            List of risk results in input order
+        """
+        pending = deque((i, deal, 0, None) for i, deal in enumerate(deals))
+        results: List[Optional[Dict]] = [None] * len(pending)
+
+        def on_result(request_id, result):
+            results[request_id] = result
+
+        self._dispatch(pending, on_result, lambda: False)
+        return results
+
+    def serve(self, infile, outfile):
+        """
+        Serve newline-delimited JSON requests until infile is exhausted
+
+        Args:
+            infile: Text stream of requests, one JSON object per line
+            outfile: Text stream receiving one JSON response per line
+        """
+        pending = self.scheduler if self.scheduler is not None else deque()
+        # Answers decided on the reader thread, handed to the dispatch thread
+        completed = deque()
+        lock = threading.Lock()
+        wake_recv, wake_send = socket.socketpair()
+        self.selector.register(wake_recv, selectors.EVENT_READ, None)
+        reader_done = threading.Event()
+
+        # Queue items get their own ids; client ids need not be unique
+        routes = {}  # item id -> (client id, bulk job or None, chunk index, chunk size)
+        assembler = ChunkAssembler()
+        next_id = iter(range(sys.maxsize))
+
+        def write(response):
+            write_line(json.dumps(response))
+
+        def write_line(line):
+            with lock:
+                outfile.write(line + '\n')
+                outfile.flush()
+
+        def enqueue(item, priority, cost):
+            with self.lock:
+                if self.scheduler is not None:
+                    pending.push(item, priority, cost)
+                else:
+                    pending.append(item)
+            wake_send.send(b'\0')
+
+        def reader():
+            for n, line in enumerate(infile):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    write({'id': None, 'result': {'error': 'Invalid JSON input', 'message': str(e)}})
+                    continue
+                arrived = time.monotonic()
+                if not isinstance(message, dict) or not ('deal' in message or 'deals' in message):
+                    message = {'id': n, 'deal': message}
+                client_id = message.get('id', n)
+                bulk = 'deals' in message
+                priority = message.get('priority', 'batch' if bulk else 'interactive')
+
+                if self.scheduler is not None and priority not in self.scheduler.classes:
+                    error = {
+                        'error': 'Invalid priority',
+                        'message': f"Unknown priority '{priority}'. Expected one of {list(self.scheduler.classes)}"
+                    }
+                    if bulk:
+                        write({'id': client_id, 'results': [error] * len(message['deals'] or [])})
+                    else:
+                        write({'id': client_id, 'result': error})
+                    continue
+
+                if bulk:
+                    chunks = split_chunks(message['deals'] or [], self.chunk_size)
+                    if not chunks:
+                        write({'id': client_id, 'results': []})
+                        continue
+                    job = next(next_id)
+                    assembler.register(job, len(chunks))
+                    for index, chunk in enumerate(chunks):
+                        item_id = next(next_id)
+                        routes[item_id] = (client_id, job, index, len(chunk))
+                        enqueue((item_id, chunk, 0, None), priority, len(chunk))
+                    continue
+
+                item_id = next(next_id)
+                routes[item_id] = (client_id, None, 0, 1)
+                deal = message['deal']
+                deadline = None
+                if self.admission is not None:
+                    deadline = self.admission.deadline(message.get('deadline_ms'), arrived)
+                    with self.lock:
+                        if self.scheduler is not None:
+                            queued = self.scheduler.queued(priority)
+                        else:
+                            queued = len(pending)
+                        ahead = queued + self._in_flight()
+                    # Answer at once rather than queue a request that would miss its deadline;
+                    # the dispatch thread reports it so routing state stays on one thread
+                    if not self.admission.can_meet(deadline, ahead):
+                        completed.append((item_id, self.admission.degrade(deal, deadline)))
+                        wake_send.send(b'\0')
+                        continue
+                enqueue((item_id, deal, 0, deadline), priority, 1)
+            reader_done.set()
+            wake_send.send(b'\0')
+
+        def on_result(item_id, result):
+            if self.scheduler is not None:
+                self.scheduler.done(item_id)
+            client_id, job, index, size = routes.pop(item_id)
+            if job is None:
+                write({'id': client_id, 'result': result})
+                return
+            # A failed chunk answers each of its deals with the error
+            results = result if isinstance(result, list) else [result] * size
+            # Encoded chunk by chunk so no single step stalls dispatch on a huge response
+            parts = assembler.add(job, index, json.dumps(results)[1:-1])
+            if parts is not None:
+                write_line(f'{{"id": {json.dumps(client_id)}, "results": [{", ".join(parts)}]}}')
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        try:
+            self._dispatch(pending, on_result, lambda: not reader_done.is_set(), wakeup=wake_recv, completed=completed)
+        finally:
+            self.selector.unregister(wake_recv)
+            wake_recv.close()
+            wake_send.close()
+
+
+def main():
+    """Run the worker pool as a JSON-lines scoring service"""
+    parser = argparse.ArgumentParser(
+        description='Serve risk scores from a pre-forked pool of model workers'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of worker processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--max-requests',
+        type=int,
+        default=1000,
+        help='Requests served before a worker is recycled, 0 to disable (default: 1000)'
+    )
+    parser.add_argument(
+        '--registry',
+        type=str,
+        default=None,
+        help='Serve per-org models from this artifact store, by each deal\'s org_id (optional)'
+    )
+    parser.add_argument(
+        '--memory-budget-mb',
+        type=float,
+        default=DEFAULT_MEMORY_BUDGET_MB,
+        help=f'Resident org models per worker with --registry (default: {DEFAULT_MEMORY_BUDGET_MB})'
+    )
+    parser.add_argument(
+        '--deadline-ms',
+        type=float,
+        default=None,
+        help='Deadline for requests without a deadline_ms of their own (default: none)'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f'Model results kept for answers under overload (default: {DEFAULT_CACHE_SIZE})'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f'Deals per chunk of a bulk request (default: {DEFAULT_CHUNK_SIZE})'
+    )
+    parser.add_argument(
+        '--batch-workers',
+        type=int,
+        default=None,
+        help='Workers bulk work may use at once (default: all but one; with one worker, that worker)'
+    )
+
+    args = parser.parse_args()
+
+    model_factory = get_model
+    if args.registry:
+        def model_factory():
+            # Global model loaded before forking so workers share it
+            registry = ModelRegistry(root=args.registry, memory_budget_mb=args.memory_budget_mb)
+            registry.fallback
+            return registry
+
+    pool = PreforkPool(
+        num_workers=args.workers,
+        max_requests=args.max_requests,
+        model_factory=model_factory,
+        chunk_size=args.chunk_size
+    )
+    pool.admission = AdmissionController(pool.num_workers, args.deadline_ms, cache_size=args.cache_size)
+    pool.scheduler = WeightedFairQueue(default_classes(pool.num_workers, args.batch_workers))
+    if pool.num_workers == 1:
+        print("[WARNING] One worker: bulk chunks share it with interactive requests, which only "
+              "overtake them at chunk boundaries", file=sys.stderr)
+
+    # Model loading logs must not end up in the response stream
+    with redirect_stdout(sys.stderr):
+        pool.start()
+
+    try:
+        pool.serve(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+        print(f"[INFO] Pool stats: {json.dumps(pool.stats)}", file=sys.stderr)
+        print(f"[INFO] Admission: {json.dumps(pool.admission.report())}", file=sys.stderr)
+        print(f"[INFO] Scheduler: {json.dumps(pool.scheduler.report())}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ Author: Underwrite Pro ML Team
 """
 
 import os
+import sys
 import json
 import pickle
 from datetime import datetime
@@ -19,7 +20,8 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
     accuracy_score,
@@ -31,11 +33,29 @@ from sklearn.metrics import (
     classification_report
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml'))
+from cascade import print_tuning, tune_cascade
+from comps_index import build_for_model
+from drift_monitor import build_reference
+from explainability import explain, print_importance
+from sampling import correct_probabilities, sample_training
+
 # Configuration
 DATA_FILE = '../data/historical_deals.csv'
 MODEL_OUTPUT = '../ml/risk_model_trained.pkl'
 METRICS_OUTPUT = '../ml/risk_model_metrics.json'
 
+# Fraction of non-defaults kept for training (1.0 = all) and how the
+# rate is compensated: 'weights', 'scale_pos_weight' or 'prior'
+NEGATIVE_SAMPLE_RATE = 1.0
+SAMPLING_MODE = 'weights'
+
+# Permutation importance and partial dependence on the holdout set (slow on large data)
+EXPLAIN = False
+
+# Tune a cascade screening model after training (kept only if it saves scoring time)
+CASCADE = False
+
 def load_and_prepare_data(filepath):
     """Load and prepare training data"""
     print(f"\n[INFO] Loading data from {filepath}...")
@@ -72,6 +92,18 @@ def train_model(X, y, feature_names):
     print(f"[INFO] Training set: {len(X_train)} samples")
     print(f"[INFO] Test set: {len(X_test)} samples")
     
+    # Training distribution for production drift monitoring
+    drift_reference = build_reference(X_train)
+    
+    # Downsample non-defaults in the training split only
+    rows, fit_kwargs, model_params, sampling = sample_training(
+        y_train.to_numpy(), NEGATIVE_SAMPLE_RATE, SAMPLING_MODE, seed=42
+    )
+    X_train, y_train = X_train.iloc[rows], y_train.iloc[rows]
+    if NEGATIVE_SAMPLE_RATE < 1:
+        print(f"[INFO] Negative sampling at {NEGATIVE_SAMPLE_RATE:.0%} ({SAMPLING_MODE}): "
+              f"{len(rows)} training rows")
+    
     # Scale features
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
@@ -85,7 +117,8 @@ def train_model(X, y, feature_names):
         objective='binary:logistic',
         eval_metric='auc',
         random_state=42,
-        use_label_encoder=False
+        use_label_encoder=False,
+        **model_params
     )
     
     print("[INFO] Training in progress...")
@@ -93,22 +126,30 @@ def train_model(X, y, feature_names):
         X_train_scaled,
         y_train,
         eval_set=[(X_test_scaled, y_test)],
-        verbose=False
+        verbose=False,
+        **fit_kwargs
     )
     
-    # Cross-validation
+    # Cross-validation; folds are fit and scored with their slice of the
+    # sampling weights so the scores describe the saved model
     print("[INFO] Running 5-fold cross-validation...")
-    cv_scores = cross_val_score(
-        model,
-        X_train_scaled,
-        y_train,
-        cv=5,
-        scoring='roc_auc'
-    )
+    weights = fit_kwargs.get('sample_weight')
+    cv_scores = []
+    for train_idx, val_idx in StratifiedKFold(n_splits=5).split(X_train_scaled, y_train):
+        fold_weights = None if weights is None else weights[train_idx]
+        fold_model = clone(model).fit(X_train_scaled[train_idx], y_train.iloc[train_idx], sample_weight=fold_weights)
+        cv_scores.append(roc_auc_score(
+            y_train.iloc[val_idx],
+            fold_model.predict_proba(X_train_scaled[val_idx])[:, 1],
+            sample_weight=None if weights is None else weights[val_idx]
+        ))
+    cv_scores = np.array(cv_scores)
     
     # Predictions
-    y_pred = model.predict(X_test_scaled)
     y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
+    if sampling['prior_correction']:
+        y_pred_proba = correct_probabilities(y_pred_proba, sampling['prior_correction'])
+    y_pred = (y_pred_proba > 0.5).astype(int)
     
     # Calculate metrics
     metrics = {
@@ -122,6 +163,7 @@ def train_model(X, y, feature_names):
         'train_samples': len(X_train),
         'test_samples': len(X_test),
         'default_rate': float(y.mean()),
+        'sampling': sampling,
         'trained_at': datetime.now().isoformat(),
         'version': '1.0.0'
     }
@@ -148,19 +190,23 @@ def train_model(X, y, feature_names):
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred, target_names=['No Default', 'Default']))
     
-    # Feature importance
-    feature_importance = pd.DataFrame({
-        'feature': feature_names,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
+    # Permutation importance and partial dependence on the holdout set
+    explanations = None
+    if EXPLAIN:
+        explanations = explain(model, scaler, X_test.to_numpy(), y_test.to_numpy(), feature_names)
+        print_importance(explanations)
     
-    print("\nFeature Importance:")
-    for idx, row in feature_importance.iterrows():
-        print(f"  {row['feature']:25s}: {row['importance']:.4f}")
+    # Screening model and band for cascade scoring, tuned against this model on all deals
+    cascade = None
+    if CASCADE:
+        cascade = tune_cascade(model, scaler.transform(X), prior_correction=sampling['prior_correction'])
+        print_tuning(cascade)
+    if cascade is not None:
+        metrics['cascade'] = {key: value for key, value in cascade.items() if key != 'screening_model'}
     
-    return model, scaler, metrics, feature_names
+    return model, scaler, metrics, feature_names, drift_reference, explanations, cascade
 
-def save_model(model, scaler, metrics, feature_names, model_path, metrics_path):
+def save_model(model, scaler, metrics, feature_names, drift_reference, explanations, cascade, model_path, metrics_path):
     """Save trained model and metrics"""
     print(f"\n[INFO] Saving model to {model_path}...")
     
@@ -173,6 +219,10 @@ def save_model(model, scaler, metrics, feature_names, model_path, metrics_path):
         'scaler': scaler,
         'feature_names': feature_names,
         'training_metrics': metrics,
+        'drift_reference': drift_reference,
+        'explanations': explanations,
+        'cascade': cascade,
+        'sampling': metrics['sampling'],
         'trained_at': datetime.now().isoformat(),
         'version': '1.0.0'
     }
@@ -199,10 +249,15 @@ def main():
     X, y, feature_names = load_and_prepare_data(DATA_FILE)
     
     # Train model
-    model, scaler, metrics, feature_names = train_model(X, y, feature_names)
+    model, scaler, metrics, feature_names, drift_reference, explanations, cascade = train_model(X, y, feature_names)
     
     # Save model
-    save_model(model, scaler, metrics, feature_names, MODEL_OUTPUT, METRICS_OUTPUT)
+    save_model(
+        model, scaler, metrics, feature_names, drift_reference, explanations, cascade, MODEL_OUTPUT, METRICS_OUTPUT
+    )
+    
+    # Comparable-deals index over the full history, in the model's scaled space
+    build_for_model(MODEL_OUTPUT, pd.read_csv(DATA_FILE))
     
     print("\n" + "="*60)
     print("✅ TRAINING COMPLETE!")
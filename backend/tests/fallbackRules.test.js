@@ -0,0 +1,104 @@
+// ============================================================
+// FALLBACK SCORING PARITY TESTS
+// The Node fallback and the Python rules engine must score every
+// deal identically from ml/fallback_rules.json
+// ============================================================
+
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { calculateFallbackRiskScore } = require('../lib/fallbackRiskScore');
+
+const ML_DIR = path.join(__dirname, '..', 'ml');
+
+/**
+ * Score deals with risk_model.py's rules engine, both per deal and batched
+ */
+function scoreWithPython(deals) {
+  const script = [
+    'import json, sys',
+    'from risk_model import FALLBACK_RULES',
+    'deals = json.load(sys.stdin)',
+    'single = [FALLBACK_RULES.score([d])[0] for d in deals]',
+    'print(json.dumps({"single": single, "batch": FALLBACK_RULES.score(deals)}))'
+  ].join('\n');
+
+  const result = spawnSync('python3', ['-c', script], {
+    cwd: ML_DIR,
+    input: JSON.stringify(deals),
+    encoding: 'utf-8',
+    maxBuffer: 64 * 1024 * 1024
+  });
+
+  if (result.status !== 0) {
+    throw new Error(`Python rules engine failed: ${result.stderr}`);
+  }
+
+  // Import-time warnings may precede the JSON line
+  const lines = result.stdout.trim().split('\n');
+  return JSON.parse(lines[lines.length - 1]);
+}
+
+function withoutVersion({ model_version, ...rest }) {
+  return rest;
+}
+
+// Boundary values around every threshold, plus missing fields, and
+// half-way values where half-up and half-even rounding would differ
+const LTVS = [undefined, null, 0, 50, 64.99, 65, 70, 75, 75.01, 78.5, 80, 80.25, 80.125, 80.375, 95];
+const RATES = [undefined, 5.5, 10, 10.01, 10.125, 10.375, 10.005, 12.75];
+const LOAN_AMOUNTS = [undefined, 0, 2500000, 10000000, 10000001, 10000002.5, 10000003.5, 12345678, 12345678.5];
+const ASSET_TYPES = [undefined, 'multifamily', 'Land', 'MIXED_USE', 'retail'];
+
+const deals = [];
+for (const requested_ltv of LTVS) {
+  for (const requested_rate of RATES) {
+    for (const loan_amount of LOAN_AMOUNTS) {
+      for (const asset_type of ASSET_TYPES) {
+        deals.push({ requested_ltv, requested_rate, loan_amount, asset_type });
+      }
+    }
+  }
+}
+
+describe('Fallback risk scoring parity', () => {
+  const python = scoreWithPython(deals);
+
+  test('Python per-deal and batched scoring agree', () => {
+    expect(python.batch).toEqual(python.single);
+  });
+
+  test('Node fallback matches the Python rules engine for every deal', () => {
+    const mismatches = deals.filter((deal, i) => {
+      const node = withoutVersion(calculateFallbackRiskScore(deal));
+      return JSON.stringify(node) !== JSON.stringify(withoutVersion(python.batch[i]));
+    });
+
+    expect(mismatches).toEqual([]);
+  });
+
+  test('applies the elevated LTV tier between 75 and 80', () => {
+    const result = calculateFallbackRiskScore({ requested_ltv: 78 });
+
+    expect(result.risk_score).toBe(58);
+    expect(result.risk_factors).toEqual([
+      { factor: 'Elevated LTV', value: '78%', impact: 'medium' }
+    ]);
+  });
+
+  test('rounds half-way factor values half up', () => {
+    const result = calculateFallbackRiskScore({ requested_rate: 10.125, loan_amount: 10000002.5 });
+
+    expect(result.risk_factors.map((f) => f.value)).toEqual(['10.13%', '$10,000,003']);
+  });
+
+  test('only the first matching LTV tier applies', () => {
+    const result = calculateFallbackRiskScore({ requested_ltv: 85, asset_type: 'land' });
+
+    expect(result.risk_score).toBe(77);
+    expect(result.risk_level).toBe('high');
+    expect(result.risk_factors.map((f) => f.factor)).toEqual([
+      'High LTV',
+      'Higher Risk Property Type'
+    ]);
+  });
+});